@@ -1,6 +1,11 @@
+import threading
+import time
 from typing import AsyncGenerator, Optional
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
 
 DATABASE_URL = settings.DATABASE_URL
@@ -8,14 +13,86 @@ DATABASE_URL = settings.DATABASE_URL
 Base = declarative_base()
 
 
+class PoolMetrics:
+    """Counters for connection checkouts from the engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe_checkout(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def observe_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def observe_checkin(self) -> None:
+        with self._lock:
+            self.checkins += 1
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe_timeout()
+            raise
+        self.metrics.observe_checkout(time.perf_counter() - start)
+        return connection
+
+    def _do_return_conn(self, record):
+        self.metrics.observe_checkin()
+        super()._do_return_conn(record)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def _connect_args(url: str) -> dict:
+    """Driver options: the statement cache settings only exist in asyncpg"""
+    if make_url(url).drivername != "postgresql+asyncpg":
+        return {}
+    return {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
 class Database:
     def __init__(self, url: Optional[str] = None):
-        # Create async engine with statement_cache_size=0 to fix pgBouncer issue
+        url = str(url or DATABASE_URL)
+        self.pool_metrics = PoolMetrics()
         self.engine = create_async_engine(
-            str(url or DATABASE_URL),
-            echo=True,
+            url,
+            echo=settings.DB_ECHO,
             future=True,
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            # pgBouncer in transaction mode cannot keep prepared statements
+            # across transactions: set DB_STATEMENT_CACHE_SIZE=0 behind it
+            connect_args=_connect_args(url),
         )
+        self.engine.sync_engine.pool.metrics = self.pool_metrics
 
         # Async session factory
         self.SessionLocal = async_sessionmaker(
@@ -26,6 +103,23 @@ class Database:
             autocommit=False,
         )
 
+    def pool_stats(self) -> dict:
+        """Current pool occupancy plus cumulative checkout metrics"""
+        pool = self.engine.sync_engine.pool
+        metrics = pool.metrics
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checkouts": metrics.checkouts,
+            "checkins": metrics.checkins,
+            "timeouts": metrics.timeouts,
+            "wait_seconds_total": metrics.wait_seconds_total,
+            "wait_seconds_max": metrics.wait_seconds_max,
+        }
+
     async def create_tables(self) -> None:
         """Create all tables asynchronously"""
         async with self.engine.begin() as conn:
@@ -46,3 +140,17 @@ class Database:
                 raise
             finally:
                 await session.close()
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+
+
+_database: Optional[Database] = None
+
+
+def get_database() -> Database:
+    """The process-wide Database: one engine and one pool per worker"""
+    global _database
+    if _database is None:
+        _database = Database()
+    return _database
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class DescriptionCache:
+    """
+    Two-tier cache for image descriptions: an in-process LRU bounded by the
+    total size of its values, backed by an optional SQLite file that survives
+    restarts and is shared by every worker on the host. The file keeps at
+    most about `max_rows` descriptions, dropping the oldest.
+    Values are opaque strings (serialized descriptions).
+
+    SQLite is only touched from worker threads, under its own lock, so a
+    slow write never holds up lookups in the in-memory tier.
+    """
+
+    def __init__(
+            self,
+            max_bytes: int = 32 * 1024 * 1024,
+            db_path: Optional[str] = None,
+            max_rows: int = 100_000,
+    ):
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # other workers write to the same file, so the table is trimmed every
+        # so many stores rather than kept exactly at max_rows
+        self._prune_every = max(1, max_rows // 100)
+        self._stores_since_prune = 0
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.pruned = 0
+
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS image_descriptions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_image_descriptions_created_at ON image_descriptions (created_at)"
+            )
+            self._conn.commit()
+            self._prune()
+
+    @staticmethod
+    def make_key(image_bytes: bytes, model: str, prompt_version: str) -> str:
+        """Key by image content, model and prompt version"""
+        return f"{hashlib.sha256(image_bytes).hexdigest()}:{model}:{prompt_version}"
+
+    def _remember(self, key: str, value: str) -> None:
+        """Insert into the LRU and evict least recently used entries over budget"""
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _load(self, key: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value FROM image_descriptions WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _store(self, key: str, value: str) -> None:
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_descriptions (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.commit()
+            self._stores_since_prune += 1
+            prune = self._stores_since_prune >= self._prune_every
+        if prune:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Delete the oldest rows beyond max_rows"""
+        with self._db_lock:
+            self._stores_since_prune = 0
+            cursor = self._conn.execute(
+                "DELETE FROM image_descriptions WHERE key IN ("
+                "SELECT key FROM image_descriptions ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+            self._conn.commit()
+            self.pruned += max(cursor.rowcount, 0)
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+
+        if self._conn is not None:
+            value = await asyncio.to_thread(self._load, key)
+            if value is not None:
+                self.persistent_hits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self._remember(key, value)
+        if self._conn is not None:
+            await asyncio.to_thread(self._store, key, value)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.memory_hits + self.persistent_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "max_rows": self.max_rows,
+            "pruned_rows": self.pruned,
+        }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+            self._conn = None
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.exceptions.custom_exception import CustomException
+
+# (normalized query, top_n)
+SearchKey = Tuple[str, int]
+
+
+class ImageSearchBackend(ABC):
+    """Upstream image search. Implement `search_images` to plug in another provider or a stub."""
+
+    @abstractmethod
+    async def search_images(self, query: str, max_results: int) -> List:
+        ...
+
+    async def close(self) -> None:
+        return None
+
+
+class TavilyImageSearchBackend(ImageSearchBackend):
+    """
+    Tavily's /search endpoint over one pooled httpx.AsyncClient. `base_url`
+    can point at a local stand-in of the API.
+    """
+
+    def __init__(
+            self,
+            api_key: str,
+            base_url: Optional[str] = None,
+            timeout: float = 30.0,
+            max_connections: int = 16,
+    ):
+        self.client = httpx.AsyncClient(
+            base_url=base_url or "https://api.tavily.com",
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def search_images(self, query: str, max_results: int) -> List:
+        try:
+            response = await self.client.post(
+                "/search",
+                json={"query": query, "include_images": True, "max_results": max_results},
+            )
+            response.raise_for_status()
+            return response.json().get("images", [])
+        except httpx.HTTPStatusError as e:
+            raise CustomException(
+                status_code=502,
+                detail="Image search failed",
+                exception_type="ImageSearchError",
+                additional_info={"error": str(e), "upstream_status": e.response.status_code},
+            )
+        except httpx.HTTPError as e:
+            raise CustomException(
+                status_code=502,
+                detail="Image search failed",
+                exception_type="ImageSearchError",
+                additional_info={"error": str(e)},
+            )
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class CachedImageSearch:
+    """
+    Image search behind a TTL cache keyed by normalized query and top_n, with
+    singleflight: concurrent identical searches share one upstream call, made
+    with the first caller's query as given.
+    Failures are not cached. A caller that goes away does not cancel the
+    shared call for the others.
+    """
+
+    def __init__(self, backend: ImageSearchBackend, ttl_seconds: float = 600.0, max_entries: int = 2048):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[SearchKey, Tuple[float, List]]" = OrderedDict()
+        self._inflight: Dict[SearchKey, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case- and whitespace-insensitive form of a query"""
+        return " ".join(query.split()).casefold()
+
+    async def search(self, query: str, top_n: int) -> List:
+        key = (self.normalize(query), top_n)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, images = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return images
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch(key, query))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._settle(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: SearchKey, query: str) -> List:
+        # The normalized form is only the cache key; upstream gets the query as
+        # typed, since case can matter for names and acronyms
+        images = await self.backend.search_images(query, key[1])
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, images)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return images
+
+    def _settle(self, key: SearchKey, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the error as retrieved even if every caller has gone away
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    async def close(self) -> None:
+        await self.backend.close()
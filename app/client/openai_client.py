@@ -1,13 +1,30 @@
+import asyncio
 import base64
 import json
-import mimetypes
-from typing import Optional, List, Literal, Union
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, List, Literal, Union, Callable, Awaitable, TypeVar
 
-
-from openai import OpenAI
+import httpx
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    APIConnectionError,
+    APIStatusError,
+    RateLimitError,
+)
 from openai.lib import ResponseFormatT
 from pydantic import BaseModel, ConfigDict, Field
+from app.config import settings
 from app.constant_manager import image_description_prompt
+from app.utils.image_preprocess import PreparedImage, detect_format, prepare_image
+from app.utils.metrics import record_retry, timed
+
+R = TypeVar("R")
+
+logger = logging.getLogger(__name__)
 
 # Structured response model
 class StrictBaseModel(BaseModel):
@@ -58,74 +75,239 @@ class ResponseModel(BaseModel):
     image_type: Literal["chart", "image", "diagram", "screenshot"]
 
 
+def image_description_messages(image_bytes: bytes) -> List[dict]:
+    """Build the vision request for `image_description` (CPU-bound when preprocessing)"""
+    if settings.VISION_PREPROCESS:
+        image = prepare_image(image_bytes)
+    else:
+        image_format = detect_format(image_bytes) or "jpeg"
+        image = PreparedImage(image_bytes, f"image/{image_format}", "auto", None, None)
+    base64_image = base64.b64encode(image.data).decode("utf-8")
+    formatted_prompt = image_description_prompt.format(response_schema=json.dumps(GeneratedVisualItemModel.model_json_schema()))
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": formatted_prompt},
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{image.mime_type};base64,{base64_image}",
+                        "detail": image.detail,
+                    },
+                },
+            ],
+        }
+    ]
+
+
 class OpenAIClient:
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o",
+                 base_url: Optional[str] = None):
         self.api_key = api_key
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(api_key=self.api_key, base_url=base_url)
 
     def chat(self, messages: List, model: str = "gpt-4o",
              temperature: float = 0.7) -> str:
         try:
-            response = self.client.responses.create(
-                model=model,
-                input=messages,
-                temperature=temperature,
-            )
+            with timed("openai"):
+                response = self.client.responses.create(
+                    model=model,
+                    input=messages,
+                    temperature=temperature,
+                )
             return response.output_text
         except Exception as e:
-            print(f"Error during chat: {str(e)}")
+            logger.warning("Error during chat: %s", e)
             raise e
 
     def structured_chat(self, system: str, user: str,
                         structured_response: ResponseFormatT,
                         model: str = "gpt-4o") -> BaseModel:
         try:
-            response = self.client.chat.completions.parse(
+            with timed("openai"):
+                response = self.client.chat.completions.parse(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                    response_format=structured_response,
+                )
+            return response.choices[0].message.parsed
+        except Exception as e:
+            logger.warning("Error during structured chat: %s", e)
+            raise e
+
+    def image_description(
+            self,
+            image_bytes: bytes,
+            model: str = "gpt-4o",
+            max_tokens: int = 1000
+    ) -> ResponseModel:
+        try:
+            messages = image_description_messages(image_bytes)
+            with timed("openai"):
+                response = self.client.chat.completions.parse(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    response_format=GeneratedVisualItemModel,
+                )
+
+            return response.choices[0].message.parsed
+        except Exception as e:
+            logger.warning("Error during image description: %s", e)
+            raise e
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def _retry_after(error: APIStatusError) -> Optional[float]:
+    """Seconds the server asked us to wait, from retry-after-ms / retry-after"""
+    headers = error.response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (RateLimitError, APIConnectionError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
+
+
+class AsyncOpenAIClient:
+    """
+    Non-blocking counterpart of OpenAIClient built on AsyncOpenAI.
+
+    All calls share one pooled HTTP connection pool and a concurrency cap, and
+    are retried with jittered exponential backoff that honors the server's
+    retry-after headers on 429s. SDK-level retries are disabled so the cap
+    and the backoff policy apply to every attempt.
+    """
+
+    def __init__(
+            self,
+            api_key: Optional[str] = None,
+            model: str = "gpt-4o",
+            base_url: Optional[str] = None,
+            max_concurrency: int = 16,
+            max_connections: int = 32,
+            timeout: float = 60.0,
+            max_retries: int = 5,
+            backoff_base: float = 0.5,
+            backoff_max: float = 30.0,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+            transport=transport,
+        )
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=base_url,
+            http_client=self.http_client,
+            max_retries=0,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, never shorter than retry-after"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if isinstance(error, APIStatusError):
+            retry_after = _retry_after(error)
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, self.backoff_base)
+        return delay
+
+    async def _call(self, request: Callable[[], Awaitable[R]]) -> R:
+        """One logical call, timed as a whole including queueing and retries"""
+        attempt = 0
+        with timed("openai"):
+            while True:
+                try:
+                    async with self._semaphore:
+                        return await request()
+                except Exception as e:
+                    if attempt >= self.max_retries or not _is_retryable(e):
+                        raise
+                    delay = self._backoff(attempt, e)
+                    record_retry(e)
+                    logger.info("OpenAI request failed (%s), retrying in %.2fs", type(e).__name__, delay)
+                    attempt += 1
+                    await asyncio.sleep(delay)
+
+    async def chat(self, messages: List, model: str = "gpt-4o",
+                   temperature: float = 0.7) -> str:
+        try:
+            response = await self._call(lambda: self.client.responses.create(
+                model=model,
+                input=messages,
+                temperature=temperature,
+            ))
+            return response.output_text
+        except Exception as e:
+            logger.warning("Error during chat: %s", e)
+            raise e
+
+    async def structured_chat(self, system: str, user: str,
+                              structured_response: ResponseFormatT,
+                              model: str = "gpt-4o") -> BaseModel:
+        try:
+            response = await self._call(lambda: self.client.chat.completions.parse(
                 model=model,
                 messages=[
                     {"role": "system", "content": system},
                     {"role": "user", "content": user},
                 ],
                 response_format=structured_response,
-            )
+            ))
             return response.choices[0].message.parsed
         except Exception as e:
-            print(f"Error during structured chat: {str(e)}")
+            logger.warning("Error during structured chat: %s", e)
             raise e
 
-    def image_description(
+    async def image_description(
             self,
             image_bytes: bytes,
             model: str = "gpt-4o",
             max_tokens: int = 1000
-    ) -> ResponseModel:
+    ) -> GeneratedVisualItemModel:
         try:
-            mime_type = mimetypes.guess_type("file.png")[0] or "image/jpeg"
-            base64_image = base64.b64encode(image_bytes).decode("utf-8")
-            formatted_prompt = image_description_prompt.format(response_schema=json.dumps(GeneratedVisualItemModel.model_json_schema()))
-            response = self.client.chat.completions.parse(
+            messages = await asyncio.to_thread(image_description_messages, image_bytes)
+            response = await self._call(lambda: self.client.chat.completions.parse(
                 model=model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": formatted_prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{mime_type};base64,{base64_image}"
-                                },
-                            },
-                        ],
-                    }
-                ],
+                messages=messages,
                 max_tokens=max_tokens,
                 response_format=GeneratedVisualItemModel,
-            )
-
+            ))
             return response.choices[0].message.parsed
         except Exception as e:
-            print(f"Error during image description: {str(e)}")
+            logger.warning("Error during image description: %s", e)
             raise e
 
+    async def close(self) -> None:
+        await self.client.close()
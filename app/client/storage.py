@@ -1,49 +1,376 @@
-from typing import Optional
-from supabase import create_client, Client
-from app.config import settings
+import asyncio
+import contextlib
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Sequence, Tuple, Union
+
+import httpx
+from storage3 import AsyncStorageClient
+
 from app.exceptions.custom_exception import CustomException
+from app.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Data to store, or a local path to stream it from
+Content = Union[bytes, str]
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def _content_size(content: Content) -> int:
+    return len(content) if isinstance(content, bytes) else os.path.getsize(content)
+
+
+def _content_type(file_name: str) -> str:
+    return mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+
+
+def _upload_error(error: Union[Exception, str], bucket_name: str, file_name: str) -> CustomException:
+    return CustomException(
+        status_code=500,
+        detail="Failed to upload file to storage",
+        additional_info={"error": str(error), "bucket_name": bucket_name, "file_name": file_name},
+        exception_type="StorageUploadError",
+    )
+
+
+def _not_found(bucket_name: str, file_name: str) -> CustomException:
+    return CustomException(
+        status_code=404,
+        detail="File not found in storage",
+        additional_info={"bucket_name": bucket_name, "file_name": file_name},
+        exception_type="StorageNotFoundError",
+    )
+
+
+class StorageBackend(ABC):
+    """
+    Object storage addressed by bucket and path. Implement the abstract methods
+    to plug in another store; the bulk and download-to-file operations have
+    generic implementations that a backend can replace with native ones.
+    """
+
+    upload_concurrency: int = 8
+
+    @abstractmethod
+    async def upload_file(
+            self,
+            bucket_name: str,
+            file_name: str,
+            content: Content,
+            upsert: bool = False,
+            content_type: Optional[str] = None,
+    ) -> str:
+        """
+        Store `content` at `file_name` and return its key. Without `upsert` an
+        existing object is left alone and the upload fails. `content_type`
+        defaults to the one guessed from the file name's extension.
+        """
+
+    @abstractmethod
+    async def download_file(self, bucket_name: str, file_name: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def stream_file(self, bucket_name: str, file_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """The object's content in chunks, without holding all of it in memory"""
+
+    @abstractmethod
+    async def delete_many(self, bucket_name: str, file_names: Sequence[str]) -> List[str]:
+        """Delete objects, ignoring missing ones; returns the paths that were deleted"""
+
+    @abstractmethod
+    def get_image_url(self, bucket_name: str, file_name: str) -> str:
+        ...
+
+    async def delete_file(self, bucket_name: str, file_name: str) -> List[str]:
+        return await self.delete_many(bucket_name, [file_name])
+
+    async def upload_many(
+            self,
+            bucket_name: str,
+            files: Sequence[Tuple[str, Content]],
+            upsert: bool = False,
+    ) -> List[str]:
+        """
+        Upload (path, content) pairs, `upload_concurrency` at a time, and return
+        their keys in order. Every upload is attempted; if any failed, a
+        StorageUploadError listing them is raised once the rest are done.
+        """
+        slots = asyncio.Semaphore(self.upload_concurrency)
+
+        async def upload(file_name: str, content: Content) -> str:
+            async with slots:
+                return await self.upload_file(bucket_name, file_name, content, upsert=upsert)
+
+        results = await asyncio.gather(
+            *(upload(file_name, content) for file_name, content in files), return_exceptions=True
+        )
+        failed = {
+            file_name: (result.additional_info or {}).get("error", result.detail)
+            if isinstance(result, CustomException) else str(result)
+            for (file_name, _), result in zip(files, results)
+            if isinstance(result, BaseException)
+        }
+        if failed:
+            raise CustomException(
+                status_code=500,
+                detail="Failed to upload files to storage",
+                additional_info={"bucket_name": bucket_name, "failed": failed, "uploaded": len(files) - len(failed)},
+                exception_type="StorageUploadError",
+            )
+        return list(results)
+
+    def local_path(self, bucket_name: str, file_name: str) -> Optional[str]:
+        """Path of the object on this host's disk, for backends that keep one there"""
+        return None
+
+    async def download_to(self, bucket_name: str, file_name: str, path: str) -> None:
+        """Stream an object into a local file"""
+        with open(path, "wb") as f:
+            async for chunk in self.stream_file(bucket_name, file_name):
+                await asyncio.to_thread(f.write, chunk)
+
+    async def close(self) -> None:
+        return None
 
 
-class StorageClient:
-    def __init__(self, url: Optional[str] = None, key: Optional[str] = None):
-        self.url = url or settings.STORAGE_URL
-        self.key = key or settings.STORAGE_KEY
-        self.client: Client = create_client(self.url, self.key)
+class SupabaseStorageBackend(StorageBackend):
+    """Supabase Storage over one pooled httpx.AsyncClient"""
+
+    # Supabase removes at most this many objects per request
+    DELETE_BATCH_SIZE = 1000
+
+    def __init__(
+            self,
+            url: str,
+            key: str,
+            timeout: float = 60.0,
+            max_connections: int = 16,
+            upload_concurrency: int = 8,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = url
+        self.upload_concurrency = upload_concurrency
+        headers = {"apiKey": key, "Authorization": f"Bearer {key}"}
+        # stream_file requests go through this client directly, so it carries
+        # the base URL and auth itself rather than relying on storage3 to set them
+        self.http_client = httpx.AsyncClient(
+            base_url=f"{url.rstrip('/')}/storage/v1/",
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self.client = AsyncStorageClient(
+            url=f"{url.rstrip('/')}/storage/v1",
+            headers=headers,
+            http_client=self.http_client,
+        )
 
     def get_bucket(self, bucket_name: str):
         """Return a Supabase storage bucket"""
-        return self.client.storage.from_(bucket_name)
+        return self.client.from_(bucket_name)
 
-    def get_image(self, bucket_name: str, file_name: str):
-        """Get a file from a bucket"""
-        bucket = self.get_bucket(bucket_name)
-        return bucket.download(file_name)
+    async def upload_file(
+            self,
+            bucket_name: str,
+            file_name: str,
+            content: Content,
+            upsert: bool = False,
+            content_type: Optional[str] = None,
+    ) -> str:
+        try:
+            with timed("storage_upload") as stage:
+                stage.items = _content_size(content)
+                # storage3 labels uploads text/plain unless told otherwise
+                options = {"content-type": content_type or _content_type(file_name)}
+                if upsert:
+                    options["upsert"] = "true"
+                bucket = self.get_bucket(bucket_name)
+                if isinstance(content, bytes):
+                    response = await bucket.upload(file_name, content, options)
+                else:
+                    # storage3 would open a path itself and never close it
+                    with await asyncio.to_thread(open, content, "rb") as f:
+                        response = await bucket.upload(file_name, f, options)
+            return response.full_path
+        except Exception as e:
+            logger.warning("Upload of %s/%s failed: %s", bucket_name, file_name, e)
+            raise _upload_error(e, bucket_name, file_name)
+
+    async def download_file(self, bucket_name: str, file_name: str) -> bytes:
+        chunks = [chunk async for chunk in self.stream_file(bucket_name, file_name)]
+        return b"".join(chunks)
 
-    def get_image_url(self, bucket_name: str, file_name: str):
-        """Get a public URL for a file in a bucket"""
+    async def stream_file(
+            self, bucket_name: str, file_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        async with self.http_client.stream("GET", f"object/{bucket_name}/{file_name}") as response:
+            if response.status_code in (400, 404):
+                # Supabase answers 400 for objects that do not exist
+                raise _not_found(bucket_name, file_name)
+            if response.is_error:
+                await response.aread()
+                raise CustomException(
+                    status_code=502,
+                    detail="Failed to download file from storage",
+                    additional_info={
+                        "error": response.text, "upstream_status": response.status_code,
+                        "bucket_name": bucket_name, "file_name": file_name,
+                    },
+                    exception_type="StorageDownloadError",
+                )
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+
+    async def delete_many(self, bucket_name: str, file_names: Sequence[str]) -> List[str]:
+        deleted = []
         bucket = self.get_bucket(bucket_name)
-        return bucket.get_public_url(file_name)
+        for start in range(0, len(file_names), self.DELETE_BATCH_SIZE):
+            removed = await bucket.remove(list(file_names[start:start + self.DELETE_BATCH_SIZE]))
+            deleted.extend(item["name"] for item in removed)
+        return deleted
 
-    def upload_file(self, bucket_name: str, file_name: str, content: bytes):
-        """Upload a file to a bucket"""
-        try:
-            bucket = self.get_bucket(bucket_name)
-            return bucket.upload(file_name, content)
-        except Exception as e:
-            print(e)
+    def get_image_url(self, bucket_name: str, file_name: str) -> str:
+        """Public URL of a file in a bucket"""
+        return f"{self.url.rstrip('/')}/storage/v1/object/public/{bucket_name}/{file_name}"
+
+    async def close(self) -> None:
+        """Close the pooled HTTP connections of the storage client"""
+        await self.http_client.aclose()
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Buckets as directories under `root`. Writes go to a temporary file in the
+    target directory that is fsynced and then renamed into place, so readers
+    never see a partial object; reads are streamed from disk. `public_url`
+    is the base URL the files are served under, if any.
+    """
+
+    def __init__(
+            self,
+            root: str,
+            public_url: Optional[str] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            upload_concurrency: int = 8,
+    ):
+        self.root = Path(root).resolve()
+        self.public_url = public_url
+        self.chunk_size = chunk_size
+        self.upload_concurrency = upload_concurrency
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, bucket_name: str, file_name: str) -> Path:
+        """Local path of an object; paths escaping the bucket are rejected"""
+        bucket = (self.root / bucket_name).resolve()
+        path = (bucket / file_name).resolve()
+        if bucket.parent != self.root or not path.is_relative_to(bucket) or path == bucket:
             raise CustomException(
-                status_code=500,
-                detail="Failed to upload file to storage",
-                additional_info={"error": str(e), "bucket_name": bucket_name, "file_name": file_name},
-                exception_type="StorageUploadError"
+                status_code=400,
+                detail="Invalid storage path",
+                additional_info={"bucket_name": bucket_name, "file_name": file_name},
+                exception_type="StoragePathError",
             )
+        return path
 
-    def download_file(self, bucket_name: str, file_name: str):
-        """Download a file from a bucket"""
-        bucket = self.get_bucket(bucket_name)
-        return bucket.download(file_name)
+    def _write(self, path: Path, content: Content, upsert: bool) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(content, bytes):
+                    f.write(content)
+                else:
+                    with open(content, "rb") as source:
+                        shutil.copyfileobj(source, f, self.chunk_size)
+                f.flush()
+                os.fsync(f.fileno())
+            if upsert:
+                os.replace(tmp_path, path)
+            else:
+                # link() fails if the path exists, so concurrent creates cannot both win
+                os.link(tmp_path, path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+
+    async def upload_file(
+            self,
+            bucket_name: str,
+            file_name: str,
+            content: Content,
+            upsert: bool = False,
+            content_type: Optional[str] = None,
+    ) -> str:
+        # files carry no metadata; readers tell the type from the content
+        path = self.path(bucket_name, file_name)
+        try:
+            with timed("storage_upload") as stage:
+                stage.items = _content_size(content)
+                await asyncio.to_thread(self._write, path, content, upsert)
+            return f"{bucket_name}/{file_name}"
+        except FileExistsError:
+            raise _upload_error("The resource already exists", bucket_name, file_name)
+        except OSError as e:
+            logger.warning("Upload of %s/%s failed: %s", bucket_name, file_name, e)
+            raise _upload_error(e, bucket_name, file_name)
+
+    async def download_file(self, bucket_name: str, file_name: str) -> bytes:
+        path = self.path(bucket_name, file_name)
+        try:
+            return await asyncio.to_thread(path.read_bytes)
+        except (FileNotFoundError, IsADirectoryError):
+            raise _not_found(bucket_name, file_name)
+
+    async def stream_file(
+            self, bucket_name: str, file_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        path = self.path(bucket_name, file_name)
+        try:
+            f = await asyncio.to_thread(open, path, "rb")
+        except (FileNotFoundError, IsADirectoryError):
+            raise _not_found(bucket_name, file_name)
+        try:
+            while chunk := await asyncio.to_thread(f.read, chunk_size):
+                yield chunk
+        finally:
+            f.close()
+
+    def local_path(self, bucket_name: str, file_name: str) -> Optional[str]:
+        path = self.path(bucket_name, file_name)
+        return str(path) if path.is_file() else None
+
+    async def download_to(self, bucket_name: str, file_name: str, path: str) -> None:
+        source = self.path(bucket_name, file_name)
+        try:
+            await asyncio.to_thread(shutil.copyfile, source, path)
+        except (FileNotFoundError, IsADirectoryError):
+            raise _not_found(bucket_name, file_name)
+
+    def _delete(self, paths: List[Tuple[str, Path]]) -> List[str]:
+        deleted = []
+        for file_name, path in paths:
+            try:
+                path.unlink()
+                deleted.append(file_name)
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    async def delete_many(self, bucket_name: str, file_names: Sequence[str]) -> List[str]:
+        paths = [(file_name, self.path(bucket_name, file_name)) for file_name in file_names]
+        return await asyncio.to_thread(self._delete, paths)
+
+    def get_image_url(self, bucket_name: str, file_name: str) -> str:
+        if self.public_url:
+            return f"{self.public_url.rstrip('/')}/{bucket_name}/{file_name}"
+        return self.path(bucket_name, file_name).as_uri()
 
-    def delete_file(self, bucket_name: str, file_name: str):
-        """Delete a file from a bucket"""
-        bucket = self.get_bucket(bucket_name)
-        return bucket.remove([file_name])
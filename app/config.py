@@ -1,16 +1,149 @@
+from typing import Dict, Literal, Optional
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
-    STORAGE_KEY: str
-    STORAGE_URL: str
     OPENAI_API_KEY: str
     TAVILY_API_KEY: str
 
     # Debug mode
     DEBUG: bool = Field(default=False)
+    # Level of the app's loggers; per-image messages are logged at DEBUG
+    LOG_LEVEL: str = Field(default="INFO")
+    # Seconds between event-loop lag samples exported on /metrics; 0 disables them
+    EVENT_LOOP_LAG_INTERVAL: float = Field(default=0.25)
+
+    # Database engine and pool (one per process)
+    DB_ECHO: bool = Field(default=False)
+    DB_POOL_SIZE: int = Field(default=10)
+    DB_MAX_OVERFLOW: int = Field(default=10)
+    DB_POOL_TIMEOUT: float = Field(default=30.0)
+    DB_POOL_RECYCLE: int = Field(default=1800)
+    DB_POOL_PRE_PING: bool = Field(default=True)
+    # asyncpg prepared statement cache; must be 0 behind PgBouncer in
+    # transaction mode, which cannot keep prepared statements across
+    # transactions. Ignored for other drivers.
+    DB_STATEMENT_CACHE_SIZE: int = Field(default=100)
+
+    # File processing: at most PROCESS_CONCURRENCY images are being uploaded,
+    # DB_INSERT_BATCH_SIZE are being inserted and EXTRACTION_WINDOW more are
+    # buffered, bounding per-request image memory
+    PROCESS_CONCURRENCY: int = Field(default=8)
+    EXTRACTION_WINDOW: int = Field(default=8)
+    # image rows are inserted in batches of this size, one round-trip each
+    DB_INSERT_BATCH_SIZE: int = Field(default=32)
+    # describe images while processing; each image is checkpointed as described
+    PROCESS_DESCRIBE_IMAGES: bool = Field(default=True)
+
+    # Object storage: "supabase" (STORAGE_URL and STORAGE_KEY) or "local", which
+    # keeps buckets as directories under STORAGE_LOCAL_ROOT, served under
+    # STORAGE_PUBLIC_URL if set
+    STORAGE_BACKEND: str = Field(default="supabase")
+    STORAGE_URL: Optional[str] = Field(default=None)
+    STORAGE_KEY: Optional[str] = Field(default=None)
+    STORAGE_LOCAL_ROOT: str = Field(default="storage")
+    STORAGE_PUBLIC_URL: Optional[str] = Field(default=None)
+    STORAGE_TIMEOUT: float = Field(default=60.0)
+    STORAGE_MAX_CONNECTIONS: int = Field(default=16)
+    # uploads in flight per upload_many call
+    STORAGE_UPLOAD_CONCURRENCY: int = Field(default=8)
+
+    # Uploads are spooled to disk in chunks; None uses the system temp dir
+    MAX_UPLOAD_BYTES: int = Field(default=200 * 1024 * 1024)
+    UPLOAD_CHUNK_SIZE: int = Field(default=1024 * 1024)
+    UPLOAD_SPOOL_DIR: Optional[str] = Field(default=None)
+
+    # PDF extraction: 0 workers means one per CPU core
+    EXTRACTION_MAX_WORKERS: int = Field(default=0)
+    EXTRACTION_PARALLEL_THRESHOLD: int = Field(default=50)
+    EXTRACTION_PAGES_PER_CHUNK: int = Field(default=16)
+
+    # PPTX/DOCX/XLSX media members larger than this, or compressed more than
+    # this ratio (image data barely compresses), are skipped unread
+    OFFICE_MAX_MEMBER_BYTES: int = Field(default=50 * 1024 * 1024)
+    OFFICE_MAX_COMPRESSION_RATIO: float = Field(default=100.0)
+
+    # OpenAI: the async client shares one connection pool, caps in-flight
+    # requests and retries with jittered exponential backoff
+    OPENAI_BASE_URL: Optional[str] = Field(default=None)
+    OPENAI_ASYNC: bool = Field(default=True)
+    OPENAI_MAX_CONCURRENCY: int = Field(default=16)
+    OPENAI_MAX_CONNECTIONS: int = Field(default=32)
+    OPENAI_TIMEOUT: float = Field(default=60.0)
+    OPENAI_MAX_RETRIES: int = Field(default=5)
+    OPENAI_BACKOFF_BASE: float = Field(default=0.5)
+    OPENAI_BACKOFF_MAX: float = Field(default=30.0)
+
+    # Pre-filter for trivial images (icons, bullets, fills, masks)
+    FILTER_ENABLED: bool = Field(default=True)
+    FILTER_MIN_BYTES: int = Field(default=256)
+    FILTER_MIN_SIDE: int = Field(default=24)
+    FILTER_MAX_ASPECT_RATIO: float = Field(default=15.0)
+    FILTER_MIN_VARIANCE: float = Field(default=2.0)
+    FILTER_MIN_ENTROPY: float = Field(default=1.0)
+    FILTER_REVIEW_MIN_SIDE: int = Field(default=64)
+
+    # Images are downscaled and re-encoded (jpeg or webp) before vision calls
+    VISION_PREPROCESS: bool = Field(default=True)
+    VISION_MAX_SIDE: int = Field(default=2048)
+    VISION_MAX_BYTES: int = Field(default=1024 * 1024)
+    VISION_OUTPUT_FORMAT: Literal["jpeg", "webp"] = Field(default="jpeg")
+    VISION_QUALITY: int = Field(default=85)
+    VISION_LOW_DETAIL_MAX_SIDE: int = Field(default=512)
+
+    # Image description cache; an empty path keeps it in memory only
+    DESCRIPTION_CACHE_MAX_BYTES: int = Field(default=32 * 1024 * 1024)
+    DESCRIPTION_CACHE_PATH: Optional[str] = Field(default="description_cache.sqlite3")
+    # rows kept in the SQLite tier; the oldest beyond this are deleted
+    DESCRIPTION_CACHE_MAX_ROWS: int = Field(default=100_000)
+
+    # Image serving: thumbnails at fixed sizes (name to longest side in pixels)
+    # are rendered on first request and kept, with originals fetched from remote
+    # storage, in an LRU disk cache; responses may be cached IMAGE_CACHE_MAX_AGE seconds
+    IMAGE_THUMBNAIL_SIZES: Dict[str, int] = Field(default={"small": 128, "medium": 320, "large": 640})
+    IMAGE_THUMBNAIL_QUALITY: int = Field(default=80)
+    IMAGE_CACHE_DIR: str = Field(default="image_cache")
+    IMAGE_CACHE_MAX_BYTES: int = Field(default=1024 * 1024 * 1024)
+    IMAGE_CACHE_MAX_AGE: int = Field(default=86400)
+
+    # Image search: pooled Tavily client behind a TTL cache with request coalescing;
+    # TAVILY_BASE_URL can point at a local stand-in of the API
+    TAVILY_BASE_URL: Optional[str] = Field(default=None)
+    SEARCH_TIMEOUT: float = Field(default=30.0)
+    SEARCH_MAX_CONNECTIONS: int = Field(default=16)
+    SEARCH_CACHE_TTL: float = Field(default=600.0)
+    SEARCH_CACHE_MAX_ENTRIES: int = Field(default=2048)
+
+    # Background processing jobs; set JOB_WORKERS=0 when running `python -m app.worker` instead
+    JOB_WORKERS: int = Field(default=1)
+    JOB_POLL_INTERVAL: float = Field(default=2.0)
+    JOB_LEASE_SECONDS: int = Field(default=120)
+    JOB_MAX_ATTEMPTS: int = Field(default=3)
+    # a failed attempt is retried after JOB_RETRY_BACKOFF * 2^(attempt - 1) seconds, at most JOB_RETRY_BACKOFF_MAX
+    JOB_RETRY_BACKOFF: float = Field(default=30.0)
+    JOB_RETRY_BACKOFF_MAX: float = Field(default=900.0)
+    JOB_SOURCE_BUCKET: str = Field(default="files")
+
+    # Image similarity: in-memory index of perceptual hashes and descriptors,
+    # saved to SIMILARITY_INDEX_PATH on shutdown (empty keeps it in memory only)
+    # and caught up from the database at most every SIMILARITY_REFRESH_INTERVAL
+    SIMILARITY_INDEX_PATH: Optional[str] = Field(default="similarity_index.npz")
+    SIMILARITY_REFRESH_INTERVAL: float = Field(default=30.0)
+    # images reranked by descriptor after the Hamming scan
+    SIMILARITY_CANDIDATES: int = Field(default=512)
+    # weight of the hash similarity in the score; the descriptor gets the rest
+    SIMILARITY_HASH_WEIGHT: float = Field(default=0.5)
+
+    # Near-duplicate clustering (`python -m app.dedupe`): images whose perceptual
+    # hashes differ in at most DEDUPE_HAMMING_THRESHOLD bits share a description;
+    # 0 workers means one per CPU core, an empty work dir uses the system temp dir
+    DEDUPE_HAMMING_THRESHOLD: int = Field(default=4)
+    DEDUPE_WORKERS: int = Field(default=0)
+    DEDUPE_PAGE_SIZE: int = Field(default=50000)
+    DEDUPE_WORK_DIR: Optional[str] = Field(default=None)
 
     # Example for future expansion
     APP_NAME: str = Field(default="Zedny Product API")
@@ -1,3 +1,7 @@
+# Bump whenever image_description_prompt or the response schema changes,
+# so cached descriptions produced by the old prompt are not reused
+image_description_prompt_version = "1"
+
 image_description_prompt = """
 You are an assistant that analyzes images and provides a structured response.
 
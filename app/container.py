@@ -1,28 +1,203 @@
-from typing import Any, AsyncGenerator
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Optional, Union
 
-from fastapi import Depends
+from fastapi import Depends, FastAPI, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.client.database import Database
-from app.client.openai_client import OpenAIClient
-from app.client.storage import StorageClient
+from app.client.database import get_database
+from app.client.description_cache import DescriptionCache
+from app.client.image_search import CachedImageSearch, ImageSearchBackend, TavilyImageSearchBackend
+from app.client.openai_client import OpenAIClient, AsyncOpenAIClient
+from app.client.storage import LocalStorageBackend, StorageBackend, SupabaseStorageBackend
 from app.config import settings
 from app.repositories.file_repo import FileRepository
 from app.repositories.image_repo import ImageRepository
+from app.repositories.job_repo import JobRepository
+from app.service.caption_service import CaptionService
 from app.service.file_service import FileService
+from app.service.image_service import ImageService
+from app.service.job_service import JobService
+from app.service.job_worker import JobWorkerPool
+from app.service.similarity_service import SimilarityService
+from app.utils.disk_cache import DiskLRUCache
+from app.utils.extraction_engine import PdfExtractionEngine
+from app.utils.metrics import configure_logging, monitor_event_loop_lag
+from app.utils.similarity_index import SimilarityIndex
 
-db = Database()
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+# Shared per process so the worker pool is started once and reused
+extraction_engine = PdfExtractionEngine(
+    max_workers=settings.EXTRACTION_MAX_WORKERS,
+    parallel_threshold=settings.EXTRACTION_PARALLEL_THRESHOLD,
+    pages_per_chunk=settings.EXTRACTION_PAGES_PER_CHUNK,
+)
+
+
+def build_openai_client() -> Union[OpenAIClient, AsyncOpenAIClient]:
+    if not settings.OPENAI_ASYNC:
+        return OpenAIClient(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+    # The async client owns the process-wide connection pool and concurrency cap
+    return AsyncOpenAIClient(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        timeout=settings.OPENAI_TIMEOUT,
+        max_retries=settings.OPENAI_MAX_RETRIES,
+        backoff_base=settings.OPENAI_BACKOFF_BASE,
+        backoff_max=settings.OPENAI_BACKOFF_MAX,
+    )
+
+
+def build_storage_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorageBackend(
+            root=settings.STORAGE_LOCAL_ROOT,
+            public_url=settings.STORAGE_PUBLIC_URL,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE,
+            upload_concurrency=settings.STORAGE_UPLOAD_CONCURRENCY,
+        )
+    if settings.STORAGE_BACKEND != "supabase":
+        raise ValueError(f"Unknown STORAGE_BACKEND {settings.STORAGE_BACKEND!r}, expected 'supabase' or 'local'")
+    if not settings.STORAGE_URL or not settings.STORAGE_KEY:
+        raise ValueError("STORAGE_URL and STORAGE_KEY are required for the supabase storage backend")
+    return SupabaseStorageBackend(
+        url=settings.STORAGE_URL,
+        key=settings.STORAGE_KEY,
+        timeout=settings.STORAGE_TIMEOUT,
+        max_connections=settings.STORAGE_MAX_CONNECTIONS,
+        upload_concurrency=settings.STORAGE_UPLOAD_CONCURRENCY,
+    )
+
+
+def build_search_backend() -> ImageSearchBackend:
+    return TavilyImageSearchBackend(
+        api_key=settings.TAVILY_API_KEY,
+        base_url=settings.TAVILY_BASE_URL,
+        timeout=settings.SEARCH_TIMEOUT,
+        max_connections=settings.SEARCH_MAX_CONNECTIONS,
+    )
+
+
+async def open_clients(state) -> None:
+    """
+    Build the process-wide clients once, so their HTTP connections (and TLS
+    sessions) are reused, and keep them on `state` (app.state for the API).
+    """
+    state.openai_client = build_openai_client()
+    state.storage_client = build_storage_backend()
+    state.image_search = CachedImageSearch(
+        build_search_backend(),
+        ttl_seconds=settings.SEARCH_CACHE_TTL,
+        max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    )
+    state.description_cache = DescriptionCache(
+        max_bytes=settings.DESCRIPTION_CACHE_MAX_BYTES,
+        db_path=settings.DESCRIPTION_CACHE_PATH,
+        max_rows=settings.DESCRIPTION_CACHE_MAX_ROWS,
+    )
+
+
+async def close_clients(state) -> None:
+    if isinstance(state.openai_client, AsyncOpenAIClient):
+        await state.openai_client.close()
+    else:
+        state.openai_client.close()
+    await state.storage_client.close()
+    await state.image_search.close()
+    state.description_cache.close()
+    extraction_engine.shutdown()
+    await db.dispose()
+
+
+def build_file_service(session: AsyncSession, state) -> FileService:
+    return FileService(
+        file_repo=FileRepository(session),
+        storage_service=state.storage_client,
+        image_repo=ImageRepository(session),
+        openai_client=state.openai_client,
+        db=session,
+        extraction_engine=extraction_engine,
+        description_cache=state.description_cache,
+    )
+
+
+def build_job_workers(state, concurrency: Optional[int] = None) -> JobWorkerPool:
+    return JobWorkerPool(
+        database=db,
+        storage_client=state.storage_client,
+        service_factory=lambda session: build_file_service(session, state),
+        concurrency=concurrency,
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Shared clients for the API process, plus in-process job workers if enabled"""
+    configure_logging(settings.LOG_LEVEL)
+    await open_clients(app.state)
+    app.state.similarity_index = await asyncio.to_thread(
+        SimilarityIndex.load,
+        settings.SIMILARITY_INDEX_PATH,
+        candidates=settings.SIMILARITY_CANDIDATES,
+        hash_weight=settings.SIMILARITY_HASH_WEIGHT,
+    )
+    app.state.image_cache = await asyncio.to_thread(
+        DiskLRUCache, settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_BYTES
+    )
+    app.state.job_workers = None
+    if settings.JOB_WORKERS > 0:
+        app.state.job_workers = build_job_workers(app.state)
+        app.state.job_workers.start()
+    lag_monitor = None
+    if settings.EVENT_LOOP_LAG_INTERVAL > 0:
+        lag_monitor = asyncio.create_task(monitor_event_loop_lag(settings.EVENT_LOOP_LAG_INTERVAL))
+    try:
+        yield
+    finally:
+        if lag_monitor is not None:
+            lag_monitor.cancel()
+        if app.state.job_workers is not None:
+            await app.state.job_workers.stop()
+        if settings.SIMILARITY_INDEX_PATH:
+            try:
+                await asyncio.to_thread(app.state.similarity_index.save, settings.SIMILARITY_INDEX_PATH)
+            except Exception as e:
+                # rebuilt from the database on the next start
+                logger.warning("Failed to save similarity index: %s", e)
+        await close_clients(app.state)
 
 
 async def get_db_session() -> AsyncGenerator[AsyncSession, Any]:
     async for session in db.get_session():
         yield session
 
-async def get_openai_client() -> AsyncGenerator[OpenAIClient, Any]:
-    yield OpenAIClient(api_key=settings.OPENAI_API_KEY)
+async def get_openai_client(request: Request) -> Union[OpenAIClient, AsyncOpenAIClient]:
+    return request.app.state.openai_client
 
-async def get_storage_client():
-    yield StorageClient()
+async def get_description_cache(request: Request) -> DescriptionCache:
+    return request.app.state.description_cache
+
+async def get_storage_client(request: Request) -> StorageBackend:
+    return request.app.state.storage_client
+
+async def get_image_search(request: Request) -> CachedImageSearch:
+    return request.app.state.image_search
+
+async def get_job_workers(request: Request) -> Optional[JobWorkerPool]:
+    return request.app.state.job_workers
+
+async def get_similarity_index(request: Request) -> SimilarityIndex:
+    return request.app.state.similarity_index
+
+
+async def get_image_cache(request: Request) -> DiskLRUCache:
+    return request.app.state.image_cache
 
 
 async def get_file_repository(
@@ -37,11 +212,18 @@ async def get_image_repository(
     yield ImageRepository(session)
 
 
+async def get_job_repository(
+        session: AsyncSession = Depends(get_db_session),
+) -> AsyncGenerator[JobRepository, Any]:
+    yield JobRepository(session)
+
+
 async def get_file_service(
         file_repo: FileRepository = Depends(get_file_repository),
-        storage_client: StorageClient = Depends(get_storage_client),
+        storage_client: StorageBackend = Depends(get_storage_client),
         image_repo: ImageRepository = Depends(get_image_repository),
-        openai_client: OpenAIClient = Depends(get_openai_client)
+        openai_client: Union[OpenAIClient, AsyncOpenAIClient] = Depends(get_openai_client),
+        description_cache: DescriptionCache = Depends(get_description_cache),
 ) -> AsyncGenerator["FileService", Any]:
     yield FileService(
         file_repo=file_repo,
@@ -49,4 +231,42 @@ async def get_file_service(
         image_repo=image_repo,
         openai_client=openai_client,
         db=file_repo.db,
+        extraction_engine=extraction_engine,
+        description_cache=description_cache,
+    )
+
+
+async def get_job_service(
+        job_repo: JobRepository = Depends(get_job_repository),
+        file_repo: FileRepository = Depends(get_file_repository),
+        image_repo: ImageRepository = Depends(get_image_repository),
+        storage_client: StorageBackend = Depends(get_storage_client),
+) -> AsyncGenerator["JobService", Any]:
+    yield JobService(
+        db=job_repo.db,
+        job_repo=job_repo,
+        file_repo=file_repo,
+        image_repo=image_repo,
+        storage_service=storage_client,
     )
+
+
+async def get_similarity_service(
+        image_repo: ImageRepository = Depends(get_image_repository),
+        index: SimilarityIndex = Depends(get_similarity_index),
+) -> AsyncGenerator["SimilarityService", Any]:
+    yield SimilarityService(image_repo=image_repo, index=index)
+
+
+async def get_caption_service(
+        image_repo: ImageRepository = Depends(get_image_repository),
+) -> AsyncGenerator["CaptionService", Any]:
+    yield CaptionService(image_repo=image_repo)
+
+
+async def get_image_service(
+        image_repo: ImageRepository = Depends(get_image_repository),
+        storage_client: StorageBackend = Depends(get_storage_client),
+        cache: DiskLRUCache = Depends(get_image_cache),
+) -> AsyncGenerator["ImageService", Any]:
+    yield ImageService(image_repo=image_repo, storage_service=storage_client, cache=cache)
@@ -0,0 +1,50 @@
+"""
+Near-duplicate clustering job: `python -m app.dedupe [--threshold N] [--workers N] [--dry-run]`.
+
+Clusters stored images whose perceptual hashes differ in at most `threshold`
+bits, links each image to its cluster's canonical image and copies the
+canonical's description onto undescribed duplicates. Prints a JSON report
+including how many LLM calls were saved. Safe to rerun.
+"""
+import argparse
+import asyncio
+import json
+
+from app.config import settings
+from app.container import db
+from app.repositories.image_repo import ImageRepository
+from app.service.dedupe_service import DedupeService
+from app.utils.metrics import configure_logging
+from app.utils.near_duplicates import MAX_THRESHOLD
+
+
+async def run(threshold: int, workers: int, dry_run: bool) -> dict:
+    configure_logging(settings.LOG_LEVEL)
+    try:
+        async for session in db.get_session():
+            service = DedupeService(
+                db=session,
+                image_repo=ImageRepository(session),
+                threshold=threshold,
+                workers=workers,
+            )
+            return await service.run(dry_run=dry_run)
+    finally:
+        await db.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate images and reuse their descriptions")
+    parser.add_argument("--threshold", type=int, default=settings.DEDUPE_HAMMING_THRESHOLD,
+                        choices=range(MAX_THRESHOLD + 1), metavar=f"0-{MAX_THRESHOLD}",
+                        help="maximum Hamming distance between perceptual hashes")
+    parser.add_argument("--workers", type=int, default=settings.DEDUPE_WORKERS,
+                        help="clustering processes, 0 for one per CPU core")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    args = parser.parse_args()
+    report = asyncio.run(run(args.threshold, args.workers, args.dry_run))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
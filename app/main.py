@@ -1,12 +1,14 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
-from app.client.database import Database
+from app.client.database import get_database
+from app.container import lifespan
 from app.exceptions.custom_exception import CustomException, CustomHTTPException
 from app.routes.file_routes import router
+from app.utils.metrics import MetricsMiddleware, render_metrics
 
-app = FastAPI(title="Zedny API")
+app = FastAPI(title="Zedny API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +17,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so the latency includes the other middleware
+app.add_middleware(MetricsMiddleware)
 
 # ✅ Global Exception Handlers
 @app.exception_handler(CustomException)
@@ -53,9 +57,23 @@ async def general_exception_handler(request: Request, exc: Exception):
     )
 app.include_router(router)
 
-# ✅ Initialize DB
-db = Database()
+# ✅ Initialize DB (shared with the request dependencies)
+db = get_database()
 
+
+@app.get("/health/db-pool")
+async def db_pool_stats():
+    return db.pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of the stage and request metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+# The schema is managed by Alembic migrations (migrations/): run
+# `alembic upgrade head` before starting the app.
 # @app.on_event("startup")
 # async def on_startup():
 #     await db.create_tables()
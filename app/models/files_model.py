@@ -1,19 +1,36 @@
+import enum
 import uuid
 
-from sqlalchemy import Column, String, DateTime, func, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Index, Column, String, DateTime, func, Text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
 from app.client.database import Base
 
 
+class FileStatusEnum(str, enum.Enum):
+    processing = "processing"
+    completed = "completed"
+
+
 class FileModel(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        # keyset pagination order, see BaseRepository.get_page
+        Index("ix_files_created_at_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    file_name = Column(String(255), nullable=False, unique=True)
+    file_name = Column(String(255), nullable=False)
     course_name = Column(String(255), nullable=True)
 
+    # sha256 of the uploaded PDF: the idempotency key for re-uploads
+    content_hash = Column(String(64), nullable=True, unique=True)
+    status = Column(Text, nullable=False, default=FileStatusEnum.processing.value)
+
+    # audit trail of images the pre-filter dropped: [{filename, page_number, reason, content_hash}]
+    skipped_images = Column(JSONB, nullable=True)
+
     # metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
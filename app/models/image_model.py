@@ -1,7 +1,9 @@
 import enum
 import uuid
 
-from sqlalchemy import Column, ForeignKey, DateTime, func, Enum, Text
+from sqlalchemy import (
+    BigInteger, Index, Column, ForeignKey, DateTime, func, Enum, LargeBinary, Text, String, UniqueConstraint,
+)
 from sqlalchemy.dialects.postgresql import UUID
 
 from app.client.database import Base
@@ -12,15 +14,47 @@ class ImageTypeEnum(str, enum.Enum):
     image = "image"
 
 
+class ImageStatusEnum(str, enum.Enum):
+    pending = "pending"
+    uploaded = "uploaded"
+    described = "described"
+    failed = "failed"
+
+
 class ImageModel(Base):
     __tablename__ = "images"
+    __table_args__ = (
+        # keyset pagination order, see BaseRepository.get_page
+        Index("ix_images_created_at_id", "created_at", "id"),
+        # the same order within one file, see FileService.list_images
+        Index("ix_images_file_id_created_at_id", "file_id", "created_at", "id"),
+        # one row per extracted image of a file, so reprocessing resumes instead of duplicating
+        UniqueConstraint("file_id", "source_name", name="uq_images_file_id_source_name"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    file_id = Column(UUID(as_uuid=True), ForeignKey("files.id", ondelete="CASCADE"), nullable=False)
+    file_id = Column(UUID(as_uuid=True), ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True)
 
     description = Column(Text, nullable=True)
     type = Column(Enum(ImageTypeEnum), nullable=False, default=ImageTypeEnum.image)
-    status = Column(Text, nullable=False, default="pending")
+    # checkpoint: pending -> uploaded -> described, or failed
+    status = Column(Text, nullable=False, default=ImageStatusEnum.pending.value)
+    # name of the image within its file, e.g. page3_img1.png
+    source_name = Column(String(255), nullable=True)
+
+    # content addressing: identical images share one storage object
+    content_hash = Column(String(64), nullable=True, index=True)
+    storage_path = Column(Text, nullable=True)
+
+    # set when the pre-filter kept the image but flagged it for review
+    review_reason = Column(Text, nullable=True)
+
+    # similarity features, see app/utils/image_features.py: the 64-bit
+    # perceptual hash (as signed BIGINT) and the float16 descriptor bytes
+    phash = Column(BigInteger, nullable=True)
+    descriptor = Column(LargeBinary, nullable=True)
+    # canonical image of this one's near-duplicate cluster, see app/dedupe.py
+    duplicate_of = Column(UUID(as_uuid=True), ForeignKey("images.id", ondelete="SET NULL"), nullable=True, index=True)
 
     # metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,46 @@
+import enum
+import uuid
+
+from sqlalchemy import Index, Column, ForeignKey, String, DateTime, Integer, func, Text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+
+from app.client.database import Base
+
+
+class JobStatusEnum(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
+class ProcessingJobModel(Base):
+    __tablename__ = "processing_jobs"
+    __table_args__ = (
+        # workers claim the oldest claimable job, see JobRepository.claim_next
+        Index("ix_processing_jobs_status_created_at", "status", "created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    file_id = Column(UUID(as_uuid=True), ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True)
+    file_name = Column(String(255), nullable=False)
+
+    status = Column(Text, nullable=False, default=JobStatusEnum.queued.value)
+    # uploaded PDF, kept in storage until the job has stored every image
+    source_path = Column(Text, nullable=False)
+
+    # claim bookkeeping: a running job whose lease expired is claimable again
+    worker_id = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    # a requeued job is not claimed again before this, see JobWorkerPool._run_job
+    run_after = Column(DateTime(timezone=True), nullable=True)
+
+    result = Column(JSONB, nullable=True)
+    error = Column(JSONB, nullable=True)
+
+    # metadata
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,13 +1,47 @@
-from typing import TypeVar, Generic, Type, Optional, List, cast
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime
+from typing import TypeVar, Generic, Type, Optional, List, Sequence, Tuple, cast
+from sqlalchemy import insert, update, delete, tuple_, any_, bindparam, literal
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from uuid import UUID
 
 from app.client.database import Base
 from app.exceptions.repo_exception import RepoException
+from app.utils.metrics import timed
 
 T = TypeVar("T", bound=Base)
 
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """Opaque keyset cursor for the row (created_at, id)"""
+    payload = json.dumps({"c": created_at.isoformat(), "i": str(id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["c"]), UUID(payload["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise RepoException(
+            status_code=400,
+            detail="Invalid cursor",
+            additional_info={"error": str(e), "cursor": cursor}
+        )
+
+
+def _id_array(ids: List[UUID]):
+    """Bind ids as one array parameter, for `id = ANY(:ids)`"""
+    return any_(bindparam("ids", list(ids), type_=ARRAY(PG_UUID(as_uuid=True))))
+
 
 class BaseRepository(Generic[T]):
     def __init__(self, model: Type[T], db: AsyncSession):
@@ -27,11 +61,29 @@ class BaseRepository(Generic[T]):
                 additional_info={"error": str(e), "id": str(id)}
             )
 
+    async def get_many(self, ids: List[UUID]) -> List[T]:
+        """Fetch many rows with one `WHERE id = ANY(:ids)`, in the order of `ids`"""
+        if not ids:
+            return []
+        try:
+            result = await self.db.execute(
+                select(self.model).filter(self.model.id == _id_array(ids))
+            )
+            by_id = {obj.id: obj for obj in result.scalars().all()}
+            return [by_id[id] for id in ids if id in by_id]
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error retrieving objects",
+                additional_info={"error": str(e), "count": len(ids)}
+            )
+
     async def get_all(
         self,
         page: int = 1,
         limit: int = 10
     ) -> List[T]:
+        """Offset pagination; cost grows with the page number, prefer `get_page`"""
         try:
             stmt = select(self.model)
 
@@ -49,32 +101,101 @@ class BaseRepository(Generic[T]):
                 additional_info={"error": str(e), "page": page, "limit": limit}
             )
 
+    async def get_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        filters: Sequence = (),
+    ) -> Tuple[List[T], Optional[str]]:
+        """
+        Keyset pagination on (created_at, id): every page is an index range
+        scan no matter how deep it is. `filters` are extra WHERE criteria.
+        Returns the rows and the cursor of the next page, or None on the last page.
+        """
+        try:
+            stmt = (
+                select(self.model)
+                .filter(*filters)
+                .order_by(self.model.created_at, self.model.id)
+                .limit(limit + 1)
+            )
+            if cursor:
+                created_at, last_id = decode_cursor(cursor)
+                stmt = stmt.filter(
+                    tuple_(self.model.created_at, self.model.id) > tuple_(
+                        literal(created_at, self.model.created_at.type),
+                        literal(last_id, self.model.id.type),
+                    )
+                )
+
+            result = await self.db.execute(stmt)
+            rows = cast(List[T], result.scalars().all())
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+            return rows, next_cursor
+        except RepoException:
+            raise
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error retrieving objects",
+                additional_info={"error": str(e), "cursor": cursor, "limit": limit}
+            )
+
     async def create(self, obj_in: dict) -> T:
         try:
-            print('Processing file:', obj_in)
-            obj = self.model(**obj_in)
-            self.db.add(obj)
-            await self.db.flush()   # instead of commit
-            await self.db.refresh(obj)
+            with timed("db_insert") as stage:
+                stage.items = 1
+                obj = self.model(**obj_in)
+                self.db.add(obj)
+                await self.db.flush()   # instead of commit
+                await self.db.refresh(obj)
+            logger.debug("Created %s %s", self.model.__name__, obj.id)
             return obj
         except Exception as e:
-            print(e)
+            logger.warning("Error creating %s: %s", self.model.__name__, e)
             raise RepoException(
                 status_code=500,
                 detail="Error creating object",
                 additional_info={"error": str(e), "data": obj_in}
             )
 
+    async def create_many(self, objs_in: List[dict]) -> List[T]:
+        """
+        Insert many rows with a single INSERT ... RETURNING (batched by the
+        driver for very large inputs). Returned objects are in input order.
+        Rows should share the same keys so they are sent as one statement.
+        """
+        if not objs_in:
+            return []
+        try:
+            with timed("db_insert") as stage:
+                stage.items = len(objs_in)
+                result = await self.db.scalars(
+                    insert(self.model).returning(self.model, sort_by_parameter_order=True),
+                    objs_in,
+                )
+                return cast(List[T], result.all())
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error creating objects",
+                additional_info={"error": str(e), "count": len(objs_in)}
+            )
+
     async def update(self, id: UUID, obj_in: dict) -> Optional[T]:
+        """Single UPDATE ... RETURNING; the row is not loaded first"""
         try:
-            obj = await self.get(id)
-            if not obj:
-                return None
-            for key, value in obj_in.items():
-                setattr(obj, key, value)
-            await self.db.flush()   # instead of commit
-            await self.db.refresh(obj)
-            return obj
+            result = await self.db.execute(
+                update(self.model)
+                .where(self.model.id == id)
+                .values(**obj_in)
+                .returning(self.model)
+                .execution_options(populate_existing=True)
+            )
+            return result.scalars().first()
         except Exception as e:
             raise RepoException(
                 status_code=500,
@@ -82,14 +203,48 @@ class BaseRepository(Generic[T]):
                 additional_info={"error": str(e), "id": str(id), "data": obj_in}
             )
 
+    async def update_many(self, ids: List[UUID], obj_in: dict) -> int:
+        """Apply the same values to many rows in one statement; returns the row count"""
+        if not ids:
+            return 0
+        try:
+            result = await self.db.execute(
+                update(self.model)
+                .where(self.model.id == _id_array(ids))
+                .values(**obj_in)
+                .execution_options(synchronize_session=False)
+            )
+            return result.rowcount
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error updating objects",
+                additional_info={"error": str(e), "count": len(ids), "data": obj_in}
+            )
+
+    async def update_each(self, objs_in: List[dict]) -> None:
+        """
+        Apply different values to many rows in one executemany UPDATE; each
+        dict must carry the row's `id`
+        """
+        if not objs_in:
+            return
+        try:
+            await self.db.execute(update(self.model), objs_in)
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error updating objects",
+                additional_info={"error": str(e), "count": len(objs_in)}
+            )
+
     async def delete(self, id: UUID) -> bool:
+        """Single DELETE; the row is not loaded first"""
         try:
-            obj = await self.get(id)
-            if not obj:
-                return False
-            await self.db.delete(obj)
-            await self.db.flush()   # instead of commit
-            return True
+            result = await self.db.execute(
+                delete(self.model).where(self.model.id == id)
+            )
+            return result.rowcount > 0
         except Exception as e:
             raise RepoException(
                 status_code=500,
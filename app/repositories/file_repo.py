@@ -1,5 +1,10 @@
+from typing import Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
+from app.exceptions.repo_exception import RepoException
 from app.models.files_model import FileModel
 from app.repositories.base_repo import BaseRepository
 
@@ -7,3 +12,43 @@ from app.repositories.base_repo import BaseRepository
 class FileRepository(BaseRepository[FileModel]):
     def __init__(self, db: AsyncSession):
         super().__init__(FileModel, db)
+
+    async def get_by_content_hash(self, content_hash: str) -> Optional[FileModel]:
+        try:
+            result = await self.db.execute(
+                select(FileModel).filter(FileModel.content_hash == content_hash)
+            )
+            return result.scalars().first()
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error retrieving file by content hash",
+                additional_info={"error": str(e), "content_hash": content_hash}
+            )
+
+    async def get_or_create_by_content_hash(self, obj_in: dict) -> Tuple[FileModel, bool]:
+        """
+        Insert a file unless one with its content hash exists, with
+        `INSERT ... ON CONFLICT (content_hash) DO NOTHING RETURNING`, so
+        concurrent uploads of the same content end up with one row. Returns
+        the row and whether this call created it.
+        """
+        try:
+            result = await self.db.execute(
+                insert(FileModel)
+                .values(**obj_in)
+                .on_conflict_do_nothing(index_elements=[FileModel.content_hash])
+                .returning(FileModel)
+                .execution_options(populate_existing=True)
+            )
+            created = result.scalars().first()
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error creating file",
+                additional_info={"error": str(e), "data": obj_in}
+            )
+        if created is not None:
+            return created, True
+        # The conflicting insert has committed by now, so this sees its row
+        return await self.get_by_content_hash(obj_in["content_hash"]), False
@@ -1,9 +1,218 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, func, literal, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
-from app.models.image_model import ImageModel
-from app.repositories.base_repo import BaseRepository
+from app.exceptions.repo_exception import RepoException
+from app.models.image_model import ImageModel, ImageStatusEnum
+from app.repositories.base_repo import BaseRepository, decode_cursor, encode_cursor
 
 
 class ImageRepository(BaseRepository[ImageModel]):
     def __init__(self, db: AsyncSession):
         super().__init__(ImageModel, db)
+
+    async def get_storage_paths(self, content_hashes: List[str]) -> Dict[str, str]:
+        """Map each content hash whose upload completed to its storage path"""
+        try:
+            result = await self.db.execute(
+                select(ImageModel.content_hash, ImageModel.storage_path)
+                .filter(
+                    ImageModel.content_hash.in_(content_hashes),
+                    ImageModel.storage_path.is_not(None),
+                    ImageModel.status.in_((ImageStatusEnum.uploaded.value, ImageStatusEnum.described.value)),
+                )
+                .distinct(ImageModel.content_hash)
+            )
+            return {content_hash: storage_path for content_hash, storage_path in result.all()}
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error retrieving images by content hash",
+                additional_info={"error": str(e), "count": len(content_hashes)}
+            )
+
+    async def get_for_file(self, file_id: UUID) -> List[ImageModel]:
+        try:
+            result = await self.db.execute(
+                select(ImageModel).filter(ImageModel.file_id == file_id)
+            )
+            return list(result.scalars().all())
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error retrieving images of file",
+                additional_info={"error": str(e), "file_id": str(file_id)}
+            )
+
+    async def count_by_status(self, file_id: UUID) -> Dict[str, int]:
+        """Number of images of a file in each status"""
+        try:
+            result = await self.db.execute(
+                select(ImageModel.status, func.count())
+                .filter(ImageModel.file_id == file_id)
+                .group_by(ImageModel.status)
+            )
+            return {status: count for status, count in result.all()}
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error counting images by status",
+                additional_info={"error": str(e), "file_id": str(file_id)}
+            )
+
+    async def get_feature_page(
+            self,
+            cursor: Optional[str] = None,
+            limit: int = 5000,
+            since: Optional[datetime] = None,
+    ) -> Tuple[List[tuple], Optional[str]]:
+        """
+        (id, phash, descriptor) of images that have similarity features, in
+        keyset order on (created_at, id) after `cursor`, or from `since` on.
+        Returns the rows and the cursor of the last one (None if there are none).
+        """
+        try:
+            stmt = (
+                select(ImageModel.id, ImageModel.phash, ImageModel.descriptor, ImageModel.created_at)
+                .filter(
+                    ImageModel.phash.is_not(None),
+                    ImageModel.status != ImageStatusEnum.failed.value,
+                )
+                .order_by(ImageModel.created_at, ImageModel.id)
+                .limit(limit)
+            )
+            if cursor:
+                created_at, last_id = decode_cursor(cursor)
+                stmt = stmt.filter(
+                    tuple_(ImageModel.created_at, ImageModel.id) > tuple_(
+                        literal(created_at, ImageModel.created_at.type),
+                        literal(last_id, ImageModel.id.type),
+                    )
+                )
+            elif since is not None:
+                stmt = stmt.filter(ImageModel.created_at >= since)
+
+            rows = (await self.db.execute(stmt)).all()
+            last_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if rows else None
+            return [(row.id, row.phash, row.descriptor) for row in rows], last_cursor
+        except RepoException:
+            raise
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error retrieving image features",
+                additional_info={"error": str(e), "cursor": cursor, "limit": limit}
+            )
+
+    async def get_content_page(self, after: Optional[str] = None, limit: int = 50000) -> List[tuple]:
+        """
+        One row per distinct content hash after `after`, in content hash order:
+        (content_hash, phash, described, rows), where `described` tells if
+        any image with that content has a description.
+        """
+        try:
+            stmt = (
+                select(
+                    ImageModel.content_hash,
+                    func.min(ImageModel.phash),
+                    func.bool_or(ImageModel.description.is_not(None)),
+                    func.count(),
+                )
+                .filter(
+                    ImageModel.content_hash.is_not(None),
+                    ImageModel.phash.is_not(None),
+                    ImageModel.status != ImageStatusEnum.failed.value,
+                )
+                .group_by(ImageModel.content_hash)
+                .order_by(ImageModel.content_hash)
+                .limit(limit)
+            )
+            if after is not None:
+                stmt = stmt.filter(ImageModel.content_hash > after)
+            return [tuple(row) for row in (await self.db.execute(stmt)).all()]
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error retrieving image content hashes",
+                additional_info={"error": str(e), "after": after, "limit": limit}
+            )
+
+    async def get_representatives(self, content_hashes: List[str]) -> Dict[str, tuple]:
+        """
+        Map each content hash to one (id, description, type) of its images,
+        preferring a described one, then the oldest
+        """
+        if not content_hashes:
+            return {}
+        try:
+            result = await self.db.execute(
+                select(ImageModel.content_hash, ImageModel.id, ImageModel.description, ImageModel.type)
+                .filter(
+                    ImageModel.content_hash.in_(content_hashes),
+                    ImageModel.status != ImageStatusEnum.failed.value,
+                )
+                .order_by(
+                    ImageModel.content_hash,
+                    ImageModel.description.is_(None),
+                    ImageModel.created_at,
+                    ImageModel.id,
+                )
+                .distinct(ImageModel.content_hash)
+            )
+            return {row.content_hash: (row.id, row.description, row.type) for row in result.all()}
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error retrieving representative images",
+                additional_info={"error": str(e), "count": len(content_hashes)}
+            )
+
+    async def link_near_duplicates(self, links: List[dict]) -> None:
+        """
+        Point every image of each `member_hash` at `canonical_id`, and give the
+        undescribed uploaded ones the canonical's description when it has one.
+        Two executemany UPDATEs, whatever the number of links.
+        """
+        if not links:
+            return
+        table = ImageModel.__table__
+        try:
+            await self.db.execute(
+                update(table)
+                .where(table.c.content_hash == bindparam("member_hash"))
+                .values(duplicate_of=bindparam("canonical_id")),
+                [{"member_hash": link["member_hash"], "canonical_id": link["canonical_id"]} for link in links],
+            )
+            described = [link for link in links if link["description"] is not None]
+            if described:
+                await self.db.execute(
+                    update(table)
+                    .where(
+                        table.c.content_hash == bindparam("member_hash"),
+                        table.c.description.is_(None),
+                        table.c.status == ImageStatusEnum.uploaded.value,
+                    )
+                    .values(
+                        description=bindparam("canonical_description"),
+                        type=bindparam("canonical_type"),
+                        status=ImageStatusEnum.described.value,
+                    ),
+                    [
+                        {
+                            "member_hash": link["member_hash"],
+                            "canonical_description": link["description"],
+                            "canonical_type": link["type"],
+                        }
+                        for link in described
+                    ],
+                )
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error linking near-duplicate images",
+                additional_info={"error": str(e), "count": len(links)}
+            )
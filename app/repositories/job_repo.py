@@ -0,0 +1,151 @@
+from datetime import timedelta
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import update, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.exceptions.repo_exception import RepoException
+from app.models.job_model import JobStatusEnum, ProcessingJobModel
+from app.repositories.base_repo import BaseRepository
+
+
+class JobRepository(BaseRepository[ProcessingJobModel]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(ProcessingJobModel, db)
+
+    async def fail_abandoned(self, max_attempts: int) -> int:
+        """
+        Fail running jobs whose lease expired on their last attempt: the worker
+        died, and claim_next will not give them another one. Returns how many.
+        """
+        try:
+            result = await self.db.execute(
+                update(ProcessingJobModel)
+                .where(
+                    ProcessingJobModel.status == JobStatusEnum.running.value,
+                    ProcessingJobModel.locked_until < func.now(),
+                    ProcessingJobModel.attempts >= max_attempts,
+                )
+                .values(
+                    status=JobStatusEnum.failed.value,
+                    error={
+                        "error": "Worker stopped during the last attempt",
+                        "additional_info": {"max_attempts": max_attempts},
+                    },
+                    locked_until=None,
+                    finished_at=func.now(),
+                )
+            )
+            return result.rowcount
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error failing abandoned jobs",
+                additional_info={"error": str(e)}
+            )
+
+    async def claim_next(self, worker_id: str, lease_seconds: int, max_attempts: int) -> Optional[ProcessingJobModel]:
+        """
+        Claim the oldest queued job that is due, or a running job whose lease
+        expired, with one UPDATE over a `SELECT ... FOR UPDATE SKIP LOCKED`
+        subquery: workers on any node never wait on each other or claim the
+        same job.
+        """
+        try:
+            claimable = (
+                select(ProcessingJobModel.id)
+                .filter(
+                    or_(
+                        (ProcessingJobModel.status == JobStatusEnum.queued.value)
+                        & or_(ProcessingJobModel.run_after.is_(None), ProcessingJobModel.run_after <= func.now()),
+                        (ProcessingJobModel.status == JobStatusEnum.running.value)
+                        & (ProcessingJobModel.locked_until < func.now()),
+                    ),
+                    ProcessingJobModel.attempts < max_attempts,
+                )
+                .order_by(ProcessingJobModel.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await self.db.execute(
+                update(ProcessingJobModel)
+                .where(ProcessingJobModel.id == claimable)
+                .values(
+                    status=JobStatusEnum.running.value,
+                    worker_id=worker_id,
+                    attempts=ProcessingJobModel.attempts + 1,
+                    locked_until=func.now() + timedelta(seconds=lease_seconds),
+                    started_at=func.now(),
+                )
+                .returning(ProcessingJobModel)
+                .execution_options(populate_existing=True)
+            )
+            return result.scalars().first()
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error claiming job",
+                additional_info={"error": str(e), "worker_id": worker_id}
+            )
+
+    async def get_latest_for_file(self, file_id: UUID) -> Optional[ProcessingJobModel]:
+        try:
+            result = await self.db.execute(
+                select(ProcessingJobModel)
+                .filter(ProcessingJobModel.file_id == file_id)
+                .order_by(ProcessingJobModel.created_at.desc())
+                .limit(1)
+            )
+            return result.scalars().first()
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error retrieving job of file",
+                additional_info={"error": str(e), "file_id": str(file_id)}
+            )
+
+    async def finish(self, id: UUID, worker_id: str, obj_in: dict) -> bool:
+        """
+        Update a job only while `worker_id` still owns it (it is running and
+        has not been claimed by another worker). Returns whether it did.
+        """
+        try:
+            result = await self.db.execute(
+                update(ProcessingJobModel)
+                .where(
+                    ProcessingJobModel.id == id,
+                    ProcessingJobModel.worker_id == worker_id,
+                    ProcessingJobModel.status == JobStatusEnum.running.value,
+                )
+                .values(**obj_in)
+            )
+            return result.rowcount > 0
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error finishing job",
+                additional_info={"error": str(e), "id": str(id)}
+            )
+
+    async def extend_lease(self, id: UUID, worker_id: str, lease_seconds: int) -> bool:
+        """Push back the lease of a job this worker still owns"""
+        try:
+            result = await self.db.execute(
+                update(ProcessingJobModel)
+                .where(
+                    ProcessingJobModel.id == id,
+                    ProcessingJobModel.worker_id == worker_id,
+                    ProcessingJobModel.status == JobStatusEnum.running.value,
+                )
+                .values(locked_until=func.now() + timedelta(seconds=lease_seconds))
+            )
+            return result.rowcount > 0
+        except Exception as e:
+            raise RepoException(
+                status_code=500,
+                detail="Error extending job lease",
+                additional_info={"error": str(e), "id": str(id)}
+            )
@@ -1,29 +1,57 @@
-import os
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, UploadFile, File, Query
-from tavily import TavilyClient
+from fastapi import APIRouter, Depends, UploadFile, File, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, Response
 
+from app.client.description_cache import DescriptionCache
+from app.client.image_search import CachedImageSearch
 from app.config import settings
-from app.container import get_file_service
+from app.container import (
+    get_file_service, get_description_cache, get_image_search, get_job_service, get_job_workers,
+    get_similarity_service, get_caption_service, get_image_service, get_image_cache,
+)
 from app.exceptions.custom_exception import CustomHTTPException, CustomException
+from app.service.caption_service import CaptionService
 from app.service.file_service import FileService
+from app.service.image_service import ImageService
+from app.service.job_service import JobService
+from app.service.job_worker import JobWorkerPool
+from app.service.similarity_service import SimilarityService
+from app.utils.disk_cache import DiskLRUCache
+from app.utils.http_cache import http_date, is_not_modified
+from app.utils.upload_spool import file_sha256, spooled_upload
 
 router = APIRouter(prefix="/file", tags=["File"])
 
 
+class _ReleasingFileResponse(FileResponse):
+    """
+    FileResponse that hands its path to `release` once sent, or once sending
+    failed. A background task would be skipped on errors and 400/416 answers.
+    """
+
+    def __init__(self, path: str, release: Callable[[str], Awaitable[None]], **kwargs):
+        super().__init__(path, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.release(self.path)
+
+
 @router.post("/extract-image")
 async def extract_image(
         uploaded_file: UploadFile = File(...),
         service: FileService = Depends(get_file_service),
 ):
     try:
-        # Read file bytes
-        file_bytes = await uploaded_file.read()
-        # Get original extension
-        _, ext = os.path.splitext(uploaded_file.filename)
-        # Generate unique file name
-        # Upload to storage
-        files = service.save_images_from_pdf(file_bytes)
+        # Stream the upload to disk instead of reading it into memory
+        async with spooled_upload(uploaded_file) as file_path:
+            files = await service.save_images_from_pdf(file_path)
         return {"status": "success", "data": files}
     except CustomException as e:
         raise CustomHTTPException(
@@ -37,17 +65,172 @@ async def extract_image(
 @router.post("/process-file")
 async def process_file_pdf(
         pdf_file: UploadFile = File(...),
+        wait: bool = Query(False, description="Process within the request instead of queueing a job"),
         service: FileService = Depends(get_file_service),
+        job_service: JobService = Depends(get_job_service),
+        job_workers: Optional[JobWorkerPool] = Depends(get_job_workers),
 ):
     """
-    Upload a PDF, extract images, save file & image records,
-    and upload images to storage.
+    Upload a PDF (or a PPTX, DOCX or XLSX), extract images, save file & image
+    records, and upload images to storage.
+    By default the PDF is queued and 202 is returned with a job id to poll at
+    GET /file/jobs/{job_id}; `wait=true` processes it before responding.
     """
     try:
-        pdf_bytes = await pdf_file.read()
-        result = await service.process_file(
-            pdf_bytes, filename=pdf_file.filename
+        async with spooled_upload(pdf_file) as pdf_path:
+            if wait:
+                result = await service.process_file(
+                    pdf_path, filename=pdf_file.filename, content_hash=await file_sha256(pdf_path)
+                )
+                return {"status": "success", "data": result}
+            job = await job_service.submit(pdf_path, filename=pdf_file.filename)
+        if job_workers is not None:
+            job_workers.wake()
+        return JSONResponse(
+            status_code=202,
+            content=jsonable_encoder({
+                "status": "accepted",
+                "data": {**job, "status_url": f"/file/jobs/{job['job_id']}"},
+            }),
+        )
+    except CustomException as e:
+        raise CustomHTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            exception_type=e.exception_type,
+            additional_info=e.additional_info,
+        )
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(
+        job_id: UUID,
+        job_service: JobService = Depends(get_job_service),
+):
+    try:
+        return {"status": "success", "data": await job_service.get_status(job_id)}
+    except CustomException as e:
+        raise CustomHTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            exception_type=e.exception_type,
+            additional_info=e.additional_info,
         )
+
+
+@router.get("/images")
+async def list_images(
+        cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
+        limit: int = Query(50, ge=1, le=500),
+        file_id: Optional[UUID] = Query(None),
+        service: FileService = Depends(get_file_service),
+):
+    try:
+        return await service.list_images(cursor=cursor, limit=limit, file_id=file_id)
+    except CustomException as e:
+        raise CustomHTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            exception_type=e.exception_type,
+            additional_info=e.additional_info,
+        )
+
+
+@router.api_route("/images/{image_id}/content", methods=["GET", "HEAD"])
+async def get_image_content(
+        image_id: UUID,
+        request: Request,
+        size: Optional[str] = Query(None, description="Thumbnail size name; the original when omitted"),
+        service: ImageService = Depends(get_image_service),
+):
+    """
+    A stored image, or a thumbnail of it rendered on first request. Supports
+    If-None-Match / If-Modified-Since (304) and Range / If-Range (206), and
+    streams the file from disk.
+    """
+    try:
+        variant = await service.get_variant(image_id, size)
+        headers = {
+            "ETag": variant.etag,
+            "Cache-Control": f"public, max-age={settings.IMAGE_CACHE_MAX_AGE}",
+        }
+        if variant.last_modified is not None:
+            headers["Last-Modified"] = http_date(variant.last_modified)
+        if is_not_modified(request.headers, variant.etag, variant.last_modified):
+            return Response(status_code=304, headers=headers)
+        path, media_type = await service.open_variant(variant)
+        return _ReleasingFileResponse(path, service.release, media_type=media_type, headers=headers)
+    except CustomException as e:
+        raise CustomHTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            exception_type=e.exception_type,
+            additional_info=e.additional_info,
+        )
+
+
+@router.get("/images/content-cache")
+async def image_cache_stats(cache: DiskLRUCache = Depends(get_image_cache)):
+    return cache.stats()
+
+
+@router.post("/similar-images")
+async def similar_images_to_upload(
+        file: UploadFile = File(...),
+        k: int = Query(10, ge=1, le=100, description="Number of images to return"),
+        service: SimilarityService = Depends(get_similarity_service),
+):
+    """Top-k stored images most similar to the uploaded one"""
+    try:
+        return {"status": "success", "data": await service.similar_to_upload(await file.read(), k)}
+    except CustomException as e:
+        raise CustomHTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            exception_type=e.exception_type,
+            additional_info=e.additional_info,
+        )
+
+
+@router.get("/images/{image_id}/similar")
+async def similar_images_to_image(
+        image_id: UUID,
+        k: int = Query(10, ge=1, le=100, description="Number of images to return"),
+        service: SimilarityService = Depends(get_similarity_service),
+):
+    """Top-k stored images most similar to a stored one, excluding itself"""
+    try:
+        return {"status": "success", "data": await service.similar_to_image(image_id, k)}
+    except CustomException as e:
+        raise CustomHTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            exception_type=e.exception_type,
+            additional_info=e.additional_info,
+        )
+
+
+@router.post("/captions/correlate")
+async def correlate_captions(
+        caption_file: UploadFile = File(..., description="SRT or WebVTT transcript"),
+        image_id: Optional[UUID] = Query(None, description="Match captions against this image's description"),
+        text: Optional[str] = Query(None, description="Match captions against this text"),
+        at: Optional[float] = Query(None, ge=0, description="Return the captions shown at this second"),
+        start: Optional[float] = Query(None, ge=0, description="Start of the time range, in seconds"),
+        end: Optional[float] = Query(None, ge=0, description="End of the time range, in seconds"),
+        k: int = Query(5, ge=1, le=100, description="Number of matching captions to return"),
+        service: CaptionService = Depends(get_caption_service),
+):
+    """
+    Captions overlapping a time or range, and the captions that best match an
+    image description or text (restricted to the range when one is given).
+    """
+    try:
+        # Spooled to disk and parsed as a stream, so long lectures are not held twice
+        async with spooled_upload(caption_file) as caption_path:
+            result = await service.correlate(
+                caption_path, image_id=image_id, text=text, at=at, start=start, end=end, k=k
+            )
         return {"status": "success", "data": result}
     except CustomException as e:
         raise CustomHTTPException(
@@ -73,26 +256,36 @@ async def describe_image(file: UploadFile = File(...),
                                   exception_type="InternalServerError", additional_info={"error": str(e)})
 
 
+@router.get("/describe-image/cache")
+async def describe_image_cache_stats(cache: DescriptionCache = Depends(get_description_cache)):
+    return cache.stats()
+
+
 @router.get("/search-image")
 async def search_image(
-        query: str = Query(..., description="Search query"),
+        query: str = Query(..., min_length=1, description="Search query"),
         top_n: int = Query(1, ge=1, le=10, description="Number of images to return"),
+        search: CachedImageSearch = Depends(get_image_search),
 ):
     try:
-        client = TavilyClient(api_key=settings.TAVILY_API_KEY)
-        response = client.search(
-            query=query,
-            include_images=True,
-            max_results=top_n,
-        )
-
-        images = response.get("images", [])
-
+        images = await search.search(query, top_n)
         return {"images": images[:top_n]}
+    except CustomException as e:
+        raise CustomHTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            exception_type=e.exception_type,
+            additional_info=e.additional_info,
+        )
     except Exception as e:
         raise CustomHTTPException(
             status_code=500,
             detail="Failed to fetch images",
-            exception_type="TavilySearchError",
+            exception_type="ImageSearchError",
             additional_info={"error": str(e)},
         )
+
+
+@router.get("/search-image/cache")
+async def search_image_cache_stats(search: CachedImageSearch = Depends(get_image_search)):
+    return search.stats()
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from typing import Optional
+from uuid import UUID
+
+from app.exceptions.custom_exception import CustomException
+from app.exceptions.service_exception import ServiceException
+from app.repositories.image_repo import ImageRepository
+from app.utils.captions import CaptionIndex, iter_caption_file
+
+
+class CaptionService:
+    def __init__(self, image_repo: ImageRepository):
+        self.image_repo = image_repo
+
+    async def load_index(self, caption_path: str) -> CaptionIndex:
+        """Parse an SRT or VTT file off the event loop and index its cues"""
+        index = await asyncio.to_thread(lambda: CaptionIndex(iter_caption_file(caption_path)))
+        if not len(index):
+            raise ServiceException(
+                status_code=422,
+                detail="No captions found; expected an SRT or WebVTT file",
+            )
+        return index
+
+    async def correlate(
+            self,
+            caption_path: str,
+            image_id: Optional[UUID] = None,
+            text: Optional[str] = None,
+            at: Optional[float] = None,
+            start: Optional[float] = None,
+            end: Optional[float] = None,
+            k: int = 5,
+    ) -> dict:
+        """
+        Index a transcript and answer in one pass: the cues shown at `at` or
+        during [start, end], and the top-k cues matching `text` or the stored
+        description of `image_id` (within [start, end] when given).
+        """
+        try:
+            if start is not None and end is not None and start > end:
+                raise ServiceException(
+                    status_code=422,
+                    detail="start must not be after end",
+                    additional_info={"start": start, "end": end},
+                )
+            if image_id is not None:
+                image = await self.image_repo.get(image_id)
+                if image is None:
+                    raise ServiceException(
+                        status_code=404,
+                        detail="Image not found",
+                        additional_info={"image_id": str(image_id)},
+                    )
+                if not image.description:
+                    raise ServiceException(
+                        status_code=409,
+                        detail="Image has no description yet",
+                        additional_info={"image_id": str(image_id), "status": image.status},
+                    )
+                text = image.description
+
+            loading = time.perf_counter()
+            index = await self.load_index(caption_path)
+            indexed = time.perf_counter()
+
+            result = {"cue_count": len(index), "duration": index.duration}
+            if at is not None:
+                result["at"] = [cue.to_dict() for cue in index.overlapping(at)]
+            if start is not None or end is not None:
+                result["overlapping"] = [
+                    cue.to_dict() for cue in index.overlapping(
+                        start if start is not None else 0.0,
+                        end if end is not None else index.duration,
+                    )
+                ]
+            if text:
+                result["matches"] = [
+                    {**cue.to_dict(), "score": round(score, 4)}
+                    for cue, score in index.match(text, k=k, start=start, end=end)
+                ]
+            result["index_ms"] = round((indexed - loading) * 1000, 3)
+            result["query_ms"] = round((time.perf_counter() - indexed) * 1000, 3)
+            return result
+        except CustomException as e:
+            raise e
+        except Exception as e:
+            raise ServiceException(
+                status_code=500,
+                detail="Failed to correlate captions",
+                additional_info={"error": str(e)},
+            )
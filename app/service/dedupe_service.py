@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+from app.exceptions.custom_exception import CustomException
+from app.exceptions.service_exception import ServiceException
+from app.repositories.image_repo import ImageRepository
+from app.utils.near_duplicates import cluster_hashes, pick_canonicals
+
+
+class DedupeService:
+    """
+    Clusters stored images whose perceptual hashes are near-duplicates (the
+    same figure re-exported at another resolution or compression) and lets
+    each cluster reuse the description of one canonical image.
+
+    Images with the same content hash are exact copies and already share a
+    description, so clustering works on distinct content hashes; an LLM call
+    is counted per distinct content.
+    """
+
+    def __init__(
+            self,
+            db,
+            image_repo: ImageRepository,
+            threshold: Optional[int] = None,
+            workers: Optional[int] = None,
+            page_size: Optional[int] = None,
+            link_batch_size: int = 1000,
+    ):
+        self.db = db
+        self.image_repo = image_repo
+        self.threshold = settings.DEDUPE_HAMMING_THRESHOLD if threshold is None else threshold
+        self.workers = workers or settings.DEDUPE_WORKERS or None
+        self.page_size = page_size or settings.DEDUPE_PAGE_SIZE
+        self.link_batch_size = link_batch_size
+
+    async def _load(self):
+        """Content hashes (as 32-byte digests), hashes, described flags and row counts, page by page"""
+        digests, hashes, described, rows = [], [], [], []
+        after = None
+        while True:
+            page = await self.image_repo.get_content_page(after=after, limit=self.page_size)
+            if not page:
+                break
+            digests.append(np.frombuffer(b"".join(bytes.fromhex(row[0]) for row in page), dtype="S32"))
+            hashes.append(np.fromiter((row[1] for row in page), dtype=np.int64, count=len(page)).view(np.uint64))
+            described.append(np.fromiter((row[2] for row in page), dtype=bool, count=len(page)))
+            rows.append(np.fromiter((row[3] for row in page), dtype=np.int64, count=len(page)))
+            after = page[-1][0]
+            if len(page) < self.page_size:
+                break
+        if not digests:
+            return (np.empty(0, dtype="S32"), np.empty(0, dtype=np.uint64),
+                    np.empty(0, dtype=bool), np.empty(0, dtype=np.int64))
+        return np.concatenate(digests), np.concatenate(hashes), np.concatenate(described), np.concatenate(rows)
+
+    async def run(self, dry_run: bool = False) -> dict:
+        try:
+            start = time.perf_counter()
+            digests, hashes, described, rows = await self._load()
+            loaded = time.perf_counter()
+
+            labels = await asyncio.to_thread(
+                cluster_hashes, hashes, self.threshold, self.workers, settings.DEDUPE_WORK_DIR
+            )
+            canonical = pick_canonicals(hashes, labels, self.threshold, described, rows)
+            clustered = time.perf_counter()
+
+            members = np.flatnonzero(canonical != np.arange(len(hashes)))
+            canonicals = np.unique(canonical[members])
+            member_described = described[members]
+            canonical_described = described[canonical[members]]
+            report = {
+                "threshold": self.threshold,
+                "images": int(rows.sum()),
+                "distinct_images": len(hashes),
+                "clusters": len(canonicals),
+                "near_duplicates": len(members),
+                # undescribed duplicates that take the canonical's description instead
+                "llm_calls_saved": int(np.count_nonzero(~member_described & canonical_described)),
+                # duplicates that were already described separately
+                "redundant_descriptions": int(np.count_nonzero(member_described)),
+                # duplicates waiting for their canonical to be described; a later run links them
+                "awaiting_canonical_description": int(np.count_nonzero(~member_described & ~canonical_described)),
+                "dry_run": dry_run,
+                "load_seconds": round(loaded - start, 3),
+                "cluster_seconds": round(clustered - loaded, 3),
+            }
+            if not dry_run:
+                await self._link(digests, canonical, members)
+            report["total_seconds"] = round(time.perf_counter() - start, 3)
+            return report
+        except CustomException as e:
+            await self.db.rollback()
+            raise e
+        except Exception as e:
+            await self.db.rollback()
+            raise ServiceException(
+                status_code=500,
+                detail="Near-duplicate clustering failed",
+                additional_info={"error": str(e)},
+            )
+
+    async def _link(self, digests: np.ndarray, canonical: np.ndarray, members: np.ndarray) -> None:
+        """Write the clusters in batches ordered by canonical, committing each batch"""
+        members = members[np.argsort(canonical[members], kind="stable")]
+        for start in range(0, len(members), self.link_batch_size):
+            batch = members[start:start + self.link_batch_size]
+            canonical_hashes = {int(c): digests[c].hex() for c in np.unique(canonical[batch])}
+            representatives = await self.image_repo.get_representatives(list(canonical_hashes.values()))
+            links = []
+            for member in batch:
+                representative = representatives.get(canonical_hashes[int(canonical[member])])
+                if representative is None:
+                    # deleted since it was loaded
+                    continue
+                canonical_id, description, image_type = representative
+                links.append({
+                    "member_hash": digests[member].hex(),
+                    "canonical_id": canonical_id,
+                    "description": description,
+                    "type": image_type,
+                })
+            await self.image_repo.link_near_duplicates(links)
+            await self.db.commit()
@@ -1,12 +1,67 @@
-import fitz
+import asyncio
+import logging
 import os
+import time
+import uuid
+from typing import Dict, Optional, Tuple, Union
+from uuid import UUID
 
-from app.client.openai_client import OpenAIClient
-from app.client.storage import StorageClient
+from app.client.description_cache import DescriptionCache
+from app.client.openai_client import OpenAIClient, AsyncOpenAIClient, GeneratedVisualItemModel
+from app.client.storage import StorageBackend
+from app.config import settings
+from app.constant_manager import image_description_prompt_version
 from app.exceptions.custom_exception import CustomException
 from app.exceptions.service_exception import ServiceException
+from app.models.files_model import FileStatusEnum
+from app.models.image_model import ImageModel, ImageStatusEnum
 from app.repositories.file_repo import FileRepository
 from app.repositories.image_repo import ImageRepository
+from app.utils.extraction_engine import PdfExtractionEngine, PdfSource, detect_document_format
+from app.utils.image_features import compute_features, descriptor_to_db, phash_to_db
+from app.utils.image_filter import FilterVerdict, classify_image, classify_images
+from app.utils.image_preprocess import media_type, vision_signature
+from app.utils.metrics import observe, timed
+
+logger = logging.getLogger(__name__)
+
+
+def _analyze_images(images: list[bytes]) -> tuple[list, list]:
+    """Pre-filter decisions, and similarity features of the images that are kept"""
+    decisions = classify_images(images)
+    features = [
+        compute_features(image_bytes) if decision.verdict != FilterVerdict.skip else None
+        for image_bytes, decision in zip(images, decisions)
+    ]
+    return decisions, features
+
+
+class _ProcessingRun:
+    """State shared by the batches of one process_file run"""
+
+    def __init__(self, upload_slots: asyncio.Semaphore, describe_slots: asyncio.Semaphore, resume: dict):
+        self.upload_slots = upload_slots
+        self.describe_slots = describe_slots
+        # rows from an earlier run by source name, popped as their images come by again
+        self.resume = resume
+        # content hash -> storage path where that content is, or is being uploaded
+        self.uploads: Dict[str, str] = {}
+        # storage path -> upload task, for objects uploaded by this run
+        self.upload_tasks: Dict[str, asyncio.Task] = {}
+        # content hash -> description task
+        self.descriptions: Dict[str, asyncio.Task] = {}
+        self.stored: list[dict] = []
+        # stored images whose upload or description is still outstanding
+        self.unresolved: list[dict] = []
+        # resumed rows pointed at another object holding the same content
+        self.relinked: list[dict] = []
+        self.failed_images: list[dict] = []
+        self.description_errors: list[dict] = []
+        self.skipped_images: list[dict] = []
+        self.resumed_count = 0
+
+    def tasks(self) -> list[asyncio.Task]:
+        return [*self.upload_tasks.values(), *self.descriptions.values()]
 
 
 class FileService:
@@ -15,79 +70,61 @@ class FileService:
             db,
             file_repo: FileRepository,
             image_repo: ImageRepository,
-            storage_service: StorageClient,
-            openai_client: OpenAIClient,
+            storage_service: StorageBackend,
+            openai_client: Union[OpenAIClient, AsyncOpenAIClient],
+            max_concurrency: Optional[int] = None,
+            extraction_window: Optional[int] = None,
+            insert_batch_size: Optional[int] = None,
+            extraction_engine: Optional[PdfExtractionEngine] = None,
+            description_cache: Optional[DescriptionCache] = None,
     ):
         self.db = db
         self.file_repo = file_repo
         self.storage_service = storage_service
         self.image_repo = image_repo
         self.openai_client = openai_client
+        self.max_concurrency = max_concurrency or settings.PROCESS_CONCURRENCY
+        self.extraction_window = extraction_window or settings.EXTRACTION_WINDOW
+        self.insert_batch_size = insert_batch_size or settings.DB_INSERT_BATCH_SIZE
+        self.extraction_engine = extraction_engine or PdfExtractionEngine(
+            max_workers=settings.EXTRACTION_MAX_WORKERS,
+            parallel_threshold=settings.EXTRACTION_PARALLEL_THRESHOLD,
+            pages_per_chunk=settings.EXTRACTION_PAGES_PER_CHUNK,
+        )
+        self.description_cache = description_cache
 
-    def save_images_from_pdf(self, pdf_bytes: bytes, output_dir: str = "images") -> list[str]:
+    async def save_images_from_pdf(self, pdf_source: PdfSource, output_dir: str = "images") -> list[str]:
         """
-        Extract images from a PDF given as bytes and save them locally.
+        Extract images from a PDF given as a file path or bytes and save them locally.
         Returns a list of file paths where the images were saved.
         """
+        images = await self.extraction_engine.extract_async(pdf_source)
+        return await asyncio.to_thread(self._write_images, images, output_dir)
+
+    @staticmethod
+    def _write_images(images: list[dict], output_dir: str) -> list[str]:
         saved_files = []
 
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
 
-        # Open PDF in memory
-        pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-
-        for page_number in range(len(pdf_doc)):
-            page = pdf_doc[page_number]
-            images = page.get_images(full=True)
-
-            for img_index, img in enumerate(images, start=1):
-                xref = img[0]
-                base_image = pdf_doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                filename = f"page{page_number + 1}_img{img_index}.{image_ext}"
+        for img in images:
+            file_path = os.path.join(output_dir, img["filename"])
 
-                file_path = os.path.join(output_dir, filename)
+            # Save image to disk
+            with open(file_path, "wb") as f:
+                f.write(img["image_bytes"])
 
-                # Save image to disk
-                with open(file_path, "wb") as f:
-                    f.write(image_bytes)
+            saved_files.append(file_path)
 
-                saved_files.append(file_path)
-
-        pdf_doc.close()
         return saved_files
 
-    def extract_images_from_pdf(self, pdf_bytes: bytes):
+    def extract_images_from_pdf(self, pdf_source: PdfSource):
         """
-        Extract images from a PDF given as bytes.
-        Returns a list of dicts: { 'image_bytes', 'filename', 'extension' }
+        Extract images from a PDF given as a file path or bytes.
+        Returns a list of dicts: { 'image_bytes', 'filename', 'extension', 'page_number' }
         """
-        images_list = []
-
-        # Open PDF in memory
-        pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-
-        for page_number in range(len(pdf_doc)):
-            page = pdf_doc[page_number]
-            images = page.get_images(full=True)
-
-            for img_index, img in enumerate(images, start=1):
-                xref = img[0]
-                base_image = pdf_doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                filename = f"page{page_number + 1}_img{img_index}.{image_ext}"
-
-                images_list.append({
-                    "image_bytes": image_bytes,
-                    "filename": filename,
-                    "extension": image_ext
-                })
-
-        pdf_doc.close()
-        return images_list
+        return self.extraction_engine.extract(pdf_source)
 
     async def create_file(self):
         try:
@@ -109,7 +146,7 @@ class FileService:
 
     async def upload_file_to_storage(self, file: bytes, file_name: str):
         try:
-            file_url = self.storage_service.upload_file(
+            file_url = await self.storage_service.upload_file(
                 bucket_name="files",
                 file_name=file_name,
                 content=file
@@ -125,51 +162,418 @@ class FileService:
                 additional_info={"error": str(e)},
             )
 
-    async def process_file(self, file_bytes: bytes, filename: str, ) -> dict:
+    async def process_file(
+            self,
+            file_source: PdfSource,
+            filename: str,
+            file_id: Optional[UUID] = None,
+            content_hash: Optional[str] = None,
+    ) -> dict:
+        """
+        Extract, store, upload and describe the images of a PDF, PPTX, DOCX or
+        XLSX (told apart by content), committing after every batch. Each image
+        row is a checkpoint moving from pending to uploaded to described, so
+        processing the same file again resumes: finished images are left alone
+        and uploads overwrite the paths already recorded, leaving no orphaned
+        objects.
+        `content_hash` of the document is the idempotency key when no `file_id` is
+        given: an exact re-upload of a processed file returns its summary
+        without doing any work, and one of an unfinished file resumes it.
+        """
         try:
-            print('Processing file:', filename)
-            # 2️⃣ Insert PDF metadata in FileRepository
-            file_record = await self.file_repo.create(
-                {
-                    "file_name": filename,
-                }
+            logger.info("Processing file %s", filename)
+            # 1️⃣ Reject unsupported documents before anything is recorded
+            document_format = await asyncio.to_thread(detect_document_format, file_source)
+            logger.debug("Detected document format %s", document_format)
+
+            # 2️⃣ Insert PDF metadata in FileRepository, or find the file to resume
+            if file_id is None:
+                file_record = await self._get_or_create_file(filename, content_hash)
+            else:
+                file_record = await self.file_repo.get(file_id)
+                if file_record is None:
+                    raise ServiceException(
+                        status_code=404,
+                        detail="File not found",
+                        additional_info={"file_id": str(file_id)},
+                    )
+            file_id = file_record.id
+            if file_record.status == FileStatusEnum.completed:
+                return await self._file_summary(file_record)
+
+            resume = {image.source_name: image for image in await self.image_repo.get_for_file(file_id)}
+            # Rows are stamped with their transaction's start time; end this one
+            # so the first batch isn't stamped before its images are extracted
+            await self.db.commit()
+            if resume:
+                logger.info("Resuming file %s with %d images already recorded", file_id, len(resume))
+
+            # 3️⃣ Stream images out of the PDF in batches: each batch is
+            # classified, deduplicated and inserted with one round-trip each,
+            # then its uploads and descriptions fan out. Waiting for a free slot
+            # before continuing applies backpressure to extraction.
+            run = _ProcessingRun(
+                upload_slots=asyncio.Semaphore(self.max_concurrency),
+                describe_slots=asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY),
+                resume=resume,
+            )
+            batch = []
+            # time spent waiting on extraction, excluding the work done per batch
+            extraction_seconds = 0.0
+            extracted = 0
+            resumed_at = time.perf_counter()
+            try:
+                async for img in self.extraction_engine.aiter_images(
+                        file_source, window=self.extraction_window
+                ):
+                    extraction_seconds += time.perf_counter() - resumed_at
+                    extracted += 1
+                    batch.append(img)
+                    if len(batch) >= self.insert_batch_size:
+                        await self._store_batch(file_id, batch, run)
+                        await self._checkpoint(run)
+                        batch = []
+                    resumed_at = time.perf_counter()
+                extraction_seconds += time.perf_counter() - resumed_at
+                observe("extraction", extraction_seconds, items=extracted)
+                extraction_seconds = None
+                if batch:
+                    await self._store_batch(file_id, batch, run)
+            except BaseException as e:
+                if extraction_seconds is not None:
+                    observe(
+                        "extraction", extraction_seconds, items=extracted,
+                        outcome="cancelled" if isinstance(e, asyncio.CancelledError) else "error",
+                    )
+                tasks = run.tasks()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+            # 4️⃣ Wait for the remaining work; images linked to a failed upload fail with it
+            await asyncio.gather(*run.tasks())
+            await self._checkpoint(run)
+            logger.info("Extracted %d images from file %s", len(run.stored) + len(run.skipped_images), file_id)
+
+            # Record what the pre-filter dropped so it can be audited later
+            values = {"skipped_images": run.skipped_images or None}
+            if not run.failed_images and not run.description_errors:
+                values["status"] = FileStatusEnum.completed.value
+            await self.file_repo.update(file_id, values)
+            await self.db.commit()
+
+            return {
+                "file_id": file_id,
+                "image_count": len(run.stored) - len(run.failed_images),
+                "deduplicated_count": sum(1 for image in run.stored if image["linked"]),
+                "resumed_count": run.resumed_count,
+                "described_count": sum(
+                    1 for image in run.stored if image["status"] == ImageStatusEnum.described
+                ),
+                "failed_images": run.failed_images,
+                "description_errors": run.description_errors,
+                "skipped_images": run.skipped_images,
+            }
+        except CustomException as e:
+            logger.warning("Processing file %s failed: %s", filename, e.detail)
+            await self.db.rollback()
+            raise e
+
+    async def _get_or_create_file(self, filename: str, content_hash: Optional[str]):
+        if content_hash is None:
+            file_record = await self.file_repo.create({"file_name": filename, "content_hash": None})
+            await self.db.commit()
+            logger.info("Created file record %s", file_record.id)
+            return file_record
+
+        file_record = await self.file_repo.get_by_content_hash(content_hash)
+        if file_record is None:
+            # ON CONFLICT keeps a concurrent upload of the same content from failing here
+            file_record, created = await self.file_repo.get_or_create_by_content_hash(
+                {"file_name": filename, "content_hash": content_hash}
             )
-            print('File record created with ID:', file_record.id)
-
-            # 3️⃣ Extract images from PDF
-            images = self.extract_images_from_pdf(file_bytes)
-            print('Images extracted from PDF:', len(images))
-            for img in images:
-                image_description = "description"
-                image_type = "image"
-                image_code = "code"
-                print("Uploading image:", img["filename"])
-                # Insert image metadata in ImageRepository
-                img_record = await self.image_repo.create(
+            await self.db.commit()
+            if created:
+                logger.info("Created file record %s", file_record.id)
+                return file_record
+        logger.info("Found file %s with the same content", file_record.id)
+        return file_record
+
+    async def _file_summary(self, file_record) -> dict:
+        """Result for a file that was already processed completely"""
+        counts = await self.image_repo.count_by_status(file_record.id)
+        return {
+            "file_id": file_record.id,
+            "image_count": sum(counts.values()) - counts.get(ImageStatusEnum.failed.value, 0),
+            "images": counts,
+            "skipped_images": file_record.skipped_images or [],
+            "already_processed": True,
+        }
+
+    async def _store_batch(self, file_id: UUID, batch: list[dict], run: "_ProcessingRun") -> None:
+        """
+        Classify a batch of extracted images, insert and commit rows for new
+        ones and start the uploads and descriptions each image still needs. An image whose
+        content hash is already stored, or uploaded earlier in this run, links
+        to that object instead of being uploaded again.
+        """
+        decisions, features = await asyncio.to_thread(_analyze_images, [img["image_bytes"] for img in batch])
+
+        kept = []
+        for img, decision, image_features in zip(batch, decisions, features):
+            if decision.verdict == FilterVerdict.skip:
+                run.skipped_images.append({
+                    "filename": img["filename"],
+                    "page_number": img.get("page_number"),
+                    "reason": decision.reason,
+                    "content_hash": img["content_hash"],
+                })
+            else:
+                kept.append((img, decision, image_features))
+        if not kept:
+            return
+
+        new_hashes = list({
+            img["content_hash"] for img, _, _ in kept
+            if img["content_hash"] not in run.uploads and img["filename"] not in run.resume
+        })
+        if new_hashes:
+            existing = await self.image_repo.get_storage_paths(new_hashes)
+            run.uploads.update(existing)
+
+        rows = []
+        to_upload = []
+        to_describe = {}
+        batch_stored = []
+        for img, decision, image_features in kept:
+            content_hash = img["content_hash"]
+            previous = run.resume.pop(img["filename"], None)
+            if previous is not None:
+                # Checkpointed by an earlier run: keep its id, path and progress
+                image_id, storage_path, status = previous.id, previous.storage_path, ImageStatusEnum(previous.status)
+                run.resumed_count += 1
+            else:
+                image_id, storage_path, status = uuid.uuid4(), None, ImageStatusEnum.pending
+
+            linked = content_hash in run.uploads
+            if status in (ImageStatusEnum.uploaded, ImageStatusEnum.described):
+                run.uploads.setdefault(content_hash, storage_path)
+            elif linked:
+                if storage_path is not None and storage_path != run.uploads[content_hash]:
+                    run.relinked.append({"id": image_id, "storage_path": run.uploads[content_hash]})
+                storage_path = run.uploads[content_hash]
+            else:
+                storage_path = storage_path or f"{str(file_id)}/{str(image_id)}"
+                run.uploads[content_hash] = storage_path
+                # a resumed image may have been uploaded before the earlier run stopped
+                to_upload.append((img, storage_path, previous is not None))
+
+            if (
+                    status != ImageStatusEnum.described
+                    and settings.PROCESS_DESCRIBE_IMAGES
+                    and content_hash not in run.descriptions
+            ):
+                to_describe[content_hash] = img["image_bytes"]
+
+            if previous is None:
+                rows.append({
+                    "id": image_id,
+                    "file_id": file_id,
+                    "source_name": img["filename"],
+                    "description": None,
+                    "type": "image",
+                    "content_hash": content_hash,
+                    "storage_path": storage_path,
+                    "review_reason": decision.reason if decision.verdict == FilterVerdict.review else None,
+                    "phash": phash_to_db(image_features.phash) if image_features else None,
+                    "descriptor": descriptor_to_db(image_features.descriptor) if image_features else None,
+                })
+            batch_stored.append({
+                "filename": img["filename"],
+                "image_id": image_id,
+                "content_hash": content_hash,
+                "storage_path": storage_path,
+                "linked": linked,
+                "status": status,
+            })
+
+        await self.image_repo.create_many(rows)
+        # Commit before the uploads and descriptions start, so the rows become
+        # visible (e.g. to the similarity index catch-up) right after the
+        # created_at they were stamped with, not minutes later
+        await self.db.commit()
+        run.stored.extend(batch_stored)
+        run.unresolved.extend(image for image in batch_stored if image["status"] != ImageStatusEnum.described)
+
+        for img, storage_path, upsert in to_upload:
+            await run.upload_slots.acquire()
+            run.upload_tasks[storage_path] = asyncio.create_task(
+                self._upload_image(storage_path, img["image_bytes"], run.upload_slots, upsert=upsert)
+            )
+        for content_hash, image_bytes in to_describe.items():
+            await run.describe_slots.acquire()
+            upload = run.upload_tasks.get(run.uploads.get(content_hash))
+            run.descriptions[content_hash] = asyncio.create_task(
+                self._describe_image(image_bytes, run.describe_slots, upload)
+            )
+
+    async def _checkpoint(self, run: "_ProcessingRun") -> None:
+        """
+        Move images whose upload or description finished to their next status
+        and commit, so an interrupted run resumes from here. Uses one UPDATE
+        per status plus executemany UPDATEs for per-row values.
+        """
+        uploaded_ids = []
+        failed_ids = []
+        described_rows = []
+        waiting = []
+        for image in run.unresolved:
+            newly_uploaded = False
+            if image["status"] in (ImageStatusEnum.pending, ImageStatusEnum.failed):
+                task = run.upload_tasks.get(image["storage_path"])
+                if task is not None and not task.done():
+                    waiting.append(image)
+                    continue
+                error = task.result() if task is not None else None
+                if error is not None:
+                    image["status"] = ImageStatusEnum.failed
+                    failed_ids.append(image["image_id"])
+                    run.failed_images.append({"filename": image["filename"], **error})
+                    continue
+                image["status"] = ImageStatusEnum.uploaded
+                newly_uploaded = True
+
+            task = run.descriptions.get(image["content_hash"])
+            if task is not None and not task.done():
+                waiting.append(image)
+                if newly_uploaded:
+                    uploaded_ids.append(image["image_id"])
+                continue
+            outcome = task.result() if task is not None else None
+            if outcome is None or "error" in outcome:
+                # Stays uploaded; a later run describes it
+                if newly_uploaded:
+                    uploaded_ids.append(image["image_id"])
+                if outcome is not None:
+                    run.description_errors.append({"filename": image["filename"], **outcome})
+                continue
+            image["status"] = ImageStatusEnum.described
+            described_rows.append({
+                "id": image["image_id"],
+                "description": outcome["description"],
+                "type": outcome["type"],
+                "status": ImageStatusEnum.described.value,
+            })
+        run.unresolved = waiting
+
+        with timed("db_checkpoint") as stage:
+            stage.items = len(run.relinked) + len(uploaded_ids) + len(failed_ids) + len(described_rows)
+            await self.image_repo.update_each(run.relinked)
+            run.relinked = []
+            await self.image_repo.update_many(uploaded_ids, {"status": ImageStatusEnum.uploaded.value})
+            # Failed rows are kept out of content-hash lookups
+            await self.image_repo.update_many(failed_ids, {"status": ImageStatusEnum.failed.value})
+            await self.image_repo.update_each(described_rows)
+            await self.db.commit()
+
+    async def _upload_image(
+            self,
+            storage_path: str,
+            content: bytes,
+            semaphore: asyncio.Semaphore,
+            upsert: bool = False,
+    ) -> Optional[dict]:
+        """
+        Upload one image and release the caller-acquired semaphore slot.
+        Returns None on success or an error entry.
+        """
+        try:
+            await self.storage_service.upload_file(
+                bucket_name="files",
+                file_name=storage_path,
+                content=content,
+                upsert=upsert,
+                # image paths have no extension to guess the type from
+                content_type=media_type(content),
+            )
+            return None
+        except CustomException as e:
+            logger.warning("Upload of %s failed: %s", storage_path, e.detail)
+            return {"error": e.detail, "additional_info": e.additional_info}
+        except Exception as e:
+            logger.warning("Upload of %s failed: %s", storage_path, e)
+            return {"error": str(e)}
+        finally:
+            semaphore.release()
+
+    async def _describe_image(
+            self,
+            image_bytes: bytes,
+            semaphore: asyncio.Semaphore,
+            upload: Optional[asyncio.Task] = None,
+    ) -> Optional[dict]:
+        """
+        Describe one image once its `upload`, if any, has succeeded, and release
+        the caller-acquired semaphore slot. Returns the column values, an error
+        entry, or None if the upload failed: the image stays undescribed so the
+        run that stores it does not pay for a second description.
+        """
+        try:
+            if upload is not None and await upload is not None:
+                return None
+            description, _ = await self._generate_description(image_bytes)
+            return {
+                "description": description.description,
+                "type": "chart" if description.type == "chart" else "image",
+            }
+        except CustomException as e:
+            logger.warning("Image description failed: %s", e.detail)
+            return {"error": e.detail, "additional_info": e.additional_info}
+        except Exception as e:
+            logger.warning("Image description failed: %s", e)
+            return {"error": str(e)}
+        finally:
+            semaphore.release()
+
+    async def list_images(self, cursor: Optional[str] = None, limit: int = 50,
+                          file_id: Optional[UUID] = None) -> dict:
+        try:
+            filters = [ImageModel.file_id == file_id] if file_id else []
+            images, next_cursor = await self.image_repo.get_page(cursor=cursor, limit=limit, filters=filters)
+            return {
+                "images": [
                     {
-                        "file_id": str(file_record.id),
-                        "description": image_description,
-                        "type": image_type,
-                        "code": image_code,
+                        "id": image.id,
+                        "file_id": image.file_id,
+                        "type": image.type,
+                        "status": image.status,
+                        "description": image.description,
+                        "content_hash": image.content_hash,
+                        "created_at": image.created_at,
                     }
-                )
-
-                # Upload image to storage
-                self.storage_service.upload_file(
-                    bucket_name="files",
-                    file_name=f"{str(file_record.id)}/{str(img_record.id)}",
-                    content=img["image_bytes"]
-                )
-            return {"file_id": file_record.id, "image_count": len(images)}
+                    for image in images
+                ],
+                "next_cursor": next_cursor,
+            }
         except CustomException as e:
-            print(e)
             raise e
+        except Exception as e:
+            raise ServiceException(
+                status_code=500,
+                detail="Failed to list images",
+                additional_info={"error": str(e)},
+            )
 
     async def image_description(self, image_bytes: bytes) -> dict:
         try:
-            # Call OpenAI client to get image description
-            description = self.openai_client.image_description(image_bytes=image_bytes)
-            return {"description": description, "type": "image"}
+            decision = await asyncio.to_thread(classify_image, image_bytes)
+            if decision.verdict == FilterVerdict.skip:
+                logger.debug("Skipping image description: %s", decision.reason)
+                return {"description": None, "type": "image", "skipped": True, "reason": decision.reason}
+
+            description, cached = await self._generate_description(image_bytes)
+            return {"description": description, "type": "image", "cached": cached}
         except CustomException as e:
             raise e
         except Exception as e:
@@ -178,3 +582,28 @@ class FileService:
                 detail="Failed to get image description",
                 additional_info={"error": str(e)},
             )
+
+    async def _generate_description(self, image_bytes: bytes) -> Tuple[GeneratedVisualItemModel, bool]:
+        """Describe an image through the description cache; returns (description, cached)"""
+        model = self.openai_client.model
+        cache_key = None
+        if self.description_cache is not None:
+            cache_key = self.description_cache.make_key(
+                image_bytes,
+                model=model,
+                prompt_version=f"{image_description_prompt_version}:{vision_signature()}",
+            )
+            cached = await self.description_cache.get(cache_key)
+            if cached is not None:
+                return GeneratedVisualItemModel.model_validate_json(cached), True
+
+        # Call OpenAI client to get image description, off the event loop
+        if isinstance(self.openai_client, AsyncOpenAIClient):
+            description = await self.openai_client.image_description(image_bytes=image_bytes, model=model)
+        else:
+            description = await asyncio.to_thread(
+                self.openai_client.image_description, image_bytes=image_bytes, model=model
+            )
+        if cache_key is not None:
+            await self.description_cache.set(cache_key, description.model_dump_json())
+        return description, False
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from app.client.storage import StorageBackend
+from app.config import settings
+from app.exceptions.service_exception import ServiceException
+from app.models.image_model import ImageModel, ImageStatusEnum
+from app.repositories.image_repo import ImageRepository
+from app.utils.disk_cache import DiskLRUCache
+from app.utils.image_preprocess import media_type, write_thumbnail
+
+# Bump when thumbnails are rendered differently, so cached ones are not reused
+THUMBNAIL_VERSION = 1
+
+
+class ImageVariant(NamedTuple):
+    """An image's original (size None) or one of its thumbnails"""
+    image: ImageModel
+    size: Optional[str]
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def _media_type(path: str) -> str:
+    with open(path, "rb") as f:
+        return media_type(f.read(16))
+
+
+class ImageService:
+    """
+    Stored images and thumbnails of them at the fixed sizes in `sizes` (name to
+    longest side in pixels), as files on local disk. Thumbnails, and originals
+    from storage backends without a local copy, are kept in `cache`.
+    """
+
+    def __init__(
+            self,
+            image_repo: ImageRepository,
+            storage_service: StorageBackend,
+            cache: DiskLRUCache,
+            sizes: Optional[Dict[str, int]] = None,
+            quality: Optional[int] = None,
+            bucket_name: str = "files",
+    ):
+        self.image_repo = image_repo
+        self.storage_service = storage_service
+        self.cache = cache
+        self.sizes = settings.IMAGE_THUMBNAIL_SIZES if sizes is None else sizes
+        self.quality = quality or settings.IMAGE_THUMBNAIL_QUALITY
+        self.bucket_name = bucket_name
+
+    async def get_variant(self, image_id: UUID, size: Optional[str] = None) -> ImageVariant:
+        """
+        Look up what would be served, without touching storage, so conditional
+        requests can be answered from the database row alone.
+        """
+        if size is not None and size not in self.sizes:
+            raise ServiceException(
+                status_code=400,
+                detail="Unknown thumbnail size",
+                additional_info={"size": size, "sizes": sorted(self.sizes)},
+            )
+        image = await self.image_repo.get(image_id)
+        if image is None:
+            raise ServiceException(
+                status_code=404,
+                detail="Image not found",
+                additional_info={"image_id": str(image_id)},
+            )
+        stored = image.status in (ImageStatusEnum.uploaded.value, ImageStatusEnum.described.value)
+        if not stored or not image.storage_path:
+            raise ServiceException(
+                status_code=404,
+                detail="Image is not stored yet",
+                additional_info={"image_id": str(image_id), "status": image.status},
+            )
+        # Objects are content-addressed, so the content hash identifies the bytes
+        identity = image.content_hash or hashlib.sha256(image.storage_path.encode()).hexdigest()
+        etag = f'"{identity}"' if size is None else f'"{identity}-{self.sizes[size]}-v{THUMBNAIL_VERSION}"'
+        return ImageVariant(image, size, etag, image.created_at)
+
+    async def open_variant(self, variant: ImageVariant) -> Tuple[str, str]:
+        """
+        Local path and media type of a variant, fetching or rendering it on
+        first use. The path is kept from cache eviction until it is passed to
+        `release`.
+        """
+        if variant.size is None:
+            original = await self._original_path(variant.image)
+            try:
+                return original, await asyncio.to_thread(_media_type, original)
+            except BaseException:
+                await self.release(original)
+                raise
+
+        side = self.sizes[variant.size]
+
+        async def render(tmp_path: str) -> None:
+            original = await self._original_path(variant.image)
+            try:
+                await asyncio.to_thread(write_thumbnail, original, tmp_path, side, self.quality)
+            except (OSError, ValueError) as e:
+                # Pillow raises OSError for data it cannot decode
+                raise ServiceException(
+                    status_code=415,
+                    detail="Cannot render a thumbnail of this image",
+                    additional_info={"image_id": str(variant.image.id), "error": str(e)},
+                )
+            finally:
+                await self.release(original)
+
+        path = await self.cache.get_or_create(f"thumbnail:{variant.etag}", render, pin=True)
+        return path, "image/jpeg"
+
+    async def release(self, path: str) -> None:
+        """Let the cache evict a path returned by `open_variant` again"""
+        await self.cache.release(path)
+
+    async def _original_path(self, image: ImageModel) -> str:
+        """Path of the original, pinned in the cache unless storage keeps it on local disk"""
+        local = self.storage_service.local_path(self.bucket_name, image.storage_path)
+        if local is not None:
+            return local
+
+        async def download(tmp_path: str) -> None:
+            await self.storage_service.download_to(self.bucket_name, image.storage_path, tmp_path)
+
+        return await self.cache.get_or_create(
+            f"original:{self.bucket_name}/{image.storage_path}", download, pin=True
+        )
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import uuid
+from typing import Optional
+from uuid import UUID
+
+from app.client.storage import StorageBackend
+from app.config import settings
+from app.exceptions.custom_exception import CustomException
+from app.exceptions.service_exception import ServiceException
+from app.models.files_model import FileModel, FileStatusEnum
+from app.models.image_model import ImageStatusEnum
+from app.models.job_model import JobStatusEnum
+from app.repositories.file_repo import FileRepository
+from app.repositories.image_repo import ImageRepository
+from app.repositories.job_repo import JobRepository
+from app.utils.extraction_engine import detect_document_format
+from app.utils.upload_spool import file_sha256
+
+logger = logging.getLogger(__name__)
+
+
+class JobService:
+    def __init__(
+            self,
+            db,
+            job_repo: JobRepository,
+            file_repo: FileRepository,
+            image_repo: ImageRepository,
+            storage_service: StorageBackend,
+            bucket_name: Optional[str] = None,
+    ):
+        self.db = db
+        self.job_repo = job_repo
+        self.file_repo = file_repo
+        self.image_repo = image_repo
+        self.storage_service = storage_service
+        self.bucket_name = bucket_name or settings.JOB_SOURCE_BUCKET
+
+    async def submit(self, pdf_path: str, filename: str) -> dict:
+        """
+        Queue a PDF for background processing. The PDF's content hash is the
+        idempotency key: re-uploading a file that is queued, running or fully
+        processed returns its existing job, and one whose job failed or left
+        failed images requeues that job, which resumes from its checkpoints.
+        Otherwise the PDF is streamed from disk to storage, so a worker on any
+        node can pick the job up, and the file and job records are committed
+        together. Of concurrent uploads of the same content, the first to insert
+        the file queues the job and the others return it.
+        """
+        try:
+            # Unsupported documents are rejected here rather than by a worker
+            await asyncio.to_thread(detect_document_format, pdf_path)
+            content_hash = await file_sha256(pdf_path)
+            file = await self.file_repo.get_by_content_hash(content_hash)
+            if file is not None:
+                existing = await self._existing_job(file)
+                if existing is not None:
+                    return existing
+
+            job_id = uuid.uuid4()
+            source_path = f"jobs/{job_id}{os.path.splitext(filename or '')[1].lower() or '.pdf'}"
+            await self.storage_service.upload_file(
+                bucket_name=self.bucket_name,
+                file_name=source_path,
+                content=pdf_path,
+            )
+            try:
+                if file is None:
+                    file, created = await self.file_repo.get_or_create_by_content_hash(
+                        {"file_name": filename, "content_hash": content_hash}
+                    )
+                    if not created:
+                        # A concurrent upload of the same content queued it first
+                        existing = await self._existing_job(file)
+                        if existing is not None:
+                            await self._delete_source(source_path)
+                            return existing
+                job = await self.job_repo.create(
+                    {
+                        "id": job_id,
+                        "file_id": file.id,
+                        "file_name": filename,
+                        "source_path": source_path,
+                    }
+                )
+                await self.db.commit()
+            except BaseException:
+                await self.db.rollback()
+                await self._delete_source(source_path)
+                raise
+            return {"job_id": job.id, "file_id": file.id, "status": job.status, "duplicate": False}
+        except CustomException as e:
+            raise e
+        except Exception as e:
+            raise ServiceException(
+                status_code=500,
+                detail="Failed to queue file for processing",
+                additional_info={"error": str(e), "file_name": filename},
+            )
+
+    async def _existing_job(self, file: FileModel) -> Optional[dict]:
+        """
+        The latest job of a file already uploaded, requeued if it finished
+        without completing the file; None if the file has no job.
+        """
+        job = await self.job_repo.get_latest_for_file(file.id)
+        if job is None:
+            return None
+        finished = job.status in (JobStatusEnum.completed, JobStatusEnum.failed)
+        if finished and file.status != FileStatusEnum.completed:
+            job = await self.job_repo.update(job.id, {
+                "status": JobStatusEnum.queued.value,
+                "attempts": 0,
+                "error": None,
+                "finished_at": None,
+                "run_after": None,
+            })
+            await self.db.commit()
+        return {"job_id": job.id, "file_id": file.id, "status": job.status, "duplicate": True}
+
+    async def _delete_source(self, source_path: str) -> None:
+        try:
+            await self.storage_service.delete_file(self.bucket_name, source_path)
+        except Exception as e:
+            logger.warning("Failed to delete job source %s: %s", source_path, e)
+
+    async def get_status(self, job_id: UUID) -> dict:
+        """Job state plus per-image progress taken from the images' status column"""
+        try:
+            job = await self.job_repo.get(job_id)
+            if job is None:
+                raise ServiceException(
+                    status_code=404,
+                    detail="Job not found",
+                    additional_info={"job_id": str(job_id)},
+                )
+            counts = await self.image_repo.count_by_status(job.file_id)
+            images = {status.value: counts.get(status.value, 0) for status in ImageStatusEnum}
+            total = sum(counts.values())
+            done = images[ImageStatusEnum.described.value] + images[ImageStatusEnum.failed.value]
+            if not settings.PROCESS_DESCRIBE_IMAGES:
+                done += images[ImageStatusEnum.uploaded.value]
+            return {
+                "job_id": job.id,
+                "file_id": job.file_id,
+                "file_name": job.file_name,
+                "status": job.status,
+                "attempts": job.attempts,
+                "images": {"total": total, **images},
+                "progress": done / total if total else (1.0 if job.status == JobStatusEnum.completed else 0.0),
+                "result": job.result,
+                "error": job.error,
+                "created_at": job.created_at,
+                "started_at": job.started_at,
+                "finished_at": job.finished_at,
+                "run_after": job.run_after,
+            }
+        except CustomException as e:
+            raise e
+        except Exception as e:
+            raise ServiceException(
+                status_code=500,
+                detail="Failed to get job status",
+                additional_info={"error": str(e), "job_id": str(job_id)},
+            )
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import os
+import socket
+import tempfile
+from datetime import timedelta
+from typing import Callable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.client.database import Database
+from app.client.storage import StorageBackend
+from app.config import settings
+from app.exceptions.custom_exception import CustomException
+from app.models.job_model import JobStatusEnum, ProcessingJobModel
+from app.repositories.job_repo import JobRepository
+from app.service.file_service import FileService
+from app.utils.metrics import set_background_route, timed
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkerPool:
+    """
+    Worker loops that claim processing jobs from Postgres and run them. Pools
+    in API processes and in `python -m app.worker` processes on any node share
+    one queue: claims use `FOR UPDATE SKIP LOCKED`, and a job whose worker
+    died is claimed again once its lease runs out, or failed if that was its
+    last attempt. A worker that loses its lease stops the job, and outcomes
+    are only recorded while the worker still owns the job. A failed attempt
+    is retried after an exponential backoff.
+    """
+
+    def __init__(
+            self,
+            database: Database,
+            storage_client: StorageBackend,
+            service_factory: Callable[[AsyncSession], FileService],
+            concurrency: Optional[int] = None,
+            poll_interval: Optional[float] = None,
+            lease_seconds: Optional[int] = None,
+            max_attempts: Optional[int] = None,
+            bucket_name: Optional[str] = None,
+            retry_backoff: Optional[float] = None,
+            retry_backoff_max: Optional[float] = None,
+    ):
+        self.database = database
+        self.storage_client = storage_client
+        self.service_factory = service_factory
+        self.concurrency = concurrency or settings.JOB_WORKERS
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.bucket_name = bucket_name or settings.JOB_SOURCE_BUCKET
+        self.retry_backoff = retry_backoff or settings.JOB_RETRY_BACKOFF
+        self.retry_backoff_max = retry_backoff_max or settings.JOB_RETRY_BACKOFF_MAX
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        for i in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._run(f"{self.worker_prefix}:{i}")))
+
+    def wake(self) -> None:
+        """Have idle workers poll now, e.g. right after a job was queued here"""
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Cancel the workers; a job that was running goes back to the queue"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._stopping = False
+
+    async def _run(self, worker_id: str) -> None:
+        set_background_route("job")
+        while True:
+            try:
+                job = await self._claim(worker_id)
+            except Exception as e:
+                logger.warning("Worker %s failed to claim a job: %s", worker_id, e)
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            try:
+                await self._run_job(job, worker_id)
+            except Exception as e:
+                # The lease runs out and the job is claimed again
+                logger.error("Worker %s could not record the outcome of job %s: %s", worker_id, job.id, e)
+
+    async def _claim(self, worker_id: str) -> Optional[ProcessingJobModel]:
+        async with self.database.SessionLocal() as session:
+            job_repo = JobRepository(session)
+            abandoned = await job_repo.fail_abandoned(self.max_attempts)
+            if abandoned:
+                logger.warning("Failed %s job(s) whose worker stopped during the last attempt", abandoned)
+            job = await job_repo.claim_next(worker_id, self.lease_seconds, self.max_attempts)
+            await session.commit()
+            return job
+
+    async def _heartbeat(self, job: ProcessingJobModel, worker_id: str, work: asyncio.Task, lost: asyncio.Event) -> None:
+        """
+        Keep extending the lease while the job runs. If another worker owns the
+        job now, or the lease would run out before the next try because the
+        extensions keep failing, `lost` is set and the work is cancelled.
+        """
+        failures = 0
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with self.database.SessionLocal() as session:
+                    extended = await JobRepository(session).extend_lease(job.id, worker_id, self.lease_seconds)
+                    await session.commit()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logger.warning("Worker %s failed to extend the lease on job %s: %s", worker_id, job.id, e)
+                # extensions run every third of the lease: after two misses it is about to expire
+                extended = failures < 2
+            if not extended:
+                logger.warning("Worker %s lost the lease on job %s, stopping it", worker_id, job.id)
+                lost.set()
+                work.cancel()
+                return
+
+    async def _finish(self, job: ProcessingJobModel, worker_id: str, values: dict) -> bool:
+        """Record the outcome, unless the job has been claimed by another worker since"""
+        async with self.database.SessionLocal() as session:
+            owned = await JobRepository(session).finish(job.id, worker_id, {"locked_until": None, **values})
+            await session.commit()
+        if not owned:
+            logger.warning("Worker %s no longer owns job %s; its outcome is dropped", worker_id, job.id)
+        return owned
+
+    async def _run_job(self, job: ProcessingJobModel, worker_id: str) -> None:
+        logger.info("Worker %s running job %s (attempt %s)", worker_id, job.id, job.attempts)
+        lost = asyncio.Event()
+        work = asyncio.create_task(self._process(job, worker_id, lost))
+        heartbeat = asyncio.create_task(self._heartbeat(job, worker_id, work, lost))
+        try:
+            # Cancelling this task (shutdown) cancels the work too
+            await work
+        except asyncio.CancelledError:
+            if not lost.is_set() or self._stopping:
+                raise
+        finally:
+            heartbeat.cancel()
+
+    async def _process(self, job: ProcessingJobModel, worker_id: str, lost: asyncio.Event) -> None:
+        fd, pdf_path = tempfile.mkstemp(suffix=os.path.splitext(job.source_path)[1], dir=settings.UPLOAD_SPOOL_DIR)
+        os.close(fd)
+        try:
+            with timed("source_download"):
+                await self.storage_client.download_to(self.bucket_name, job.source_path, pdf_path)
+            async with self.database.SessionLocal() as session:
+                # A retried job resumes from the image checkpoints of earlier attempts
+                with timed("process_file"):
+                    result = await self.service_factory(session).process_file(
+                        pdf_path, filename=job.file_name, file_id=job.file_id
+                    )
+            owned = await self._finish(job, worker_id, {
+                "status": JobStatusEnum.completed.value,
+                "result": jsonable_encoder(result),
+                "error": None,
+                "finished_at": func.now(),
+            })
+            if owned and not result.get("failed_images") and not result.get("description_errors"):
+                # Kept otherwise, so a resubmission can retry what failed
+                await self._delete_source(job.source_path)
+        except asyncio.CancelledError:
+            if not lost.is_set():
+                # Shutting down: hand the job back instead of waiting for the lease to expire
+                await asyncio.shield(self._finish(job, worker_id, {
+                    "status": JobStatusEnum.queued.value,
+                    "worker_id": None,
+                }))
+            raise
+        except Exception as e:
+            logger.warning("Worker %s failed job %s: %s", worker_id, job.id, e)
+            if isinstance(e, CustomException):
+                error = {"error": e.detail, "additional_info": e.additional_info}
+            else:
+                error = {"error": str(e)}
+            final = job.attempts >= self.max_attempts
+            await self._finish(job, worker_id, {
+                "status": JobStatusEnum.failed.value if final else JobStatusEnum.queued.value,
+                "error": jsonable_encoder(error),
+                "finished_at": func.now() if final else None,
+                "run_after": None if final else func.now() + timedelta(seconds=self._retry_delay(job.attempts)),
+            })
+        finally:
+            os.unlink(pdf_path)
+
+    def _retry_delay(self, attempts: int) -> float:
+        """Exponential backoff before a failed job's next attempt"""
+        return min(self.retry_backoff_max, self.retry_backoff * 2 ** (attempts - 1))
+
+    async def _delete_source(self, source_path: str) -> None:
+        try:
+            await self.storage_client.delete_file(self.bucket_name, source_path)
+        except Exception as e:
+            logger.warning("Failed to delete job source %s: %s", source_path, e)
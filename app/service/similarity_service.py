@@ -0,0 +1,154 @@
+import asyncio
+import time
+from datetime import timedelta
+from typing import List, Optional
+from uuid import UUID
+
+import numpy as np
+
+from app.config import settings
+from app.exceptions.custom_exception import CustomException
+from app.exceptions.service_exception import ServiceException
+from app.repositories.base_repo import decode_cursor
+from app.repositories.image_repo import ImageRepository
+from app.utils.image_features import DESCRIPTOR_DIMS, ImageFeatures, compute_features, descriptor_from_db, phash_from_db
+from app.utils.similarity_index import SimilarityIndex
+
+# Rows are stamped with their transaction's start time, so one committed a
+# little late can sort before the watermark; catch-up rescans this much.
+# FileService commits its inserts straight away, before any upload or
+# description work, which keeps that lag to a few round-trips
+_COMMIT_GRACE = timedelta(seconds=60)
+
+
+class SimilarityService:
+    def __init__(
+            self,
+            image_repo: ImageRepository,
+            index: SimilarityIndex,
+            refresh_interval: Optional[float] = None,
+            page_size: int = 5000,
+    ):
+        self.image_repo = image_repo
+        self.index = index
+        self.refresh_interval = settings.SIMILARITY_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.page_size = page_size
+
+    async def refresh(self, force: bool = False) -> int:
+        """
+        Add images stored since the index's watermark. Runs at most once per
+        refresh interval; concurrent callers wait for the one catching up.
+        Returns the number of rows read.
+        """
+        if not force and time.monotonic() - self.index.refreshed_at < self.refresh_interval:
+            return 0
+        async with self.index.refresh_lock:
+            if not force and time.monotonic() - self.index.refreshed_at < self.refresh_interval:
+                return 0
+
+            since = None
+            if self.index.watermark:
+                since = decode_cursor(self.index.watermark)[0] - _COMMIT_GRACE
+            cursor = None
+            read = 0
+            while True:
+                rows, last_cursor = await self.image_repo.get_feature_page(
+                    cursor=cursor, limit=self.page_size, since=since
+                )
+                if not rows:
+                    break
+                self._add_rows(rows)
+                read += len(rows)
+                cursor = last_cursor
+                self.index.watermark = last_cursor
+                if len(rows) < self.page_size:
+                    break
+            self.index.refreshed_at = time.monotonic()
+            return read
+
+    def _add_rows(self, rows: List[tuple]) -> None:
+        rows = [row for row in rows if row[2] is not None and len(row[2]) == DESCRIPTOR_DIMS * 2]
+        if not rows:
+            return
+        hashes = np.array([phash for _, phash, _ in rows], dtype=np.int64).view(np.uint64)
+        vectors = np.frombuffer(b"".join(descriptor for _, _, descriptor in rows), dtype="<f2")
+        self.index.add_many(
+            [image_id for image_id, _, _ in rows],
+            hashes,
+            vectors.reshape(len(rows), DESCRIPTOR_DIMS).astype(np.float16),
+        )
+
+    async def similar_to_upload(self, image_bytes: bytes, k: int = 10) -> dict:
+        try:
+            features = await asyncio.to_thread(compute_features, image_bytes)
+            if features is None:
+                raise ServiceException(
+                    status_code=422,
+                    detail="Image could not be decoded",
+                    additional_info={"size": len(image_bytes)},
+                )
+            await self.refresh()
+            return await self._similar(features, k)
+        except CustomException as e:
+            raise e
+        except Exception as e:
+            raise ServiceException(
+                status_code=500,
+                detail="Failed to find similar images",
+                additional_info={"error": str(e)},
+            )
+
+    async def similar_to_image(self, image_id: UUID, k: int = 10) -> dict:
+        try:
+            await self.refresh()
+            features = self.index.get(image_id)
+            if features is None:
+                image = await self.image_repo.get(image_id)
+                if image is None:
+                    raise ServiceException(
+                        status_code=404,
+                        detail="Image not found",
+                        additional_info={"image_id": str(image_id)},
+                    )
+                if image.phash is None or image.descriptor is None:
+                    raise ServiceException(
+                        status_code=409,
+                        detail="Image has no similarity features",
+                        additional_info={"image_id": str(image_id)},
+                    )
+                features = ImageFeatures(phash_from_db(image.phash), descriptor_from_db(image.descriptor))
+            return await self._similar(features, k, exclude=image_id)
+        except CustomException as e:
+            raise e
+        except Exception as e:
+            raise ServiceException(
+                status_code=500,
+                detail="Failed to find similar images",
+                additional_info={"error": str(e), "image_id": str(image_id)},
+            )
+
+    async def _similar(self, features: ImageFeatures, k: int, exclude: Optional[UUID] = None) -> dict:
+        start = time.perf_counter()
+        matches = await asyncio.to_thread(self.index.query, features, k, exclude)
+        query_ms = (time.perf_counter() - start) * 1000
+
+        # the index may still hold images deleted since it was refreshed
+        images = {image.id: image for image in await self.image_repo.get_many([m["image_id"] for m in matches])}
+        return {
+            "images": [
+                {
+                    "id": image.id,
+                    "file_id": image.file_id,
+                    "type": image.type,
+                    "description": image.description,
+                    "storage_path": image.storage_path,
+                    "score": match["score"],
+                    "hamming_distance": match["hamming_distance"],
+                    "cosine_similarity": match["cosine_similarity"],
+                }
+                for match in matches
+                if (image := images.get(match["image_id"])) is not None
+            ],
+            "indexed_images": len(self.index),
+            "query_ms": round(query_ms, 3),
+        }
@@ -1,9 +1,12 @@
+from app.utils.captions import iter_caption_file
+
+
 def read_srt_file(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-        print(content)
+    # Streams the file cue by cue instead of reading it whole
+    for cue in iter_caption_file(file_path):
+        print(f"{cue.start:.3f} --> {cue.end:.3f} {cue.text}")
 
 
 # Example usage
 # srt_file = "../../V4-caption.srt"
-# read_and_print_file(srt_file)
+# read_srt_file(srt_file)
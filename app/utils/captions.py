@@ -0,0 +1,207 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_TIMESTAMP = re.compile(r"^(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})$")
+_TAG = re.compile(r"<[^>]*>|\{\\[^}]*\}")
+_TOKEN = re.compile(r"[^\W_]+")
+
+# Common English function words; they carry no signal for matching
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i if in into is it its me my not of on or our
+she so that the their them then there these they this to us was we were what when which who will with
+you your do does did can could would should just also than too very about over up down out
+""".split())
+
+
+class Cue:
+    """One caption: times in seconds and its text with markup stripped"""
+
+    __slots__ = ("index", "start", "end", "text")
+
+    def __init__(self, index: int, start: float, end: float, text: str):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def to_dict(self) -> dict:
+        return {"index": self.index, "start": self.start, "end": self.end, "text": self.text}
+
+    def __repr__(self) -> str:
+        return f"Cue({self.index}, {self.start:.3f}, {self.end:.3f}, {self.text!r})"
+
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """SRT `HH:MM:SS,mmm` or VTT `[HH:]MM:SS.mmm` in seconds, None if malformed"""
+    match = _TIMESTAMP.match(value.strip())
+    if match is None:
+        return None
+    hours, minutes, seconds, fraction = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(fraction.ljust(3, "0")) / 1000
+
+
+def _parse_timing(line: str) -> Optional[Tuple[float, float]]:
+    start, _, rest = line.partition("-->")
+    # VTT cue settings follow the end time
+    fields = rest.split()
+    if not fields:
+        return None
+    start, end = parse_timestamp(start), parse_timestamp(fields[0])
+    if start is None or end is None:
+        return None
+    return start, max(start, end)
+
+
+def iter_cues(lines: Iterable[str]) -> Iterator[Cue]:
+    """
+    Stream cues from the lines of an SRT or WebVTT file, holding one block
+    at a time. Numeric or named cue identifiers, the WEBVTT header and
+    NOTE/STYLE/REGION blocks are skipped, as are blocks with malformed
+    timings. Cues are numbered in file order.
+    """
+    block: List[str] = []
+    index = 0
+    first = True
+
+    def flush() -> Optional[Cue]:
+        for position, line in enumerate(block):
+            if "-->" in line:
+                timing = _parse_timing(line)
+                if timing is None:
+                    return None
+                text = " ".join(_TAG.sub("", part).strip() for part in block[position + 1:])
+                return Cue(index, timing[0], timing[1], " ".join(text.split()))
+        return None
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if first:
+            line = line.lstrip("\ufeff")
+            first = False
+        if line.strip():
+            block.append(line)
+            continue
+        if block:
+            cue = flush()
+            block = []
+            if cue is not None:
+                yield cue
+                index += 1
+    if block:
+        cue = flush()
+        if cue is not None:
+            yield cue
+
+
+def iter_caption_file(path: str) -> Iterator[Cue]:
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        yield from iter_cues(f)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.casefold()) if len(token) > 1 and token not in _STOPWORDS]
+
+
+class CaptionIndex:
+    """
+    Cues of one transcript with two lookups:
+
+    - time: cues are sorted by start with a running maximum of their ends, so
+      the cues overlapping [a, b] are found by two binary searches and one
+      vectorized filter of the cues in between.
+    - text: a TF-IDF matrix over all cues in CSR-like posting arrays; a
+      query scores every cue with one scatter-add over the postings of its
+      terms, then cosine-normalizes.
+    """
+
+    def __init__(self, cues: Iterable[Cue]):
+        self.cues: List[Cue] = sorted(cues, key=lambda cue: (cue.start, cue.end))
+        count = len(self.cues)
+        self.starts = np.fromiter((cue.start for cue in self.cues), dtype=np.float64, count=count)
+        self.ends = np.fromiter((cue.end for cue in self.cues), dtype=np.float64, count=count)
+        self._max_ends = np.maximum.accumulate(self.ends) if count else self.ends
+        self._build_text_index()
+
+    def __len__(self) -> int:
+        return len(self.cues)
+
+    @property
+    def duration(self) -> float:
+        return float(self._max_ends[-1]) if len(self.cues) else 0.0
+
+    def _build_text_index(self) -> None:
+        vocabulary: Dict[str, int] = {}
+        term_ids, cue_ids, counts = [], [], []
+        for position, cue in enumerate(self.cues):
+            for token, count in Counter(tokenize(cue.text)).items():
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                cue_ids.append(position)
+                counts.append(count)
+        self.vocabulary = vocabulary
+
+        terms = np.asarray(term_ids, dtype=np.int64)
+        cues = np.asarray(cue_ids, dtype=np.int64)
+        tf = np.asarray(counts, dtype=np.float32)
+        # postings grouped by term: term t owns [_offsets[t], _offsets[t + 1])
+        order = np.argsort(terms, kind="stable")
+        document_frequency = np.bincount(terms, minlength=len(vocabulary))
+        self._offsets = np.concatenate([[0], np.cumsum(document_frequency)])
+        self._idf = (np.log((1 + len(self.cues)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self._posting_cues = cues[order]
+        # sublinear tf, as long cues repeat words
+        self._posting_weights = ((1 + np.log(tf)) * self._idf[terms])[order]
+        squared = np.bincount(self._posting_cues, weights=self._posting_weights ** 2, minlength=len(self.cues))
+        self._norms = np.sqrt(squared).astype(np.float32)
+
+    def _range(self, start: float, end: float) -> np.ndarray:
+        """Positions of cues with cue.start <= end and cue.end >= start"""
+        high = int(np.searchsorted(self.starts, end, side="right"))
+        low = int(np.searchsorted(self._max_ends, start, side="left"))
+        if low >= high:
+            return np.empty(0, dtype=np.int64)
+        return low + np.flatnonzero(self.ends[low:high] >= start)
+
+    def overlapping(self, start: float, end: Optional[float] = None) -> List[Cue]:
+        """Cues shown at time `start`, or at any time in [start, end]"""
+        end = start if end is None else end
+        return [self.cues[position] for position in self._range(start, end)]
+
+    def match(
+            self,
+            text: str,
+            k: int = 5,
+            start: Optional[float] = None,
+            end: Optional[float] = None,
+    ) -> List[Tuple[Cue, float]]:
+        """Top-k cues by TF-IDF cosine similarity to `text`, optionally within [start, end]"""
+        query = Counter(token for token in tokenize(text) if token in self.vocabulary)
+        if not query or not self.cues:
+            return []
+        term_ids = np.fromiter((self.vocabulary[token] for token in query), dtype=np.int64, count=len(query))
+        query_weights = (1 + np.log(np.fromiter(query.values(), dtype=np.float32, count=len(query)))) * self._idf[term_ids]
+
+        lengths = self._offsets[term_ids + 1] - self._offsets[term_ids]
+        postings = np.concatenate([
+            np.arange(self._offsets[term], self._offsets[term + 1]) for term in term_ids
+        ])
+        scores = np.bincount(
+            self._posting_cues[postings],
+            weights=self._posting_weights[postings] * np.repeat(query_weights, lengths),
+            minlength=len(self.cues),
+        )
+        scores /= np.maximum(self._norms, 1e-9) * float(np.linalg.norm(query_weights))
+
+        if start is not None or end is not None:
+            window = np.zeros(len(self.cues), dtype=bool)
+            window[self._range(start if start is not None else -math.inf, end if end is not None else math.inf)] = True
+            scores[~window] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        best = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.cues[position], float(scores[position])) for position in best]
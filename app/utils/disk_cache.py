@@ -0,0 +1,191 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+def _publish(tmp_path: str, path: Path) -> int:
+    os.replace(tmp_path, path)
+    return path.stat().st_size
+
+
+def _unlink_all(paths: List[Path]) -> None:
+    for path in paths:
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
+
+
+class DiskLRUCache:
+    """
+    Files under `directory`, at most `max_bytes` in total, evicting the least
+    recently used. Entries are created by a caller-supplied coroutine writing
+    to a temporary path that is renamed into place, once per key: concurrent
+    requests for a missing entry share one creation. Recency survives restarts
+    through the files' modification times.
+
+    A path handed out stays valid until the entry is evicted, which only
+    happens to entries used less recently than everything created since.
+    Callers that keep using a path, e.g. while streaming it to a client, pin
+    the entry and release it when done; pinned entries are never evicted, so
+    the cache can run over budget while they are in use.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # name -> number of callers using the entry
+        self._pins: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        """Index the files left by earlier runs, oldest first, and drop interrupted writes"""
+        found = []
+        for path in self.directory.glob("*/*"):
+            if path.name.endswith(".tmp"):
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            found.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._size += size
+        _unlink_all(self._over_budget())
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name[:2] / name
+
+    def _over_budget(self) -> List[Path]:
+        """
+        Forget least recently used entries until within budget, skipping
+        pinned ones; the newest is always kept.
+        """
+        excess = self._size - self.max_bytes
+        if excess <= 0:
+            return []
+        victims = []
+        for name, size in islice(self._entries.items(), len(self._entries) - 1):
+            if excess <= 0:
+                break
+            if name not in self._pins:
+                victims.append(name)
+                excess -= size
+        evicted = []
+        for name in victims:
+            self._size -= self._entries.pop(name)
+            self.evictions += 1
+            evicted.append(self._path(name))
+        return evicted
+
+    def _unpin(self, name: str) -> None:
+        count = self._pins.pop(name) - 1
+        if count:
+            self._pins[name] = count
+
+    async def get_or_create(self, key: str, create: Callable[[str], Awaitable[None]], pin: bool = False) -> str:
+        """
+        Path of the entry for `key`, calling `create(tmp_path)` to write it if
+        it is missing. A caller that goes away does not cancel a shared creation.
+        With `pin`, the entry is not evicted until the path is passed to `release`.
+        """
+        name = self._name(key)
+        if not pin:
+            return await self._get_or_create(name, create)
+        # pinned before waiting, so a creation finishing elsewhere cannot evict it first
+        self._pins[name] = self._pins.get(name, 0) + 1
+        try:
+            return await self._get_or_create(name, create)
+        except BaseException:
+            self._unpin(name)
+            raise
+
+    async def release(self, path: str) -> None:
+        """Unpin an entry pinned by `get_or_create`; paths from elsewhere are ignored"""
+        name = Path(path).name
+        if name not in self._pins or self._path(name) != Path(path):
+            return
+        self._unpin(name)
+        if name not in self._pins:
+            evicted = self._over_budget()
+            if evicted:
+                await asyncio.to_thread(_unlink_all, evicted)
+
+    async def _get_or_create(self, name: str, create: Callable[[str], Awaitable[None]]) -> str:
+        if name in self._entries:
+            path = self._path(name)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # removed behind our back; create it again
+                self._size -= self._entries.pop(name)
+            else:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return str(path)
+
+        task = self._inflight.get(name)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._create(name, create))
+            self._inflight[name] = task
+            task.add_done_callback(lambda done: self._settle(name, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _create(self, name: str, create: Callable[[str], Awaitable[None]]) -> str:
+        path = self._path(name)
+        await asyncio.to_thread(path.parent.mkdir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            await create(tmp_path)
+            size = await asyncio.to_thread(_publish, tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+        self._size += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+        evicted = self._over_budget()
+        if evicted:
+            await asyncio.to_thread(_unlink_all, evicted)
+        return str(path)
+
+    def _settle(self, name: str, task: asyncio.Task) -> None:
+        self._inflight.pop(name, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Failed to create cache entry %s: %s", name, task.exception())
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "pinned": len(self._pins),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,257 @@
+import asyncio
+import bisect
+import hashlib
+import math
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterator, List, Optional, Tuple, Union
+
+import fitz
+
+from app.exceptions.custom_exception import CustomException
+from app.utils.office_extraction import open_archive, iter_office_images, office_format
+
+# A PDF is given either as a path on local disk (preferred: MuPDF reads it
+# lazily and workers only receive the path) or as in-memory bytes.
+# Office documents are given the same way.
+PdfSource = Union[str, bytes]
+
+# MuPDF accepts a PDF header anywhere in the first KiB
+_PDF_HEADER_WINDOW = 1024
+
+
+def detect_document_format(source: PdfSource) -> str:
+    """
+    Sniff the container format from content rather than the file name:
+    'pdf', 'pptx', 'docx' or 'xlsx'. Zip containers are told apart by their
+    central directory alone.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:_PDF_HEADER_WINDOW])
+    else:
+        with open(source, "rb") as f:
+            head = f.read(_PDF_HEADER_WINDOW)
+    if head.startswith(b"PK\x03\x04"):
+        with open_archive(source) as archive:
+            return office_format(archive)
+    if b"%PDF-" in head:
+        return "pdf"
+    raise CustomException(
+        status_code=415,
+        detail="Unsupported document type",
+        exception_type="UnsupportedFileTypeError",
+        additional_info={"supported": ["pdf", "pptx", "docx", "xlsx"]},
+    )
+
+
+def open_pdf(source: PdfSource):
+    """Open a PDF from a file path or from bytes"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source, filetype="pdf")
+
+
+# (page index, image index on that page, xref)
+PlanEntry = Tuple[int, int, int]
+
+
+def plan_images(pdf_doc) -> List[PlanEntry]:
+    """
+    List the first occurrence of every image xref, in page order. Only page
+    resources are read here; no image stream is decoded.
+    """
+    seen = set()
+    plan = []
+    for page_number in range(len(pdf_doc)):
+        for img_index, img in enumerate(pdf_doc[page_number].get_images(full=True), start=1):
+            xref = img[0]
+            if xref in seen:
+                continue
+            seen.add(xref)
+            plan.append((page_number, img_index, xref))
+    return plan
+
+
+def _iter_planned_images(pdf_doc, entries: List[PlanEntry]) -> Iterator[dict]:
+    """
+    Lazily extract planned images from an open PDF document.
+    Yields dicts: { 'image_bytes', 'filename', 'extension', 'page_number', 'xref', 'content_hash' }
+    """
+    for page_number, img_index, xref in entries:
+        base_image = pdf_doc.extract_image(xref)
+        image_bytes = base_image["image"]
+        image_ext = base_image["ext"]
+        filename = f"page{page_number + 1}_img{img_index}.{image_ext}"
+
+        yield {
+            "image_bytes": image_bytes,
+            "filename": filename,
+            "extension": image_ext,
+            "page_number": page_number + 1,
+            "xref": xref,
+            "content_hash": hashlib.sha256(image_bytes).hexdigest(),
+        }
+
+
+def _extract_entries(source: PdfSource, entries: List[PlanEntry]) -> List[dict]:
+    """Process pool entry point: each worker opens its own copy of the document."""
+    pdf_doc = open_pdf(source)
+    try:
+        return list(_iter_planned_images(pdf_doc, entries))
+    finally:
+        pdf_doc.close()
+
+
+class _ProducerError:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_DONE = object()
+
+
+class PdfExtractionEngine:
+    """
+    Extracts images from PDFs, splitting page ranges across a process pool
+    for documents with at least `parallel_threshold` pages. PPTX, DOCX and
+    XLSX files are streamed member by member from their zip container instead.
+
+    `iter_images` and `aiter_images` stream images one at a time; in parallel
+    mode at most `max_workers` page ranges are outstanding, so memory is
+    bounded by `max_workers * pages_per_chunk` pages rather than the document.
+    """
+
+    def __init__(
+            self,
+            max_workers: Optional[int] = None,
+            parallel_threshold: int = 50,
+            pages_per_chunk: int = 16,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self.pages_per_chunk = pages_per_chunk
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Lazily start the pool; spawn avoids forking a process with live threads"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        """Split [0, page_count) into contiguous ranges of at most `pages_per_chunk` pages"""
+        chunk_size = max(1, min(math.ceil(page_count / self.max_workers), self.pages_per_chunk))
+        return [
+            (start, min(start + chunk_size, page_count))
+            for start in range(0, page_count, chunk_size)
+        ]
+
+    def iter_images(self, source: PdfSource) -> Iterator[dict]:
+        """
+        Yield every distinct image xref of the PDF once, in page order, or
+        every media image of an Office document
+        """
+        document_format = detect_document_format(source)
+        if document_format != "pdf":
+            yield from iter_office_images(source, document_format)
+            return
+
+        pdf_doc = open_pdf(source)
+        try:
+            page_count = len(pdf_doc)
+            plan = plan_images(pdf_doc)
+            if page_count < self.parallel_threshold or self.max_workers < 2:
+                yield from _iter_planned_images(pdf_doc, plan)
+                return
+        finally:
+            pdf_doc.close()
+
+        # Split the plan along page ranges; the plan is sorted by page
+        plan_pages = [entry[0] for entry in plan]
+        chunks = iter([
+            plan[bisect.bisect_left(plan_pages, start):bisect.bisect_left(plan_pages, end)]
+            for start, end in self.page_ranges(page_count)
+        ])
+
+        executor = self._get_executor()
+        pending = deque()
+        try:
+            while True:
+                # Keep one chunk per worker in flight, consumed in submission order
+                while len(pending) < self.max_workers:
+                    entries = next(chunks, None)
+                    if entries is None:
+                        break
+                    if entries:
+                        pending.append(executor.submit(_extract_entries, source, entries))
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def extract(self, source: PdfSource) -> List[dict]:
+        """Extract every image of the PDF, in page order"""
+        return list(self.iter_images(source))
+
+    async def extract_async(self, source: PdfSource) -> List[dict]:
+        """Run `extract` without blocking the event loop"""
+        return await asyncio.to_thread(self.extract, source)
+
+    async def aiter_images(self, source: PdfSource, window: int = 8) -> AsyncIterator[dict]:
+        """
+        Stream images to the event loop from a producer thread. The producer
+        blocks once `window` images are waiting, so a slow consumer applies
+        backpressure all the way down to extraction.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, window))
+        stop = threading.Event()
+
+        def put(item) -> None:
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def produce() -> None:
+            images = self.iter_images(source)
+            try:
+                for item in images:
+                    if stop.is_set():
+                        return
+                    put(item)
+                put(_DONE)
+            except BaseException as e:
+                if not stop.is_set():
+                    put(_ProducerError(e))
+            finally:
+                images.close()
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _ProducerError):
+                    raise item.error
+                yield item
+        finally:
+            # Unblock a producer waiting on a full queue, then let it exit
+            stop.set()
+            while not producer.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.wait({producer}, timeout=0.05)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+def http_date(value: datetime) -> str:
+    """`value` in the IMF-fixdate format of Last-Modified and If-Modified-Since"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `etag` against the entity tags of an If-None-Match header"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(tag.strip()) == _opaque(etag) for tag in if_none_match.split(","))
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Whether a GET or HEAD can be answered with 304 Not Modified. If-None-Match
+    takes precedence; If-Modified-Since is only consulted without it.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole-second resolution
+    return last_modified.replace(microsecond=0) <= since
@@ -0,0 +1,127 @@
+import io
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+# Bump when the hash or descriptor changes, so persisted indexes are rebuilt
+FEATURE_VERSION = 1
+
+HASH_BITS = 64
+_HASH_SIDE = 8
+_DCT_SIDE = 32
+
+# Descriptor: 8 hue x 2 saturation x 2 value color bins, then a 2x2 grid of
+# 4-bin gradient orientation histograms
+_HUE_BINS, _SAT_BINS, _VAL_BINS = 8, 2, 2
+_COLOR_DIMS = _HUE_BINS * _SAT_BINS * _VAL_BINS
+_GRID, _ORIENTATION_BINS = 2, 4
+_GRADIENT_DIMS = _GRID * _GRID * _ORIENTATION_BINS
+DESCRIPTOR_DIMS = _COLOR_DIMS + _GRADIENT_DIMS
+_DESCRIPTOR_SIDE = 64
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+_DCT = _dct_matrix(_DCT_SIDE)
+_BIT_WEIGHTS = (np.uint64(1) << np.arange(HASH_BITS, dtype=np.uint64))[::-1]
+
+
+class ImageFeatures(NamedTuple):
+    # 64-bit DCT perceptual hash
+    phash: int
+    # L2-normalized color + gradient descriptor, DESCRIPTOR_DIMS float16
+    descriptor: np.ndarray
+
+
+def _normalized(histogram: np.ndarray) -> np.ndarray:
+    """Hellinger mapping then L2 normalization, so a dot product compares distributions"""
+    root = np.sqrt(histogram / max(float(histogram.sum()), 1e-9))
+    return root / max(float(np.linalg.norm(root)), 1e-9)
+
+
+def perceptual_hash(gray: np.ndarray) -> int:
+    """pHash of a 32x32 grayscale array: signs of the low 8x8 DCT band against its median"""
+    coefficients = (_DCT @ gray.astype(np.float32) @ _DCT.T)[:_HASH_SIDE, :_HASH_SIDE].ravel()
+    # the DC term only carries overall brightness
+    bits = coefficients > np.median(coefficients[1:])
+    return int((bits.astype(np.uint64) * _BIT_WEIGHTS).sum())
+
+
+def _color_histogram(hsv: np.ndarray) -> np.ndarray:
+    hue = (hsv[..., 0].astype(np.int32) * _HUE_BINS) >> 8
+    sat = (hsv[..., 1].astype(np.int32) * _SAT_BINS) >> 8
+    val = (hsv[..., 2].astype(np.int32) * _VAL_BINS) >> 8
+    bins = (hue * _SAT_BINS + sat) * _VAL_BINS + val
+    return np.bincount(bins.ravel(), minlength=_COLOR_DIMS).astype(np.float32)
+
+
+def _gradient_histogram(gray: np.ndarray) -> np.ndarray:
+    gray = gray.astype(np.float32)
+    gx = np.zeros_like(gray)
+    gy = np.zeros_like(gray)
+    gx[:, 1:-1] = gray[:, 2:] - gray[:, :-2]
+    gy[1:-1, :] = gray[2:, :] - gray[:-2, :]
+    magnitude = np.hypot(gx, gy)
+    # unsigned orientation in [0, pi)
+    orientation = np.mod(np.arctan2(gy, gx), np.pi)
+    orientation_bin = np.minimum((orientation / np.pi * _ORIENTATION_BINS).astype(np.int32), _ORIENTATION_BINS - 1)
+
+    cell = _DESCRIPTOR_SIDE // _GRID
+    rows = np.arange(_DESCRIPTOR_SIDE)[:, None] // cell
+    cols = np.arange(_DESCRIPTOR_SIDE)[None, :] // cell
+    bins = (rows * _GRID + cols) * _ORIENTATION_BINS + orientation_bin
+    return np.bincount(bins.ravel(), weights=magnitude.ravel(), minlength=_GRADIENT_DIMS).astype(np.float32)
+
+
+def compute_features(image_bytes: bytes) -> Optional[ImageFeatures]:
+    """Perceptual hash and descriptor of an image, or None if it cannot be decoded"""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image.draft("RGB", (_DESCRIPTOR_SIDE * 2, _DESCRIPTOR_SIDE * 2))
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            # composite onto white, as the image would be displayed
+            image = image.convert("RGBA")
+            background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(background, image)
+        image = image.convert("RGB").resize((_DESCRIPTOR_SIDE, _DESCRIPTOR_SIDE), Image.BILINEAR)
+    except Exception:
+        return None
+
+    gray_image = image.convert("L")
+    gray = np.asarray(gray_image)
+    hash_sample = np.asarray(gray_image.resize((_DCT_SIDE, _DCT_SIDE), Image.BILINEAR))
+    hsv = np.asarray(image.convert("HSV"))
+
+    descriptor = np.concatenate([
+        _normalized(_color_histogram(hsv)),
+        _normalized(_gradient_histogram(gray)),
+    ]) / np.sqrt(2.0)
+    return ImageFeatures(perceptual_hash(hash_sample), descriptor.astype(np.float16))
+
+
+def compute_features_batch(images: Sequence[bytes]) -> List[Optional[ImageFeatures]]:
+    return [compute_features(image_bytes) for image_bytes in images]
+
+
+def phash_to_db(phash: int) -> int:
+    """Unsigned 64-bit hash as the signed value a BIGINT column holds"""
+    return int(np.uint64(phash).view(np.int64))
+
+
+def phash_from_db(value: int) -> int:
+    return int(np.int64(value).view(np.uint64))
+
+
+def descriptor_to_db(descriptor: np.ndarray) -> bytes:
+    return descriptor.astype("<f2").tobytes()
+
+
+def descriptor_from_db(value: bytes) -> np.ndarray:
+    return np.frombuffer(value, dtype="<f2").astype(np.float16)
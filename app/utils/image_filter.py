@@ -0,0 +1,102 @@
+import enum
+import io
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+
+# Images are reduced to a SAMPLE_SIDE x SAMPLE_SIDE grayscale sample for pixel statistics
+SAMPLE_SIDE = 32
+_ENTROPY_BINS = 16
+
+
+class FilterVerdict(str, enum.Enum):
+    skip = "skip"
+    keep = "keep"
+    review = "review"
+
+
+class FilterDecision(NamedTuple):
+    verdict: FilterVerdict
+    reason: Optional[str]
+
+
+def _read(image_bytes: bytes):
+    """Return (width, height, grayscale sample, fully transparent) or None if undecodable"""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        width, height = image.size
+        image.draft("L", (SAMPLE_SIDE * 2, SAMPLE_SIDE * 2))
+        image.thumbnail((SAMPLE_SIDE * 2, SAMPLE_SIDE * 2))
+        transparent = False
+        if "A" in image.getbands() or (image.mode == "P" and "transparency" in image.info):
+            image = image.convert("RGBA")
+            transparent = image.getchannel("A").getextrema()[1] == 0
+        sample = image.convert("L").resize((SAMPLE_SIDE, SAMPLE_SIDE), Image.BILINEAR)
+        return width, height, np.asarray(sample, dtype=np.uint8).ravel(), transparent
+    except Exception:
+        return None
+
+
+def classify_images(images: Sequence[bytes]) -> List[FilterDecision]:
+    """
+    Classify a batch of images as skip, keep or review. Only headers and a small
+    grayscale sample are decoded per image; every rule is then evaluated over the
+    whole batch at once with NumPy.
+    """
+    n = len(images)
+    if not settings.FILTER_ENABLED:
+        return [FilterDecision(FilterVerdict.keep, None)] * n
+    if n == 0:
+        return []
+
+    widths = np.zeros(n, dtype=np.int64)
+    heights = np.zeros(n, dtype=np.int64)
+    sizes = np.fromiter((len(data) for data in images), dtype=np.int64, count=n)
+    samples = np.zeros((n, SAMPLE_SIDE * SAMPLE_SIDE), dtype=np.uint8)
+    decoded = np.zeros(n, dtype=bool)
+    transparent = np.zeros(n, dtype=bool)
+
+    for i, data in enumerate(images):
+        read = _read(data)
+        if read is not None:
+            widths[i], heights[i], samples[i], transparent[i] = read
+            decoded[i] = True
+
+    min_side = np.minimum(widths, heights)
+    aspect = np.maximum(widths, heights) / np.maximum(min_side, 1)
+    variance = samples.astype(np.float32).var(axis=1)
+
+    # Shannon entropy of a 16-bin intensity histogram, one bincount for the batch
+    bins = (samples >> 4).astype(np.int64) + (np.arange(n, dtype=np.int64) * _ENTROPY_BINS)[:, None]
+    counts = np.bincount(bins.ravel(), minlength=n * _ENTROPY_BINS).reshape(n, _ENTROPY_BINS)
+    p = counts / samples.shape[1]
+    entropy = -(p * np.log2(np.where(p > 0, p, 1))).sum(axis=1)
+
+    # First matching rule wins
+    rules = [
+        (~decoded, FilterVerdict.review, "undecodable"),
+        (sizes < settings.FILTER_MIN_BYTES, FilterVerdict.skip, "too_few_bytes"),
+        (min_side < settings.FILTER_MIN_SIDE, FilterVerdict.skip, "too_small"),
+        (transparent, FilterVerdict.skip, "fully_transparent"),
+        (aspect > settings.FILTER_MAX_ASPECT_RATIO, FilterVerdict.skip, "extreme_aspect_ratio"),
+        (variance < settings.FILTER_MIN_VARIANCE, FilterVerdict.skip, "solid_color"),
+        (entropy < settings.FILTER_MIN_ENTROPY, FilterVerdict.review, "low_entropy"),
+        (min_side < settings.FILTER_REVIEW_MIN_SIDE, FilterVerdict.review, "small"),
+    ]
+    rule_index = np.select([condition for condition, _, _ in rules], np.arange(len(rules)), default=-1)
+
+    decisions = []
+    for index in rule_index:
+        if index < 0:
+            decisions.append(FilterDecision(FilterVerdict.keep, None))
+        else:
+            _, verdict, reason = rules[index]
+            decisions.append(FilterDecision(verdict, reason))
+    return decisions
+
+
+def classify_image(image_bytes: bytes) -> FilterDecision:
+    return classify_images([image_bytes])[0]
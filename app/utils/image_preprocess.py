@@ -0,0 +1,157 @@
+import io
+from typing import NamedTuple, Optional
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+
+# Leading bytes of the formats PDFs and Office documents embed
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+    (b"\x00\x00\x00\x0cjP  \r\n\x87\n", "jpx"),
+    (b"\xff\x4f\xff\x51", "jpx"),
+)
+
+# MIME types that are not image/<format>
+_MIME_TYPES = {"jpx": "image/jp2"}
+
+# Formats the vision API accepts as-is
+_VISION_FORMATS = {"png", "jpeg", "gif", "webp"}
+
+
+class PreparedImage(NamedTuple):
+    data: bytes
+    mime_type: str
+    detail: str
+    width: Optional[int]
+    height: Optional[int]
+
+
+def detect_format(image_bytes: bytes) -> Optional[str]:
+    """Sniff the real image format from magic bytes"""
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "webp"
+    for signature, image_format in _SIGNATURES:
+        if image_bytes.startswith(signature):
+            return image_format
+    return None
+
+
+def media_type(image_bytes: bytes) -> str:
+    """MIME type of the sniffed image format, application/octet-stream if unknown"""
+    image_format = detect_format(image_bytes)
+    if image_format is None:
+        return "application/octet-stream"
+    return _MIME_TYPES.get(image_format, f"image/{image_format}")
+
+
+def vision_signature() -> str:
+    """Identifies the preprocessing settings, for cache keys"""
+    return (
+        f"{settings.VISION_PREPROCESS}-{settings.VISION_MAX_SIDE}-{settings.VISION_MAX_BYTES}-"
+        f"{settings.VISION_OUTPUT_FORMAT}-{settings.VISION_LOW_DETAIL_MAX_SIDE}"
+    )
+
+
+def _detail_for(width: int, height: int) -> str:
+    # "low" sends a fixed 512px rendition, so anything that small loses nothing
+    return "low" if max(width, height) <= settings.VISION_LOW_DETAIL_MAX_SIDE else "high"
+
+
+def _encode(image: Image.Image, output_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if output_format == "webp":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Convert to RGB, compositing transparency onto white"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    if image.mode != "RGB":
+        return image.convert("RGB")
+    return image
+
+
+def prepare_image(
+        image_bytes: bytes,
+        max_side: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        output_format: Optional[str] = None,
+) -> PreparedImage:
+    """
+    Shrink an image for a vision request: downscale so its longest side is at
+    most `max_side`, then re-encode as JPEG or WebP, lowering quality (and then
+    size) until it fits in `max_bytes`. Images that already fit and are in a
+    format the API accepts are passed through untouched.
+    """
+    max_side = max_side or settings.VISION_MAX_SIDE
+    max_bytes = max_bytes or settings.VISION_MAX_BYTES
+    # Only WebP and JPEG are encoded; anything else falls back to JPEG
+    output_format = "webp" if (output_format or settings.VISION_OUTPUT_FORMAT).lower() == "webp" else "jpeg"
+    image_format = detect_format(image_bytes)
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        width, height = image.size
+    except Exception:
+        # Not decodable here; let the API judge the original bytes
+        return PreparedImage(image_bytes, f"image/{image_format or 'png'}", "auto", None, None)
+
+    if (
+            image_format in _VISION_FORMATS
+            and max(width, height) <= max_side
+            and len(image_bytes) <= max_bytes
+            and not getattr(image, "is_animated", False)
+    ):
+        return PreparedImage(image_bytes, f"image/{image_format}", _detail_for(width, height), width, height)
+
+    # JPEG can decode straight to a reduced scale, which is far cheaper
+    image.draft("RGB", (max_side, max_side))
+    image = _flatten(ImageOps.exif_transpose(image))
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    quality = settings.VISION_QUALITY
+    while True:
+        data = _encode(image, output_format, quality)
+        if len(data) <= max_bytes or max(image.size) <= 64:
+            break
+        if quality > 50:
+            quality -= 10
+        else:
+            image = image.resize(
+                (max(1, int(image.width * 0.75)), max(1, int(image.height * 0.75))),
+                Image.LANCZOS,
+            )
+
+    return PreparedImage(
+        data,
+        f"image/{output_format}",
+        _detail_for(*image.size),
+        image.width,
+        image.height,
+    )
+
+
+def write_thumbnail(source_path: str, dest_path: str, max_side: int, quality: int = 80) -> None:
+    """
+    Write a JPEG of the image at `source_path`, downscaled so its longest side
+    is at most `max_side`, to `dest_path`. Only the first frame of animations is kept.
+    """
+    with Image.open(source_path) as image:
+        image.draft("RGB", (max_side, max_side))
+        image = _flatten(ImageOps.exif_transpose(image))
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        image.save(dest_path, format="JPEG", quality=quality, optimize=True, progressive=True)
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# Stages are anything from a few milliseconds (DB round-trips) to minutes (large PDFs)
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+STAGE_SECONDS = Histogram(
+    "zedny_stage_duration_seconds",
+    "Latency of one processing stage",
+    ["stage", "route", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+STAGE_ITEMS = Counter(
+    "zedny_stage_items_total",
+    "Items (images, rows or bytes, depending on the stage) handled by a stage",
+    ["stage", "route", "outcome"],
+)
+HTTP_SECONDS = Histogram(
+    "zedny_http_request_duration_seconds",
+    "Latency of HTTP requests, until the response body is sent",
+    ["route", "method", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+EVENT_LOOP_LAG = Histogram(
+    "zedny_event_loop_lag_seconds",
+    "How late the event loop woke a task sleeping for a fixed interval",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+OPENAI_RETRIES = Counter(
+    "zedny_openai_retries_total",
+    "OpenAI requests retried after a transient error",
+    ["route", "error"],
+)
+
+# The ASGI scope of the current request; FastAPI adds the matched route to it
+# during routing, so the route template is known by the time stages run
+_request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+# Label of work that does not run inside a request, e.g. background jobs
+_background_route: ContextVar[str] = ContextVar("background_route", default="background")
+
+
+def current_route() -> str:
+    scope = _request_scope.get()
+    if scope is None:
+        return _background_route.get()
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def set_background_route(name: str) -> None:
+    """Label the stages of the current task (and the tasks it starts) with `name`"""
+    _background_route.set(name)
+
+
+class StageTimer:
+    """Handle yielded by `timed`; set `items` to count what the stage handled"""
+
+    __slots__ = ("items",)
+
+    def __init__(self):
+        self.items = 0
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[StageTimer]:
+    """
+    Record the duration of the enclosed block under `stage`, labelled with the
+    current route and an outcome of success, error or cancelled.
+    """
+    timer = StageTimer()
+    outcome = "success"
+    start = time.perf_counter()
+    try:
+        yield timer
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        route = current_route()
+        STAGE_SECONDS.labels(stage, route, outcome).observe(time.perf_counter() - start)
+        if timer.items:
+            STAGE_ITEMS.labels(stage, route, outcome).inc(timer.items)
+
+
+def observe(stage: str, seconds: float, items: int = 0, outcome: str = "success") -> None:
+    """Record a stage duration measured by the caller"""
+    route = current_route()
+    STAGE_SECONDS.labels(stage, route, outcome).observe(seconds)
+    if items:
+        STAGE_ITEMS.labels(stage, route, outcome).inc(items)
+
+
+def record_retry(error: Exception) -> None:
+    OPENAI_RETRIES.labels(current_route(), type(error).__name__).inc()
+
+
+async def monitor_event_loop_lag(interval: float) -> None:
+    """
+    Sample event-loop lag every `interval` seconds until cancelled. Lag is
+    time the loop spent on other callbacks (or blocked) past a timer's deadline.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+def render_metrics() -> tuple:
+    """Body and content type of the Prometheus text exposition"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request by route template, method
+    and status code. Unlike BaseHTTPMiddleware it does not buffer or wrap
+    streaming responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_scope.set(scope)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_SECONDS.labels(current_route(), scope["method"], str(status)).observe(time.perf_counter() - start)
+            _request_scope.reset(token)
+
+
+def configure_logging(level: str) -> None:
+    """
+    Logging for the app's entry points. The root handler is only installed if
+    none is set; the level of the app's loggers is applied either way. The
+    HTTP client libraries log every request at INFO, so they are held at WARNING.
+    """
+    logging.basicConfig(
+        level=level.upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    logging.getLogger("app").setLevel(level.upper())
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
@@ -0,0 +1,196 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.image_features import HASH_BITS
+
+# Thresholds above this split the hash into bands too narrow to bucket well
+MAX_THRESHOLD = 12
+
+# Pairwise comparisons per task, and per block within a bucket (uint8 distances)
+_TASK_BUDGET = 1 << 24
+_BLOCK_BUDGET = 1 << 24
+
+
+def band_layout(threshold: int) -> List[Tuple[int, int]]:
+    """
+    Split the hash into threshold + 1 contiguous (shift, width) bit bands. Two
+    hashes within `threshold` bits of each other agree on at least one whole
+    band (pigeonhole), so only hashes sharing a band value are compared.
+    """
+    bands = threshold + 1
+    widths = [HASH_BITS // bands + (1 if i < HASH_BITS % bands else 0) for i in range(bands)]
+    layout = []
+    shift = 0
+    for width in widths:
+        layout.append((shift, width))
+        shift += width
+    return layout
+
+
+def connected_labels(count: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """
+    Connected components of `count` nodes under the edges (u, v): every node
+    is labelled with the smallest node of its component. Vectorized hooking
+    and pointer jumping, a handful of passes over the edges.
+    """
+    labels = np.arange(count, dtype=np.int64)
+    if len(u) == 0:
+        return labels
+    while True:
+        lu = labels[u]
+        lv = labels[v]
+        low = np.minimum(lu, lv)
+        hooked = labels.copy()
+        np.minimum.at(hooked, lu, low)
+        np.minimum.at(hooked, lv, low)
+        while True:
+            jumped = hooked[hooked]
+            if np.array_equal(jumped, hooked):
+                break
+            hooked = jumped
+        if np.array_equal(hooked, labels):
+            return labels
+        labels = hooked
+
+
+def _bucket_links(hashes: np.ndarray, members: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Links (node, component root) among one bucket's nodes within `threshold` bits"""
+    values = hashes[members]
+    count = len(members)
+    block = max(1, _BLOCK_BUDGET // count)
+    us, vs = [], []
+    for start in range(0, count, block):
+        stop = min(start + block, count)
+        # compare each row of the block with the nodes after it only
+        distances = np.bitwise_count(values[start:stop, None] ^ values[None, start:])
+        rows, cols = np.nonzero(distances <= threshold)
+        cols += start
+        later = cols > rows + start
+        us.append(rows[later] + start)
+        vs.append(cols[later])
+    u = np.concatenate(us)
+    v = np.concatenate(vs)
+    if len(u) == 0:
+        return u, v
+    labels = connected_labels(count, u, v)
+    linked = np.flatnonzero(labels != np.arange(count))
+    return members[linked], members[labels[linked]]
+
+
+def _band_links(hash_path: str, order_path: str, runs: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Process pool entry point: links within the buckets `runs` of one band"""
+    hashes = np.load(hash_path, mmap_mode="r")
+    order = np.load(order_path, mmap_mode="r")
+    nodes, roots = [], []
+    for start, stop in runs:
+        members = np.asarray(order[start:stop])
+        node, root = _bucket_links(hashes, members, threshold)
+        nodes.append(node)
+        roots.append(root)
+    if not nodes:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(nodes), np.concatenate(roots)
+
+
+def _split_runs(runs: np.ndarray) -> List[np.ndarray]:
+    """Group buckets into tasks of about _TASK_BUDGET comparisons each"""
+    sizes = (runs[:, 1] - runs[:, 0]).astype(np.float64)
+    cost = np.cumsum(sizes * sizes / 2)
+    task_of = (cost // _TASK_BUDGET).astype(np.int64)
+    boundaries = np.flatnonzero(np.diff(task_of)) + 1
+    return np.split(runs, boundaries)
+
+
+def cluster_hashes(
+        hashes: np.ndarray,
+        threshold: int,
+        workers: Optional[int] = None,
+        work_dir: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Label each hash with the smallest index of its single-linkage cluster,
+    linking hashes at most `threshold` bits apart.
+
+    For every band the hashes are bucketed by the band's bits and each bucket
+    is compared pairwise in chunks, spread over `workers` processes. Workers
+    read the hashes from a memory-mapped file and return only a spanning
+    forest of each bucket, so memory stays linear in the number of hashes.
+    """
+    if not 0 <= threshold <= MAX_THRESHOLD:
+        raise ValueError(f"threshold must be between 0 and {MAX_THRESHOLD}")
+    hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+    count = len(hashes)
+    if count < 2:
+        return np.arange(count, dtype=np.int64)
+    workers = workers or os.cpu_count() or 1
+
+    nodes, roots = [], []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        hash_path = os.path.join(tmp, "hashes.npy")
+        np.save(hash_path, hashes)
+        executor = None
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            futures = []
+            for band, (shift, width) in enumerate(band_layout(threshold)):
+                mask = np.uint64((1 << width) - 1)
+                keys = (hashes >> np.uint64(shift)) & mask
+                order = np.argsort(keys, kind="stable")
+                sorted_keys = keys[order]
+                starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+                stops = np.r_[starts[1:], count]
+                shared = stops - starts > 1
+                runs = np.stack([starts[shared], stops[shared]], axis=1)
+                if len(runs) == 0:
+                    continue
+                order_path = os.path.join(tmp, f"band{band}.npy")
+                np.save(order_path, order)
+                for task in _split_runs(runs):
+                    if executor is None:
+                        node, root = _band_links(hash_path, order_path, task, threshold)
+                        nodes.append(node)
+                        roots.append(root)
+                    else:
+                        futures.append(executor.submit(_band_links, hash_path, order_path, task, threshold))
+            for future in futures:
+                node, root = future.result()
+                nodes.append(node)
+                roots.append(root)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    if not nodes:
+        return np.arange(count, dtype=np.int64)
+    return connected_labels(count, np.concatenate(nodes), np.concatenate(roots))
+
+
+def pick_canonicals(
+        hashes: np.ndarray,
+        labels: np.ndarray,
+        threshold: int,
+        described: np.ndarray,
+        weights: np.ndarray,
+) -> np.ndarray:
+    """
+    Index of the canonical member for every node: in each cluster, a
+    described node first, then the heaviest, then the first. Single-linkage
+    can chain dissimilar images together, so a node further than `threshold`
+    bits from its canonical is left on its own.
+    """
+    count = len(hashes)
+    index = np.arange(count)
+    order = np.lexsort((index, -weights, ~described, labels))
+    first = np.r_[True, labels[order][1:] != labels[order][:-1]]
+    canonical_of_label = np.empty(count, dtype=np.int64)
+    canonical_of_label[labels[order][first]] = order[first]
+    canonical = canonical_of_label[labels]
+
+    distances = np.bitwise_count(hashes ^ hashes[canonical])
+    return np.where(distances <= threshold, canonical, index)
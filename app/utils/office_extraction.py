@@ -0,0 +1,148 @@
+import hashlib
+import io
+import math
+import posixpath
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional, Union
+from xml.etree import ElementTree
+
+from app.config import settings
+from app.exceptions.custom_exception import CustomException
+
+# An Office document is given either as a path on local disk or as in-memory bytes
+OfficeSource = Union[str, bytes]
+
+# Part that identifies each container format, and the folder holding its media
+_MAIN_PARTS = {
+    "pptx": "ppt/presentation.xml",
+    "docx": "word/document.xml",
+    "xlsx": "xl/workbook.xml",
+}
+MEDIA_PREFIXES = {
+    "pptx": "ppt/media/",
+    "docx": "word/media/",
+    "xlsx": "xl/media/",
+}
+
+# Raster formats the pipeline can classify and describe; EMF/WMF and other
+# vector previews are left out
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "bmp", "tif", "tiff", "webp"}
+
+_SLIDE_RELS = re.compile(r"^ppt/slides/_rels/slide(\d+)\.xml\.rels$")
+_RELATIONSHIP = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+# relationship parts are tiny; anything larger is not worth parsing
+_MAX_RELS_BYTES = 1024 * 1024
+_DIGITS = re.compile(r"(\d+)")
+
+
+def open_archive(source: OfficeSource) -> zipfile.ZipFile:
+    """Open the zip container; only its central directory is read"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        return zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise CustomException(
+            status_code=415,
+            detail="Unsupported or corrupt document",
+            exception_type="UnsupportedFileTypeError",
+            additional_info={"error": str(e)},
+        )
+
+
+def office_format(archive: zipfile.ZipFile) -> str:
+    """Tell PPTX, DOCX and XLSX apart by their main part"""
+    names = set(archive.namelist())
+    for kind, part in _MAIN_PARTS.items():
+        if part in names:
+            return kind
+    raise CustomException(
+        status_code=415,
+        detail="Unsupported document type",
+        exception_type="UnsupportedFileTypeError",
+        additional_info={"supported": ["pdf", *_MAIN_PARTS]},
+    )
+
+
+def plan_members(archive: zipfile.ZipFile, kind: str) -> List[zipfile.ZipInfo]:
+    """
+    Select the media members worth extracting using central-directory metadata
+    only: location, extension, declared size and compression ratio. Nothing is
+    decompressed here. Members below the pre-filter's byte floor are dropped
+    the same way the pre-filter would drop them.
+    """
+    prefix = MEDIA_PREFIXES[kind]
+    min_bytes = settings.FILTER_MIN_BYTES if settings.FILTER_ENABLED else 0
+    members = []
+    for info in archive.infolist():
+        if info.is_dir() or not info.filename.startswith(prefix):
+            continue
+        extension = posixpath.splitext(info.filename)[1].lstrip(".").lower()
+        if extension not in IMAGE_EXTENSIONS:
+            continue
+        if info.flag_bits & 0x1:
+            # encrypted
+            continue
+        if info.file_size < min_bytes or info.file_size > settings.OFFICE_MAX_MEMBER_BYTES:
+            continue
+        if info.compress_size and info.file_size / info.compress_size > settings.OFFICE_MAX_COMPRESSION_RATIO:
+            # implausible for image data: likely a zip bomb
+            continue
+        members.append(info)
+    return members
+
+
+def slide_numbers(archive: zipfile.ZipFile) -> Dict[str, int]:
+    """Map each media member of a PPTX to the first slide that references it"""
+    first_slide: Dict[str, int] = {}
+    for info in archive.infolist():
+        match = _SLIDE_RELS.match(info.filename)
+        if match is None or info.file_size > _MAX_RELS_BYTES:
+            continue
+        slide = int(match.group(1))
+        try:
+            root = ElementTree.fromstring(archive.read(info))
+        except ElementTree.ParseError:
+            continue
+        for rel in root.iter(_RELATIONSHIP):
+            target = rel.get("Target")
+            if not target or rel.get("TargetMode") == "External":
+                continue
+            member = posixpath.normpath(posixpath.join("ppt/slides", target))
+            if slide < first_slide.get(member, math.inf):
+                first_slide[member] = slide
+    return first_slide
+
+
+def _natural_key(name: str):
+    """image10.png sorts after image9.png"""
+    return [int(part) if part.isdigit() else part for part in _DIGITS.split(name)]
+
+
+def iter_office_images(source: OfficeSource, kind: Optional[str] = None) -> Iterator[dict]:
+    """
+    Stream the images of a PPTX, DOCX or XLSX one member at a time, in slide
+    order for presentations. Only the member being yielded is held in memory.
+    Yields dicts: { 'image_bytes', 'filename', 'extension', 'page_number', 'xref', 'content_hash' }
+    """
+    with open_archive(source) as archive:
+        kind = kind or office_format(archive)
+        members = plan_members(archive, kind)
+        slides = slide_numbers(archive) if kind == "pptx" else {}
+        members.sort(key=lambda info: (slides.get(info.filename, math.inf), _natural_key(info.filename)))
+
+        for info in members:
+            with archive.open(info) as member:
+                # decompression stops at the declared size checked above
+                image_bytes = member.read()
+            basename = posixpath.basename(info.filename)
+            slide = slides.get(info.filename)
+            yield {
+                "image_bytes": image_bytes,
+                "filename": f"slide{slide}_{basename}" if slide is not None else basename,
+                "extension": posixpath.splitext(basename)[1].lstrip(".").lower(),
+                "page_number": slide,
+                "xref": None,
+                "content_hash": hashlib.sha256(image_bytes).hexdigest(),
+            }
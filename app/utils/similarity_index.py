@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.image_features import DESCRIPTOR_DIMS, FEATURE_VERSION, HASH_BITS, ImageFeatures
+
+logger = logging.getLogger(__name__)
+
+
+class SimilarityIndex:
+    """
+    In-memory nearest-neighbour index over image features. Hashes live in one
+    uint64 array and descriptors in one float16 matrix: a query is a Hamming
+    scan over every hash (one popcount per row), then a cosine rerank of the
+    `candidates` closest by Hamming distance. Scores blend both similarities.
+
+    Persisted to a single .npz together with `watermark`, the keyset cursor
+    of the last image row it has seen, so a reload only catches up on newer rows.
+    """
+
+    def __init__(self, candidates: int = 512, hash_weight: float = 0.5, capacity: int = 1024):
+        self.candidates = candidates
+        self.hash_weight = hash_weight
+        self._ids: List[uuid.UUID] = []
+        self._positions: Dict[uuid.UUID, int] = {}
+        self._hashes = np.zeros(capacity, dtype=np.uint64)
+        self._vectors = np.zeros((capacity, DESCRIPTOR_DIMS), dtype=np.float16)
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.watermark: Optional[str] = None
+        self.refreshed_at = 0.0
+        self.refresh_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, image_id: uuid.UUID) -> bool:
+        return image_id in self._positions
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= len(self._hashes):
+            return
+        capacity = max(needed, len(self._hashes) * 2)
+        hashes = np.zeros(capacity, dtype=np.uint64)
+        hashes[:self._size] = self._hashes[:self._size]
+        vectors = np.zeros((capacity, DESCRIPTOR_DIMS), dtype=np.float16)
+        vectors[:self._size] = self._vectors[:self._size]
+        # swapped whole, so a concurrent query keeps reading the old arrays
+        self._hashes, self._vectors = hashes, vectors
+
+    def add_many(self, image_ids: Sequence[uuid.UUID], hashes: np.ndarray, vectors: np.ndarray) -> None:
+        """Insert or replace many images; `hashes` are uint64, `vectors` (n, DESCRIPTOR_DIMS)"""
+        with self._lock:
+            self._reserve(len(image_ids))
+            for image_id, phash, vector in zip(image_ids, hashes, vectors):
+                position = self._positions.get(image_id)
+                if position is None:
+                    position = self._size
+                    self._positions[image_id] = position
+                    self._ids.append(image_id)
+                    self._size += 1
+                self._hashes[position] = phash
+                self._vectors[position] = vector
+
+    def add(self, image_id: uuid.UUID, features: ImageFeatures) -> None:
+        self.add_many(
+            [image_id],
+            np.array([features.phash], dtype=np.uint64),
+            features.descriptor[None, :],
+        )
+
+    def get(self, image_id: uuid.UUID) -> Optional[ImageFeatures]:
+        position = self._positions.get(image_id)
+        if position is None:
+            return None
+        return ImageFeatures(int(self._hashes[position]), self._vectors[position].copy())
+
+    def query(self, features: ImageFeatures, k: int = 10, exclude: Optional[uuid.UUID] = None) -> List[dict]:
+        """Top-k images by blended Hamming/cosine similarity, best first"""
+        with self._lock:
+            size = self._size
+            hashes = self._hashes[:size]
+            vectors = self._vectors
+            ids = self._ids
+        if size == 0:
+            return []
+
+        distances = np.bitwise_count(hashes ^ np.uint64(features.phash))
+        count = min(size, max(self.candidates, k * 4))
+        if count < size:
+            # distances only take 65 values: a histogram finds the cutoff in one
+            # pass, which is several times faster than argpartition at this size
+            cumulative = np.cumsum(np.bincount(distances, minlength=HASH_BITS + 1))
+            cutoff = int(np.searchsorted(cumulative, count))
+            below = np.flatnonzero(distances < cutoff)
+            at_cutoff = np.flatnonzero(distances == cutoff)[:count - len(below)]
+            candidates = np.concatenate([below, at_cutoff])
+        else:
+            candidates = np.arange(size)
+
+        cosine = vectors[candidates].astype(np.float32) @ features.descriptor.astype(np.float32)
+        hamming = distances[candidates]
+        scores = self.hash_weight * (1.0 - hamming / HASH_BITS) + (1.0 - self.hash_weight) * cosine
+        if exclude is not None and exclude in self._positions:
+            scores[candidates == self._positions[exclude]] = -np.inf
+
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [
+            {
+                "image_id": ids[candidates[i]],
+                "hamming_distance": int(hamming[i]),
+                "cosine_similarity": round(float(cosine[i]), 4),
+                "score": round(float(scores[i]), 4),
+            }
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+
+    def save(self, path: str) -> None:
+        """Write atomically: a crash mid-save leaves the previous file intact"""
+        with self._lock:
+            size = self._size
+            ids = np.frombuffer(b"".join(image_id.bytes for image_id in self._ids), dtype=np.uint8).reshape(size, 16)
+            hashes = self._hashes[:size].copy()
+            vectors = self._vectors[:size].copy()
+            meta = json.dumps({
+                "feature_version": FEATURE_VERSION,
+                "descriptor_dims": DESCRIPTOR_DIMS,
+                "watermark": self.watermark,
+            })
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, ids=ids, hashes=hashes, vectors=vectors, meta=np.array(meta))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "SimilarityIndex":
+        """Load a saved index; a missing or outdated file gives an empty index"""
+        index = cls(**kwargs)
+        if not path or not os.path.exists(path):
+            return index
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("feature_version") != FEATURE_VERSION or meta.get("descriptor_dims") != DESCRIPTOR_DIMS:
+                    logger.info("Similarity index at %s is outdated; rebuilding", path)
+                    return index
+                ids = [uuid.UUID(bytes=row.tobytes()) for row in data["ids"]]
+                index.add_many(ids, data["hashes"], data["vectors"])
+                index.watermark = meta.get("watermark")
+        except Exception as e:
+            logger.warning("Failed to load similarity index from %s: %s", path, e)
+            return cls(**kwargs)
+        return index
@@ -0,0 +1,66 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import UploadFile
+
+from app.config import settings
+from app.exceptions.custom_exception import CustomException
+from app.utils.metrics import timed
+
+
+def _too_large(filename: Optional[str], max_bytes: int) -> CustomException:
+    return CustomException(
+        status_code=413,
+        detail="Uploaded file is too large",
+        exception_type="UploadTooLargeError",
+        additional_info={"file_name": filename, "max_bytes": max_bytes},
+    )
+
+
+@asynccontextmanager
+async def spooled_upload(
+        upload: UploadFile,
+        max_bytes: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Stream an upload to a temporary file in fixed-size chunks and yield its path.
+    The size limit is checked on every chunk, so an oversized upload is rejected
+    without ever being held in memory. The file is removed on exit.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    # Starlette already knows the size of a fully received part
+    if upload.size is not None and upload.size > max_bytes:
+        raise _too_large(upload.filename, max_bytes)
+
+    _, ext = os.path.splitext(upload.filename or "")
+    fd, path = tempfile.mkstemp(suffix=ext, dir=settings.UPLOAD_SPOOL_DIR)
+    try:
+        with timed("upload_read") as stage, os.fdopen(fd, "wb") as f:
+            while chunk := await upload.read(chunk_size):
+                stage.items += len(chunk)
+                if stage.items > max_bytes:
+                    raise _too_large(upload.filename, max_bytes)
+                await asyncio.to_thread(f.write, chunk)
+        yield path
+    finally:
+        os.unlink(path)
+
+
+def _sha256(path: str, chunk_size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def file_sha256(path: str, chunk_size: Optional[int] = None) -> str:
+    """SHA-256 of a spooled file, read in chunks off the event loop"""
+    return await asyncio.to_thread(_sha256, path, chunk_size or settings.UPLOAD_CHUNK_SIZE)
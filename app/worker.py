@@ -0,0 +1,49 @@
+"""
+Standalone job worker: `python -m app.worker [--concurrency N]`.
+
+Claims processing jobs queued by /file/process-file from the same database as
+the API, so workers can run on any number of nodes. Run the API with
+JOB_WORKERS=0 to leave all processing to these workers.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+from types import SimpleNamespace
+
+from app.config import settings
+from app.container import build_job_workers, close_clients, open_clients
+from app.utils.metrics import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+async def run(concurrency: int) -> None:
+    configure_logging(settings.LOG_LEVEL)
+    state = SimpleNamespace()
+    await open_clients(state)
+    workers = build_job_workers(state, concurrency=concurrency)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    workers.start()
+    logger.info("Job worker started with %d worker(s)", concurrency)
+    try:
+        await stop.wait()
+    finally:
+        # Running jobs are handed back to the queue
+        await workers.stop()
+        await close_clients(state)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background file processing workers")
+    parser.add_argument("--concurrency", type=int, default=max(settings.JOB_WORKERS, 1))
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
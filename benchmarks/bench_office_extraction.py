@@ -0,0 +1,138 @@
+"""
+Compare the legacy PPTX extractor (app/utils/extract_image.py) with the
+streaming Office extraction used by FileService on a synthetic deck.
+
+The deck mixes distinct photos, a logo repeated on every slide, tiny bullet
+images and EMF previews, stored the way PowerPoint stores media. No services
+are needed:
+
+    python -m benchmarks.bench_office_extraction --slides 300 --images-per-slide 3
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from PIL import Image
+
+from app.utils.extract_image import extract_images_from_pptx
+from app.utils.office_extraction import iter_office_images
+
+_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_IMAGE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+
+
+def _photo(rng: random.Random, side: int) -> bytes:
+    # Noise compresses about as badly as real photos do
+    image = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _png(color, side: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (side, side), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def build_deck(path: str, slides: int, images_per_slide: int, side: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    media = 0
+    media_bytes = 0
+    with zipfile.ZipFile(path, "w") as deck:
+        deck.writestr("ppt/presentation.xml", "<p:presentation/>", compress_type=zipfile.ZIP_DEFLATED)
+        logo = _png((200, 30, 30), 256)
+        deck.writestr("ppt/media/logo.png", logo)
+        bullet = _png((0, 0, 0), 8)
+        deck.writestr("ppt/media/bullet.png", bullet)
+        media += 2
+        media_bytes += len(logo) + len(bullet)
+
+        for slide in range(1, slides + 1):
+            targets = ["../media/logo.png", "../media/bullet.png"]
+            for i in range(images_per_slide):
+                name = f"image{slide}_{i}.jpeg"
+                data = _photo(rng, side)
+                deck.writestr(f"ppt/media/{name}", data)
+                targets.append(f"../media/{name}")
+                media += 1
+                media_bytes += len(data)
+            # vector preview the pipeline cannot describe
+            emf = rng.randbytes(4096)
+            deck.writestr(f"ppt/media/preview{slide}.emf", emf)
+            targets.append(f"../media/preview{slide}.emf")
+            media += 1
+            media_bytes += len(emf)
+
+            rels = "".join(
+                f'<Relationship Id="rId{n}" Type="{_IMAGE_REL}" Target="{target}"/>'
+                for n, target in enumerate(targets, start=1)
+            )
+            deck.writestr(
+                f"ppt/slides/_rels/slide{slide}.xml.rels",
+                f'<?xml version="1.0"?><Relationships xmlns="{_RELS_NS}">{rels}</Relationships>',
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+            deck.writestr(f"ppt/slides/slide{slide}.xml", "<p:sld/>", compress_type=zipfile.ZIP_DEFLATED)
+    return {"media_members": media, "media_bytes": media_bytes, "deck_bytes": os.path.getsize(path)}
+
+
+def _measure(name: str, run) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    images, image_bytes = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mode": name,
+        "images": images,
+        "image_bytes": image_bytes,
+        "seconds": round(elapsed, 4),
+        "images_per_second": round(images / elapsed, 1) if elapsed else None,
+        "peak_traced_bytes": peak,
+    }
+
+
+def _legacy(deck_path: str, output_dir: str):
+    with contextlib.redirect_stdout(io.StringIO()):
+        extract_images_from_pptx(deck_path, output_dir)
+    names = os.listdir(output_dir)
+    return len(names), sum(os.path.getsize(os.path.join(output_dir, name)) for name in names)
+
+
+def _streaming(deck_path: str):
+    images = 0
+    image_bytes = 0
+    for image in iter_office_images(deck_path):
+        images += 1
+        image_bytes += len(image["image_bytes"])
+    return images, image_bytes
+
+
+def main(slides: int, images_per_slide: int, side: int) -> None:
+    with tempfile.TemporaryDirectory() as workdir:
+        deck_path = os.path.join(workdir, "deck.pptx")
+        deck = build_deck(deck_path, slides, images_per_slide, side)
+        output_dir = os.path.join(workdir, "legacy")
+        results = [
+            _measure("legacy_extract_images_from_pptx", lambda: _legacy(deck_path, output_dir)),
+            _measure("iter_office_images", lambda: _streaming(deck_path)),
+        ]
+    print(json.dumps({"deck": {"slides": slides, **deck}, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slides", type=int, default=300)
+    parser.add_argument("--images-per-slide", type=int, default=3)
+    parser.add_argument("--side", type=int, default=384, help="edge length of the synthetic photos")
+    args = parser.parse_args()
+    main(args.slides, args.images_per_slide, args.side)
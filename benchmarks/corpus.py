@@ -0,0 +1,123 @@
+"""
+Synthetic documents for the benchmarks: PDFs built with PyMuPDF and PPTX
+decks laid out the way PowerPoint stores media. Page, image and size counts
+and the share of duplicated images are controllable, and the same seed
+always gives the same bytes.
+"""
+import io
+import os
+import random
+import zipfile
+from typing import List
+
+import fitz
+from PIL import Image
+
+_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_IMAGE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+
+
+def photo(rng: random.Random, side: int, quality: int = 85) -> bytes:
+    """
+    A JPEG that survives the pre-filter: a random two-colour gradient with
+    noise, so it compresses about as well as a real photo does.
+    """
+    base = Image.linear_gradient("L").resize((side, side)).rotate(rng.uniform(0, 360))
+    tint = Image.new("RGB", (side, side), tuple(rng.randrange(256) for _ in range(3)))
+    shade = Image.new("RGB", (side, side), tuple(rng.randrange(256) for _ in range(3)))
+    image = Image.composite(tint, shade, base)
+    noise = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    image = Image.blend(image, noise, 0.25)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _images(count: int, side: int, duplicate_rate: float, rng: random.Random) -> List[bytes]:
+    """`count` images, each a copy of an earlier one with probability `duplicate_rate`"""
+    images: List[bytes] = []
+    for _ in range(count):
+        if images and rng.random() < duplicate_rate:
+            images.append(rng.choice(images))
+        else:
+            images.append(photo(rng, side))
+    return images
+
+
+def build_pdf(
+        path: str,
+        pages: int,
+        images_per_page: int,
+        side: int = 256,
+        duplicate_rate: float = 0.0,
+        seed: int = 0,
+) -> dict:
+    """Write a PDF with `images_per_page` images and a line of text on every page"""
+    rng = random.Random(seed)
+    images = _images(pages * images_per_page, side, duplicate_rate, rng)
+    doc = fitz.open()
+    try:
+        for page_number in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 48), f"Synthetic page {page_number + 1}", fontsize=14)
+            for slot in range(images_per_page):
+                column, row = slot % 3, slot // 3
+                rect = fitz.Rect(40 + column * 180, 80 + row * 180, 200 + column * 180, 240 + row * 180)
+                page.insert_image(rect, stream=images[page_number * images_per_page + slot])
+        doc.save(path, garbage=0, deflate=False)
+    finally:
+        doc.close()
+    return {
+        "format": "pdf",
+        "pages": pages,
+        "images": len(images),
+        "distinct_images": len(set(images)),
+        "bytes": os.path.getsize(path),
+    }
+
+
+def build_pptx(
+        path: str,
+        slides: int,
+        images_per_slide: int,
+        side: int = 256,
+        duplicate_rate: float = 0.0,
+        seed: int = 0,
+) -> dict:
+    """Write a deck with one media member per placed image; duplicates are separate members"""
+    rng = random.Random(seed)
+    images = _images(slides * images_per_slide, side, duplicate_rate, rng)
+    with zipfile.ZipFile(path, "w") as deck:
+        deck.writestr("ppt/presentation.xml", "<p:presentation/>", compress_type=zipfile.ZIP_DEFLATED)
+        for slide in range(1, slides + 1):
+            targets = []
+            for slot in range(images_per_slide):
+                name = f"image{slide}_{slot}.jpeg"
+                # JPEG data barely compresses, so PowerPoint stores it as is
+                deck.writestr(f"ppt/media/{name}", images[(slide - 1) * images_per_slide + slot])
+                targets.append(f"../media/{name}")
+            rels = "".join(
+                f'<Relationship Id="rId{n}" Type="{_IMAGE_REL}" Target="{target}"/>'
+                for n, target in enumerate(targets, start=1)
+            )
+            deck.writestr(
+                f"ppt/slides/_rels/slide{slide}.xml.rels",
+                f'<?xml version="1.0"?><Relationships xmlns="{_RELS_NS}">{rels}</Relationships>',
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+            deck.writestr(f"ppt/slides/slide{slide}.xml", "<p:sld/>", compress_type=zipfile.ZIP_DEFLATED)
+    return {
+        "format": "pptx",
+        "pages": slides,
+        "images": len(images),
+        "distinct_images": len(set(images)),
+        "bytes": os.path.getsize(path),
+    }
+
+
+def build_document(path: str, document_format: str, **kwargs) -> dict:
+    if document_format == "pdf":
+        return build_pdf(path, kwargs.pop("pages"), kwargs.pop("images_per_page"), **kwargs)
+    if document_format == "pptx":
+        return build_pptx(path, kwargs.pop("pages"), kwargs.pop("images_per_page"), **kwargs)
+    raise ValueError(f"unsupported benchmark document format: {document_format}")
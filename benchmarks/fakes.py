@@ -0,0 +1,289 @@
+"""
+In-memory stand-ins for the storage client, the OpenAI clients and the
+database, with a configurable latency per call, so FileService can be
+benchmarked without any service. Each fake counts its calls.
+"""
+import asyncio
+import collections
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Union
+
+from app.client.openai_client import AsyncOpenAIClient, GeneratedVisualItemModel, image_description_messages
+from app.client.storage import StorageBackend
+from app.exceptions.custom_exception import CustomException
+from app.models.image_model import ImageStatusEnum
+
+
+class Latency:
+    """`seconds` per call, give or take `jitter` of it, from a seeded generator"""
+
+    def __init__(self, seconds: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.seconds = seconds
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        if not self.seconds:
+            return 0.0
+        with self._lock:
+            spread = self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.seconds * (1 + spread))
+
+    def block(self) -> None:
+        delay = self.sample()
+        if delay:
+            time.sleep(delay)
+
+    async def wait(self) -> None:
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class FakeStorageClient(StorageBackend):
+    """Storage backend kept in a dict, answering after `latency`"""
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency()
+        self.objects: Dict[tuple, bytes] = {}
+        self.calls = collections.Counter()
+
+    async def upload_file(
+            self,
+            bucket_name: str,
+            file_name: str,
+            content: Union[bytes, str],
+            upsert: bool = False,
+            content_type: Optional[str] = None,
+    ):
+        await self.latency.wait()
+        if isinstance(content, str):
+            with open(content, "rb") as f:
+                content = f.read()
+        self.calls["upload"] += 1
+        key = (bucket_name, file_name)
+        if key in self.objects and not upsert:
+            raise CustomException(
+                status_code=500,
+                detail="Failed to upload file to storage",
+                additional_info={"error": "The resource already exists", "file_name": file_name},
+                exception_type="StorageUploadError",
+            )
+        self.objects[key] = content
+        return f"{bucket_name}/{file_name}"
+
+    async def download_file(self, bucket_name: str, file_name: str) -> bytes:
+        await self.latency.wait()
+        self.calls["download"] += 1
+        return self.objects[(bucket_name, file_name)]
+
+    async def stream_file(self, bucket_name: str, file_name: str, chunk_size: int = 1024 * 1024):
+        content = await self.download_file(bucket_name, file_name)
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    async def delete_many(self, bucket_name: str, file_names: List[str]) -> List[str]:
+        await self.latency.wait()
+        self.calls["delete"] += 1
+        return [name for name in file_names if self.objects.pop((bucket_name, name), None) is not None]
+
+    def get_image_url(self, bucket_name: str, file_name: str) -> str:
+        return f"memory://{bucket_name}/{file_name}"
+
+
+def _described() -> GeneratedVisualItemModel:
+    return GeneratedVisualItemModel(
+        type="image",
+        content={"type": "image", "title": "Synthetic image", "alt_text": None},
+        description="A synthetic benchmark image.",
+    )
+
+
+class FakeOpenAIClient:
+    """
+    OpenAIClient with a blocking `image_description`. The vision request is
+    still built, so image preprocessing costs what it does in production.
+    """
+
+    def __init__(self, latency: Optional[Latency] = None, model: str = "gpt-4o"):
+        self.latency = latency or Latency()
+        self.model = model
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def image_description(self, image_bytes: bytes, model: str = "gpt-4o", max_tokens: int = 1000):
+        image_description_messages(image_bytes)
+        self.latency.block()
+        with self._lock:
+            self.calls += 1
+        return _described()
+
+    def close(self) -> None:
+        return None
+
+
+class FakeAsyncOpenAIClient(AsyncOpenAIClient):
+    """AsyncOpenAIClient answering after `latency`, under the same concurrency cap"""
+
+    def __init__(self, latency: Optional[Latency] = None, model: str = "gpt-4o", max_concurrency: int = 16):
+        # No HTTP client: only the parts FileService relies on
+        self.latency = latency or Latency()
+        self.model = model
+        self.calls = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def image_description(self, image_bytes: bytes, model: str = "gpt-4o", max_tokens: int = 1000):
+        await asyncio.to_thread(image_description_messages, image_bytes)
+        async with self._semaphore:
+            await self.latency.wait()
+        self.calls += 1
+        return _described()
+
+    async def close(self) -> None:
+        return None
+
+
+class FakeDatabase:
+    """Tables shared by the fake repositories, plus per-statement accounting"""
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency()
+        self.files: Dict[uuid.UUID, SimpleNamespace] = {}
+        self.images: Dict[uuid.UUID, SimpleNamespace] = {}
+        self.statements = 0
+        self.commits = 0
+
+    async def round_trip(self) -> None:
+        self.statements += 1
+        await self.latency.wait()
+
+    def session(self) -> "FakeSession":
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+
+    async def commit(self) -> None:
+        self.database.commits += 1
+        await self.database.round_trip()
+
+    async def rollback(self) -> None:
+        await self.database.round_trip()
+
+    async def close(self) -> None:
+        return None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class FakeFileRepository:
+    def __init__(self, session: FakeSession):
+        self.db = session
+        self.database = session.database
+
+    async def create(self, obj_in: dict):
+        await self.database.round_trip()
+        record = SimpleNamespace(
+            id=uuid.uuid4(), status="processing", skipped_images=None, content_hash=None,
+            created_at=_now(), updated_at=None,
+        )
+        record.__dict__.update(obj_in)
+        self.database.files[record.id] = record
+        return record
+
+    async def get(self, id: uuid.UUID):
+        await self.database.round_trip()
+        return self.database.files.get(id)
+
+    async def get_by_content_hash(self, content_hash: str):
+        await self.database.round_trip()
+        return next((f for f in self.database.files.values() if f.content_hash == content_hash), None)
+
+    async def get_or_create_by_content_hash(self, obj_in: dict):
+        existing = next(
+            (f for f in self.database.files.values() if f.content_hash == obj_in["content_hash"]), None
+        )
+        if existing is not None:
+            await self.database.round_trip()
+            return existing, False
+        return await self.create(obj_in), True
+
+    async def update(self, id: uuid.UUID, obj_in: dict):
+        await self.database.round_trip()
+        record = self.database.files.get(id)
+        if record is not None:
+            record.__dict__.update(obj_in)
+        return record
+
+
+class FakeImageRepository:
+    """The ImageRepository calls FileService makes, one simulated round-trip each"""
+
+    def __init__(self, session: FakeSession):
+        self.db = session
+        self.database = session.database
+
+    async def get(self, id: uuid.UUID):
+        await self.database.round_trip()
+        return self.database.images.get(id)
+
+    async def get_many(self, ids: List[uuid.UUID]):
+        await self.database.round_trip()
+        return [self.database.images[id] for id in ids if id in self.database.images]
+
+    async def get_for_file(self, file_id: uuid.UUID):
+        await self.database.round_trip()
+        return [image for image in self.database.images.values() if image.file_id == file_id]
+
+    async def get_storage_paths(self, content_hashes: List[str]) -> Dict[str, str]:
+        await self.database.round_trip()
+        wanted = set(content_hashes)
+        done = (ImageStatusEnum.uploaded.value, ImageStatusEnum.described.value)
+        found = {}
+        for image in self.database.images.values():
+            if image.content_hash in wanted and image.status in done and image.storage_path:
+                found.setdefault(image.content_hash, image.storage_path)
+        return found
+
+    async def create_many(self, objs_in: List[dict]):
+        if not objs_in:
+            return []
+        await self.database.round_trip()
+        created = []
+        for obj_in in objs_in:
+            image = SimpleNamespace(status=ImageStatusEnum.pending.value, created_at=_now(), updated_at=None)
+            image.__dict__.update(obj_in)
+            self.database.images[image.id] = image
+            created.append(image)
+        return created
+
+    async def update_many(self, ids: List[uuid.UUID], obj_in: dict) -> int:
+        if not ids:
+            return 0
+        await self.database.round_trip()
+        for id in ids:
+            self.database.images[id].__dict__.update(obj_in)
+        return len(ids)
+
+    async def update_each(self, objs_in: List[dict]) -> None:
+        if not objs_in:
+            return
+        await self.database.round_trip()
+        for obj_in in objs_in:
+            self.database.images[obj_in["id"]].__dict__.update(obj_in)
+
+    async def count_by_status(self, file_id: uuid.UUID) -> Dict[str, int]:
+        await self.database.round_trip()
+        return dict(collections.Counter(
+            image.status for image in self.database.images.values() if image.file_id == file_id
+        ))
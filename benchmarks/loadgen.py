@@ -0,0 +1,340 @@
+"""
+Closed-loop load generator for a running app: for every concurrency level,
+that many clients send requests back to back for --duration seconds, after a
+--warmup whose requests are not counted. Prints JSON with requests per second,
+latency percentiles and status codes per level, the app's event-loop lag over
+the level (from its /metrics) and the level at which throughput stopped
+growing.
+
+Against the local stand-ins (benchmarks/standins.py), started here along with
+one uvicorn worker of the app; the database is the one in DATABASE_URL:
+
+    python -m benchmarks.loadgen --start-standins --start-app \\
+        --scenario process-file --concurrency 1,2,4,8,16 --duration 30 \\
+        --openai-latency 1.5 --openai-429-rate 0.02 --output load.json
+
+Without --start-app it loads the app at --url, configured by the caller.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.corpus import build_document, photo
+from benchmarks.standins import add_arguments as add_standin_arguments
+
+LAG_METRIC = "zedny_event_loop_lag_seconds"
+
+
+def _percentiles(samples: List[float]) -> dict:
+    if not samples:
+        return {}
+    values = np.percentile(np.asarray(samples), [50, 90, 95, 99])
+    return {
+        "p50": round(float(values[0]), 6),
+        "p90": round(float(values[1]), 6),
+        "p95": round(float(values[2]), 6),
+        "p99": round(float(values[3]), 6),
+        "max": round(float(max(samples)), 6),
+    }
+
+
+class Payloads:
+    """
+    Request bodies for a scenario. With `unique` a random trailer is appended
+    to every body (ignored by PDF, PPTX and JPEG readers), so the app cannot
+    answer from its content-hash or description caches.
+    """
+
+    def __init__(self, scenario: str, args: argparse.Namespace, workdir: str):
+        self.scenario = scenario
+        self.unique = args.unique
+        self._next = 0
+        rng = random.Random(args.seed)
+        if scenario == "describe-image":
+            self.bodies = [photo(rng, args.side) for _ in range(args.pool)]
+            self.filename = "image.jpg"
+            return
+        self.bodies = []
+        for i in range(args.pool):
+            path = os.path.join(workdir, f"load{i}.{args.format}")
+            build_document(
+                path, args.format, pages=args.pages, images_per_page=args.images_per_page,
+                side=args.side, duplicate_rate=args.duplicate_rate, seed=args.seed + i,
+            )
+            with open(path, "rb") as f:
+                self.bodies.append(f.read())
+        self.filename = f"document.{args.format}"
+
+    def next(self) -> bytes:
+        body = self.bodies[self._next % len(self.bodies)]
+        self._next += 1
+        if self.unique:
+            # PDF comment after %%EOF, zip trailing data, bytes after the JPEG EOI
+            body = body + b"\n%" + uuid.uuid4().hex.encode() + b"\n"
+        return body
+
+
+def _request(client: httpx.AsyncClient, payloads: Payloads, wait: bool):
+    if payloads.scenario == "describe-image":
+        files = {"file": (payloads.filename, payloads.next(), "image/jpeg")}
+        return client.post("/file/describe-image", files=files)
+    files = {"pdf_file": (payloads.filename, payloads.next(), "application/octet-stream")}
+    return client.post("/file/process-file", params={"wait": "true" if wait else "false"}, files=files)
+
+
+def _lag_buckets(text: str) -> Dict[float, float]:
+    """Cumulative bucket counts of the app's event-loop lag histogram"""
+    buckets = {}
+    for family in text_string_to_metric_families(text):
+        if family.name != LAG_METRIC:
+            continue
+        for sample in family.samples:
+            if sample.name == f"{LAG_METRIC}_bucket":
+                buckets[float(sample.labels["le"])] = sample.value
+    return buckets
+
+
+def _bucket_quantile(quantile: float, buckets: Dict[float, float]) -> Optional[float]:
+    """Quantile of a cumulative histogram, interpolated within buckets like PromQL's histogram_quantile"""
+    bounds = sorted(buckets)
+    if not bounds or not buckets[bounds[-1]]:
+        return None
+    rank = quantile * buckets[bounds[-1]]
+    lower, below = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * ((rank - below) / (count - below) if count > below else 0.0)
+        lower, below = bound, count
+    return lower
+
+
+async def _scrape_lag(client: httpx.AsyncClient) -> Optional[Dict[float, float]]:
+    try:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    return _lag_buckets(response.text) or None
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
+
+
+def _lag_report(before: Optional[dict], after: Optional[dict]) -> Optional[dict]:
+    if before is None or after is None:
+        return None
+    delta = {bound: after[bound] - before.get(bound, 0.0) for bound in after}
+    total = delta.get(float("inf"), 0.0)
+    return {
+        "samples": int(total),
+        "p50": _round(_bucket_quantile(0.5, delta)),
+        "p99": _round(_bucket_quantile(0.99, delta)),
+        # share of samples at least 100 ms late: requests stalled behind blocking work
+        "over_100ms": round(1 - delta.get(0.1, 0.0) / total, 4) if total else None,
+    }
+
+
+async def _local_lag(stop: asyncio.Event, samples: List[float], interval: float = 0.05) -> None:
+    """Lag of the generator's own loop; if high, the generator is the bottleneck"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+async def run_level(
+        client: httpx.AsyncClient,
+        payloads: Payloads,
+        concurrency: int,
+        duration: float,
+        warmup: float,
+        wait: bool,
+) -> dict:
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    local_lag: List[float] = []
+    stop = asyncio.Event()
+
+    async def client_loop() -> None:
+        while loop.time() < deadline:
+            start = loop.time()
+            try:
+                response = await _request(client, payloads, wait)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            end = loop.time()
+            # requests completed inside the measured window count
+            if measure_from <= end <= deadline:
+                latencies.append(end - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    monitor = asyncio.create_task(_local_lag(stop, local_lag))
+    clients = [asyncio.create_task(client_loop()) for _ in range(concurrency)]
+    await asyncio.sleep(max(0.0, measure_from - loop.time()))
+    lag_before = await _scrape_lag(client)
+    await asyncio.sleep(max(0.0, deadline - loop.time()))
+    lag_after = await _scrape_lag(client)
+    await asyncio.gather(*clients)
+    stop.set()
+    await monitor
+
+    succeeded = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / duration, 3),
+        "successes_per_second": round(succeeded / duration, 3),
+        "error_rate": round(1 - succeeded / len(latencies), 4) if latencies else None,
+        "latency_seconds": _percentiles(latencies),
+        "status_codes": statuses,
+        "app_event_loop_lag_seconds": _lag_report(lag_before, lag_after),
+        "generator_event_loop_lag_max_seconds": round(max(local_lag), 6) if local_lag else None,
+    }
+
+
+def _saturation(levels: List[dict], gain: float = 0.05) -> Optional[int]:
+    """First concurrency level that added less than `gain` successful throughput"""
+    for previous, level in zip(levels, levels[1:]):
+        if level["successes_per_second"] < previous["successes_per_second"] * (1 + gain):
+            return level["concurrency"]
+    return None
+
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{' '.join(process.args)} exited with status {process.returncode}")
+        with contextlib.suppress(httpx.HTTPError):
+            httpx.get(url, timeout=1.0)
+            return
+        time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up within {timeout:.0f}s")
+
+
+@contextlib.contextmanager
+def _started(command: List[str], ready_url: str, env: Optional[dict] = None):
+    process = subprocess.Popen(command, env=env)
+    try:
+        _wait_until_up(ready_url, process)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def run(args: argparse.Namespace, payloads: Payloads) -> dict:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    levels = []
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        for concurrency in args.concurrency:
+            level = await run_level(client, payloads, concurrency, args.duration, args.warmup, args.wait)
+            print(
+                f"concurrency {concurrency}: {level['successes_per_second']} ok/s, "
+                f"p99 {level['latency_seconds'].get('p99')}s",
+                file=sys.stderr,
+            )
+            levels.append(level)
+    return {"levels": levels, "saturated_at_concurrency": _saturation(levels)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=("process-file", "describe-image"), default="process-file")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before each level")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds before a request is abandoned")
+    parser.add_argument("--no-wait", dest="wait", action="store_false",
+                        help="queue process-file jobs instead of processing within the request")
+    parser.add_argument("--no-unique", dest="unique", action="store_false",
+                        help="resend identical bodies, letting the app's caches answer repeats")
+    parser.add_argument("--pool", type=int, default=20, help="distinct documents or images to send")
+    parser.add_argument("--format", choices=("pdf", "pptx"), default="pdf")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--images-per-page", type=int, default=2)
+    parser.add_argument("--side", type=int, default=256, help="edge length of the synthetic images")
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--start-standins", action="store_true", help="run benchmarks.standins for the app")
+    parser.add_argument("--standins-port", type=int, default=9100)
+    parser.add_argument("--start-app", action="store_true", help="run one uvicorn worker of the app at --url")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    add_standin_arguments(parser)
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    with contextlib.ExitStack() as stack:
+        env = dict(os.environ)
+        if args.start_standins:
+            standins = f"http://127.0.0.1:{args.standins_port}"
+            stack.enter_context(_started(
+                [
+                    sys.executable, "-m", "benchmarks.standins", "--port", str(args.standins_port),
+                    "--storage-latency", str(args.storage_latency),
+                    "--storage-error-rate", str(args.storage_error_rate),
+                    "--openai-latency", str(args.openai_latency),
+                    "--openai-error-rate", str(args.openai_error_rate),
+                    "--openai-429-rate", str(args.openai_429_rate),
+                    "--jitter", str(args.jitter), "--seed", str(args.seed),
+                ],
+                f"{standins}/_standin/stats",
+            ))
+            env.update(STORAGE_URL=standins, OPENAI_BASE_URL=f"{standins}/v1")
+        if args.start_app:
+            # per-request logging would compete with the requests for the event loop
+            env.setdefault("LOG_LEVEL", "WARNING")
+            url = httpx.URL(args.url)
+            stack.enter_context(_started(
+                [
+                    sys.executable, "-m", "uvicorn", "app.main:app", "--workers", "1",
+                    "--host", url.host, "--port", str(url.port or 80), "--log-level", "warning",
+                ],
+                f"{args.url}/metrics",
+                env=env,
+            ))
+        workdir = stack.enter_context(tempfile.TemporaryDirectory())
+        payloads = Payloads(args.scenario, args, workdir)
+        result = asyncio.run(run(args, payloads))
+        if args.start_standins:
+            result["standins"] = httpx.get(f"http://127.0.0.1:{args.standins_port}/_standin/stats").json()
+
+    report = json.dumps({
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        **result,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
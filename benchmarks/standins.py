@@ -0,0 +1,190 @@
+"""
+Local stand-ins for the Supabase storage and OpenAI chat-completions APIs, for
+load-testing the app without calling (or paying for) the real services. Each
+API answers after a configurable latency and fails a configurable share of
+requests, the way the real ones do: storage with a 500, OpenAI with a 500 or
+a 429 carrying retry-after-ms.
+
+    python -m benchmarks.standins --port 9100 --openai-latency 1.5 --openai-429-rate 0.02
+
+Then point the app at it:
+
+    STORAGE_URL=http://127.0.0.1:9100 OPENAI_BASE_URL=http://127.0.0.1:9100/v1 \\
+        uvicorn app.main:app
+
+Stored objects are kept in memory. GET /_standin/stats returns call and error
+counts per API.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import random
+import time
+import uuid
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+# A valid GeneratedVisualItemModel, so structured parsing in the client succeeds
+_DESCRIPTION = json.dumps({
+    "type": "image",
+    "content": {"type": "image", "title": "Stand-in image", "alt_text": None},
+    "description": "An image described by the local OpenAI stand-in.",
+})
+
+
+class _Upstream:
+    """Latency and failure behaviour of one emulated API"""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, rng: random.Random):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = rng
+        self.calls = collections.Counter()
+
+    async def wait(self) -> None:
+        if self.latency:
+            await asyncio.sleep(max(0.0, self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter))))
+
+    def fails(self, rate: Optional[float] = None) -> bool:
+        return self._rng.random() < (self.error_rate if rate is None else rate)
+
+
+def _storage_error(status_code: int, error: str, message: str) -> JSONResponse:
+    # storage3 reads these three fields from every error body
+    return JSONResponse(
+        status_code=status_code,
+        content={"statusCode": str(status_code), "error": error, "message": message},
+    )
+
+
+def build_app(
+        storage_latency: float = 0.02,
+        storage_error_rate: float = 0.0,
+        openai_latency: float = 1.0,
+        openai_error_rate: float = 0.0,
+        openai_429_rate: float = 0.0,
+        jitter: float = 0.2,
+        seed: int = 0,
+) -> FastAPI:
+    rng = random.Random(seed)
+    storage = _Upstream(storage_latency, jitter, storage_error_rate, rng)
+    openai = _Upstream(openai_latency, jitter, openai_error_rate, rng)
+    objects: dict = {}
+    app = FastAPI(title="Stand-ins")
+
+    @app.post("/storage/v1/object/{bucket}/{path:path}")
+    async def upload(bucket: str, path: str, request: Request):
+        await storage.wait()
+        if storage.fails():
+            storage.calls["error"] += 1
+            return _storage_error(500, "InternalError", "Injected storage failure")
+        form = await request.form()
+        content = await form["file"].read()
+        key = (bucket, path)
+        if key in objects and request.headers.get("x-upsert") != "true":
+            storage.calls["conflict"] += 1
+            return _storage_error(409, "Duplicate", "The resource already exists")
+        objects[key] = content
+        storage.calls["upload"] += 1
+        return {"Key": f"{bucket}/{path}", "Id": str(uuid.uuid4())}
+
+    @app.get("/storage/v1/object/{bucket}/{path:path}")
+    async def download(bucket: str, path: str):
+        await storage.wait()
+        if storage.fails():
+            storage.calls["error"] += 1
+            return _storage_error(500, "InternalError", "Injected storage failure")
+        content = objects.get((bucket, path))
+        if content is None:
+            return _storage_error(404, "not_found", "Object not found")
+        storage.calls["download"] += 1
+        return Response(content=content, media_type="application/octet-stream")
+
+    @app.delete("/storage/v1/object/{bucket}")
+    async def remove(bucket: str, request: Request):
+        await storage.wait()
+        prefixes = (await request.json()).get("prefixes", [])
+        removed = [path for path in prefixes if objects.pop((bucket, path), None) is not None]
+        storage.calls["delete"] += 1
+        return [{"name": path, "bucket_id": bucket} for path in removed]
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await openai.wait()
+        if openai.fails(openai_429_rate):
+            openai.calls["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after-ms": str(int(openai.latency * 1000) or 100)},
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+        if openai.fails():
+            openai.calls["error"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Injected server error", "type": "server_error", "code": None}},
+            )
+        openai.calls["completion"] += 1
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": _DESCRIPTION, "refusal": None},
+                "logprobs": None,
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 800, "completion_tokens": 60, "total_tokens": 860},
+        }
+
+    @app.get("/_standin/stats")
+    async def stats():
+        return {
+            "storage": dict(storage.calls),
+            "openai": dict(openai.calls),
+            "objects": len(objects),
+            "object_bytes": sum(len(content) for content in objects.values()),
+        }
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--storage-latency", type=float, default=0.02, help="seconds per storage request")
+    parser.add_argument("--storage-error-rate", type=float, default=0.0, help="share of storage requests failing")
+    parser.add_argument("--openai-latency", type=float, default=1.0, help="seconds per chat completion")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0, help="share of completions failing with 500")
+    parser.add_argument("--openai-429-rate", type=float, default=0.0, help="share of completions rate limited")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency spread, as a fraction")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    app = build_app(
+        storage_latency=args.storage_latency,
+        storage_error_rate=args.storage_error_rate,
+        openai_latency=args.openai_latency,
+        openai_error_rate=args.openai_error_rate,
+        openai_429_rate=args.openai_429_rate,
+        jitter=args.jitter,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
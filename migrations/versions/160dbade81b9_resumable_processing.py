@@ -0,0 +1,53 @@
+"""resumable processing
+
+Files are keyed by content hash instead of name, and images by their name
+within the file. Files already in the table count as completed unless a job
+for them is still queued or running.
+
+Revision ID: 160dbade81b9
+Revises: eac28612936b
+Create Date: 2026-10-18 09:25:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "160dbade81b9"
+down_revision: Union[str, Sequence[str], None] = "eac28612936b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint("files_file_name_key", "files", type_="unique")
+    op.add_column("files", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.create_unique_constraint("files_content_hash_key", "files", ["content_hash"])
+    op.add_column(
+        "files", sa.Column("status", sa.Text(), nullable=False, server_default=sa.text("'processing'"))
+    )
+    op.execute(
+        "UPDATE files SET status = 'completed' WHERE NOT EXISTS ("
+        "SELECT 1 FROM processing_jobs WHERE processing_jobs.file_id = files.id "
+        "AND processing_jobs.status IN ('queued', 'running'))"
+    )
+    op.alter_column("files", "status", server_default=None)
+
+    op.add_column("images", sa.Column("source_name", sa.String(length=255), nullable=True))
+    op.create_unique_constraint("uq_images_file_id_source_name", "images", ["file_id", "source_name"])
+    op.create_index("ix_processing_jobs_file_id", "processing_jobs", ["file_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_processing_jobs_file_id", table_name="processing_jobs")
+    op.drop_constraint("uq_images_file_id_source_name", "images", type_="unique")
+    op.drop_column("images", "source_name")
+    op.drop_column("files", "status")
+    op.drop_constraint("files_content_hash_key", "files", type_="unique")
+    op.drop_column("files", "content_hash")
+    # fails if files with the same name were uploaded since
+    op.create_unique_constraint("files_file_name_key", "files", ["file_name"])
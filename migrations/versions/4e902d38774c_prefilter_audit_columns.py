@@ -0,0 +1,30 @@
+"""pre-filter audit columns
+
+Revision ID: 4e902d38774c
+Revises: 7d6ba6446ad5
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "4e902d38774c"
+down_revision: Union[str, Sequence[str], None] = "7d6ba6446ad5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("files", sa.Column("skipped_images", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column("images", sa.Column("review_reason", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("images", "review_reason")
+    op.drop_column("files", "skipped_images")
@@ -0,0 +1,29 @@
+"""image similarity features
+
+Revision ID: 6ffcc3c7aebb
+Revises: 160dbade81b9
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "6ffcc3c7aebb"
+down_revision: Union[str, Sequence[str], None] = "160dbade81b9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("images", sa.Column("phash", sa.BigInteger(), nullable=True))
+    op.add_column("images", sa.Column("descriptor", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("images", "descriptor")
+    op.drop_column("images", "phash")
@@ -0,0 +1,31 @@
+"""content-address images
+
+Revision ID: 7d6ba6446ad5
+Revises: fae306a84699
+Create Date: 2026-10-18 09:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7d6ba6446ad5"
+down_revision: Union[str, Sequence[str], None] = "fae306a84699"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("images", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.add_column("images", sa.Column("storage_path", sa.Text(), nullable=True))
+    op.create_index("ix_images_content_hash", "images", ["content_hash"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_images_content_hash", table_name="images")
+    op.drop_column("images", "storage_path")
+    op.drop_column("images", "content_hash")
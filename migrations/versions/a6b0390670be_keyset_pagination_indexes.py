@@ -0,0 +1,30 @@
+"""keyset pagination indexes
+
+Revision ID: a6b0390670be
+Revises: 4e902d38774c
+Create Date: 2026-10-18 09:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a6b0390670be"
+down_revision: Union[str, Sequence[str], None] = "4e902d38774c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_files_created_at_id", "files", ["created_at", "id"])
+    op.create_index("ix_images_created_at_id", "images", ["created_at", "id"])
+    op.create_index("ix_images_file_id_created_at_id", "images", ["file_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_images_file_id_created_at_id", table_name="images")
+    op.drop_index("ix_images_created_at_id", table_name="images")
+    op.drop_index("ix_files_created_at_id", table_name="files")
@@ -0,0 +1,34 @@
+"""near-duplicate clusters
+
+Revision ID: b408427888a5
+Revises: 6ffcc3c7aebb
+Create Date: 2026-10-18 09:35:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "b408427888a5"
+down_revision: Union[str, Sequence[str], None] = "6ffcc3c7aebb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("images", sa.Column("duplicate_of", postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key(
+        "images_duplicate_of_fkey", "images", "images", ["duplicate_of"], ["id"], ondelete="SET NULL"
+    )
+    op.create_index("ix_images_duplicate_of", "images", ["duplicate_of"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_images_duplicate_of", table_name="images")
+    op.drop_constraint("images_duplicate_of_fkey", "images", type_="foreignkey")
+    op.drop_column("images", "duplicate_of")
@@ -0,0 +1,27 @@
+"""job retry backoff
+
+Revision ID: d03d5e3e2858
+Revises: b408427888a5
+Create Date: 2026-10-18 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "d03d5e3e2858"
+down_revision: Union[str, Sequence[str], None] = "b408427888a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("processing_jobs", sa.Column("run_after", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("processing_jobs", "run_after")
@@ -0,0 +1,52 @@
+"""processing jobs
+
+Revision ID: eac28612936b
+Revises: a6b0390670be
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "eac28612936b"
+down_revision: Union[str, Sequence[str], None] = "a6b0390670be"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_images_file_id", "images", ["file_id"])
+    op.create_table(
+        "processing_jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("file_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("file_name", sa.String(length=255), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("source_path", sa.Text(), nullable=False),
+        sa.Column("worker_id", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("result", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("error", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["file_id"], ["files.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_processing_jobs_id", "processing_jobs", ["id"])
+    op.create_index("ix_processing_jobs_status_created_at", "processing_jobs", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_processing_jobs_status_created_at", table_name="processing_jobs")
+    op.drop_index("ix_processing_jobs_id", table_name="processing_jobs")
+    op.drop_table("processing_jobs")
+    op.drop_index("ix_images_file_id", table_name="images")
@@ -0,0 +1,59 @@
+"""initial schema
+
+The files and images tables as Database.create_tables made them before
+migrations existed. A database created that way is at this revision:
+`alembic stamp fae306a84699`, then `alembic upgrade head`.
+
+Revision ID: fae306a84699
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "fae306a84699"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "files",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("file_name", sa.String(length=255), nullable=False),
+        sa.Column("course_name", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("file_name", name="files_file_name_key"),
+    )
+    op.create_index("ix_files_id", "files", ["id"])
+    op.create_table(
+        "images",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("file_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("type", sa.Enum("chart", "image", name="imagetypeenum"), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["file_id"], ["files.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_images_id", "images", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_images_id", table_name="images")
+    op.drop_table("images")
+    sa.Enum(name="imagetypeenum").drop(op.get_bind(), checkfirst=True)
+    op.drop_index("ix_files_id", table_name="files")
+    op.drop_table("files")
@@ -0,0 +1,186 @@
+import pytest
+
+from app.utils.captions import CaptionIndex, Cue, iter_caption_file, iter_cues, parse_timestamp, tokenize
+
+SRT = """\ufeff1
+00:00:01,000 --> 00:00:04,500
+The <i>rocket</i> lifts off
+
+2
+00:00:05,000 --> 00:00:08,000
+Engines shut down
+over the Atlantic
+
+3
+00:00:09,000 --> bad
+Broken timing
+"""
+
+VTT = """WEBVTT - mission log
+
+NOTE this block is a comment
+and spans two lines
+
+STYLE
+::cue { color: yellow }
+
+intro
+00:01.000 --> 00:03.250 align:start position:10%
+<v Narrator>Welcome aboard</v>
+
+01:00:00.5 --> 01:00:02.000
+{\\an8}Final approach
+"""
+
+
+def cue(index, start, end, text):
+    return Cue(index, start, end, text)
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("00:00:01,000", 1.0),
+    ("01:02:03,456", 3723.456),
+    ("02:03.5", 123.5),
+    ("1:00:00.25", 3600.25),
+    (" 00:00:00,007 ", 0.007),
+])
+def test_parse_timestamp(value, seconds):
+    assert parse_timestamp(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("value", ["", "12", "00:00:01", "aa:bb:cc,ddd", "00:00:01,0000"])
+def test_parse_timestamp_rejects_malformed(value):
+    assert parse_timestamp(value) is None
+
+
+def test_srt_cues():
+    cues = list(iter_cues(SRT.splitlines(keepends=True)))
+
+    assert [c.to_dict() for c in cues] == [
+        {"index": 0, "start": 1.0, "end": 4.5, "text": "The rocket lifts off"},
+        {"index": 1, "start": 5.0, "end": 8.0, "text": "Engines shut down over the Atlantic"},
+    ]
+
+
+def test_vtt_cues_skip_header_notes_and_settings():
+    cues = list(iter_cues(VTT.splitlines()))
+
+    assert [(c.index, c.start, c.end, c.text) for c in cues] == [
+        (0, 1.0, 3.25, "Welcome aboard"),
+        (1, 3600.5, 3602.0, "Final approach"),
+    ]
+
+
+def test_crlf_and_missing_trailing_blank_line():
+    lines = ["1\r\n", "00:00:02,000 --> 00:00:01,000\r\n", "Backwards\r\n"]
+
+    cues = list(iter_cues(lines))
+
+    # an end before the start is clamped to the start
+    assert [(c.start, c.end, c.text) for c in cues] == [(2.0, 2.0, "Backwards")]
+
+
+def test_iter_caption_file(tmp_path):
+    path = tmp_path / "talk.srt"
+    path.write_text(SRT, encoding="utf-8")
+
+    assert [c.text for c in iter_caption_file(str(path))] == [
+        "The rocket lifts off",
+        "Engines shut down over the Atlantic",
+    ]
+
+
+def test_tokenize_drops_stopwords_and_short_tokens():
+    assert tokenize("The Rocket's engine, and a 2nd_stage!") == ["rocket", "engine", "2nd", "stage"]
+
+
+def build_index():
+    return CaptionIndex([
+        cue(0, 0.0, 30.0, "Welcome to the launch briefing"),
+        cue(1, 10.0, 12.0, "The rocket engines ignite"),
+        cue(2, 12.0, 15.0, "Liftoff of the rocket"),
+        cue(3, 20.0, 25.0, "Weather over the launch site"),
+        cue(4, 40.0, 45.0, "Engines rocket rocket rocket"),
+    ])
+
+
+def test_cues_are_sorted_by_start():
+    index = CaptionIndex([cue(1, 5.0, 6.0, "b"), cue(0, 1.0, 2.0, "a")])
+
+    assert [c.index for c in index.cues] == [0, 1]
+    assert len(index) == 2
+    assert index.duration == 6.0
+
+
+def test_overlapping_finds_long_cues_that_started_earlier():
+    index = build_index()
+
+    assert [c.index for c in index.overlapping(11.0)] == [0, 1]
+    assert [c.index for c in index.overlapping(12.0)] == [0, 1, 2]
+    assert [c.index for c in index.overlapping(16.0, 19.0)] == [0]
+    assert [c.index for c in index.overlapping(31.0, 39.0)] == []
+    assert [c.index for c in index.overlapping(26.0, 41.0)] == [0, 4]
+
+
+def test_overlapping_matches_a_linear_scan():
+    cues = [cue(i, (i * 7) % 23, (i * 7) % 23 + (i % 5) * 3, f"cue {i}") for i in range(40)]
+    index = CaptionIndex(cues)
+
+    for start in range(-2, 40, 3):
+        for length in (0, 1, 4, 10):
+            expected = sorted(
+                c.index for c in cues if c.start <= start + length and c.end >= start
+            )
+            assert sorted(c.index for c in index.overlapping(start, start + length)) == expected
+
+
+def test_match_ranks_by_tf_idf_similarity():
+    index = build_index()
+
+    results = index.match("rocket liftoff", k=5)
+
+    assert [c.index for c, _ in results] == [2, 4, 1]
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert all(0 < score <= 1 + 1e-6 for score in scores)
+
+
+def test_match_identical_text_scores_one():
+    index = build_index()
+
+    (best, score), *_ = index.match("Weather over the launch site")
+
+    assert best.index == 3
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_match_limits_to_k():
+    index = build_index()
+
+    assert [c.index for c, _ in index.match("rocket engines launch", k=2)] == [
+        c.index for c, _ in index.match("rocket engines launch", k=10)
+    ][:2]
+
+
+def test_match_within_time_window():
+    index = build_index()
+
+    assert [c.index for c, _ in index.match("rocket", start=35.0)] == [4]
+    assert [c.index for c, _ in index.match("rocket", end=11.0)] == [1]
+    assert [c.index for c, _ in index.match("launch", start=16.0, end=18.0)] == [0]
+
+
+def test_match_without_known_terms():
+    index = build_index()
+
+    assert index.match("the and of") == []
+    assert index.match("submarine") == []
+
+
+def test_empty_index():
+    index = CaptionIndex([])
+
+    assert len(index) == 0
+    assert index.duration == 0.0
+    assert index.overlapping(1.0) == []
+    assert index.match("rocket") == []
@@ -0,0 +1,278 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from app.utils.disk_cache import DiskLRUCache
+
+
+def writer(data: bytes, calls: list = None, release: asyncio.Event = None):
+    """Entry creator writing `data`, recording its calls and waiting on `release` if given"""
+    async def create(tmp_path: str) -> None:
+        if calls is not None:
+            calls.append(tmp_path)
+        if release is not None:
+            await release.wait()
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+    return create
+
+
+def files(directory) -> set:
+    return {path.name for path in Path(directory).glob("*/*")}
+
+
+def test_creates_once_then_hits(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    calls = []
+
+    async def main():
+        first = await cache.get_or_create("a", writer(b"aaaa", calls))
+        second = await cache.get_or_create("a", writer(b"other", calls))
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert first == second
+    assert Path(first).read_bytes() == b"aaaa"
+    assert len(calls) == 1
+    assert cache.stats() == {
+        "entries": 1, "pinned": 0, "bytes": 4, "max_bytes": 100,
+        "hits": 1, "misses": 1, "coalesced": 0, "evictions": 0,
+    }
+
+
+def test_concurrent_misses_share_one_creation(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    calls = []
+
+    async def main():
+        release = asyncio.Event()
+        waiters = [asyncio.create_task(cache.get_or_create("a", writer(b"aaaa", calls, release))) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*waiters)
+
+    paths = asyncio.run(main())
+
+    assert len(set(paths)) == 1
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_creation(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+
+    async def main():
+        release = asyncio.Event()
+        first = asyncio.create_task(cache.get_or_create("a", writer(b"aaaa", release=release)))
+        second = asyncio.create_task(cache.get_or_create("a", writer(b"aaaa")))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        release.set()
+        return await second
+
+    path = asyncio.run(main())
+
+    assert Path(path).read_bytes() == b"aaaa"
+
+
+def test_failed_creation_leaves_nothing_behind(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+
+    async def fail(tmp_path: str) -> None:
+        with open(tmp_path, "wb") as f:
+            f.write(b"partial")
+        raise ValueError("cannot render")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await cache.get_or_create("a", fail)
+        # the failure is not cached
+        return await cache.get_or_create("a", writer(b"aaaa"))
+
+    path = asyncio.run(main())
+
+    assert Path(path).read_bytes() == b"aaaa"
+    assert files(tmp_path) == {Path(path).name}
+    assert cache.stats()["misses"] == 2
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10)
+
+    async def main():
+        a = await cache.get_or_create("a", writer(b"aaaa"))
+        b = await cache.get_or_create("b", writer(b"bbbb"))
+        await cache.get_or_create("a", writer(b"aaaa"))
+        c = await cache.get_or_create("c", writer(b"cccc"))
+        return a, b, c
+
+    a, b, c = asyncio.run(main())
+
+    assert os.path.exists(a) and os.path.exists(c)
+    assert not os.path.exists(b)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 8
+
+
+def test_newest_entry_is_kept_even_over_budget(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=4)
+
+    path = asyncio.run(cache.get_or_create("big", writer(b"x" * 10)))
+
+    assert os.path.exists(path)
+    assert cache.stats()["entries"] == 1
+
+
+def test_entry_removed_behind_its_back_is_created_again(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+
+    async def main():
+        path = await cache.get_or_create("a", writer(b"aaaa"))
+        os.unlink(path)
+        return await cache.get_or_create("a", writer(b"again"))
+
+    path = asyncio.run(main())
+
+    assert Path(path).read_bytes() == b"again"
+    assert cache.stats()["bytes"] == 5
+
+
+def test_recency_survives_a_restart(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=12)
+
+    async def fill():
+        paths = {}
+        for key in ("a", "b", "c"):
+            paths[key] = await cache.get_or_create(key, writer(key.encode() * 4))
+        return paths
+
+    paths = asyncio.run(fill())
+    # "b" was used most recently, then "a"; "c" least
+    os.utime(paths["c"], (1000, 1000))
+    os.utime(paths["a"], (2000, 2000))
+    os.utime(paths["b"], (3000, 3000))
+    Path(paths["a"]).with_name("leftover.tmp").write_bytes(b"partial")
+
+    restarted = DiskLRUCache(str(tmp_path), max_bytes=12)
+    asyncio.run(restarted.get_or_create("d", writer(b"dddd")))
+
+    assert not os.path.exists(paths["c"])
+    assert os.path.exists(paths["a"]) and os.path.exists(paths["b"])
+    assert not any(name.endswith(".tmp") for name in files(tmp_path))
+    assert restarted.stats()["entries"] == 3
+
+
+def test_restart_trims_to_a_smaller_budget(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+
+    async def fill():
+        return [await cache.get_or_create(key, writer(b"1234")) for key in ("a", "b", "c")]
+
+    a, b, c = asyncio.run(fill())
+    for age, path in enumerate((a, b, c)):
+        os.utime(path, (1000 + age, 1000 + age))
+
+    restarted = DiskLRUCache(str(tmp_path), max_bytes=8)
+
+    assert files(tmp_path) == {Path(b).name, Path(c).name}
+    assert restarted.stats()["bytes"] == 8
+
+
+def test_pinned_entries_are_not_evicted_until_released(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=8)
+
+    async def main():
+        a = await cache.get_or_create("a", writer(b"aaaa"), pin=True)
+        b = await cache.get_or_create("b", writer(b"bbbb"))
+        c = await cache.get_or_create("c", writer(b"cccccc"))
+        # "a" is the least recently used, but still being served
+        assert os.path.exists(a)
+        assert not os.path.exists(b)
+        assert cache.stats()["pinned"] == 1
+        assert cache.stats()["bytes"] == 10
+
+        await cache.release(a)
+        return a, c
+
+    a, c = asyncio.run(main())
+
+    assert not os.path.exists(a)
+    assert os.path.exists(c)
+    assert cache.stats()["pinned"] == 0
+
+
+def test_pins_are_counted(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=4)
+
+    async def main():
+        a = await cache.get_or_create("a", writer(b"aaaa"), pin=True)
+        await cache.get_or_create("a", writer(b"aaaa"), pin=True)
+        await cache.get_or_create("b", writer(b"bbbb"))
+        await cache.release(a)
+        assert os.path.exists(a)
+        await cache.release(a)
+        return a
+
+    a = asyncio.run(main())
+
+    assert not os.path.exists(a)
+
+
+def test_pin_is_dropped_when_creation_fails(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+
+    async def fail(tmp_path: str) -> None:
+        raise ValueError("cannot render")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await cache.get_or_create("a", fail, pin=True)
+
+    asyncio.run(main())
+
+    assert cache.stats()["pinned"] == 0
+
+
+def test_release_ignores_paths_outside_the_cache(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=100)
+
+    async def main():
+        path = await cache.get_or_create("a", writer(b"aaaa"), pin=True)
+        await cache.release(str(tmp_path / "elsewhere" / Path(path).name))
+        await cache.release(str(tmp_path / "original.png"))
+        return path
+
+    asyncio.run(main())
+
+    assert cache.stats()["pinned"] == 1
+
+
+def test_image_response_releases_its_pin_after_sending(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routes.file_routes import _ReleasingFileResponse
+
+    cache = DiskLRUCache(str(tmp_path), max_bytes=4)
+    path = asyncio.run(cache.get_or_create("a", writer(b"image-bytes"), pin=True))
+    app = FastAPI()
+
+    @app.get("/image")
+    async def image():
+        return _ReleasingFileResponse(path, cache.release, media_type="image/png")
+
+    with TestClient(app) as client:
+        ranged = client.get("/image", headers={"Range": "bytes=100-200"})
+        assert ranged.status_code == 416
+        assert cache.stats()["pinned"] == 0
+
+        asyncio.run(cache.get_or_create("a", writer(b"image-bytes"), pin=True))
+        response = client.get("/image")
+
+    assert response.status_code == 200
+    assert response.content == b"image-bytes"
+    assert response.headers["content-type"] == "image/png"
+    assert cache.stats()["pinned"] == 0
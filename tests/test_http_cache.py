@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.utils.http_cache import etag_matches, http_date, is_not_modified
+
+MODIFIED = datetime(2024, 3, 5, 14, 30, 15, 250000, tzinfo=timezone.utc)
+
+
+def test_http_date_is_imf_fixdate_in_gmt():
+    assert http_date(MODIFIED) == "Tue, 05 Mar 2024 14:30:15 GMT"
+
+
+def test_http_date_converts_to_utc_and_assumes_naive_is_utc():
+    plus_two = MODIFIED.astimezone(timezone(timedelta(hours=2)))
+
+    assert http_date(plus_two) == "Tue, 05 Mar 2024 14:30:15 GMT"
+    assert http_date(MODIFIED.replace(tzinfo=None)) == "Tue, 05 Mar 2024 14:30:15 GMT"
+
+
+@pytest.mark.parametrize("header, etag, expected", [
+    ('"abc"', '"abc"', True),
+    ('"abc"', '"abd"', False),
+    ('W/"abc"', '"abc"', True),
+    ('"abc"', 'W/"abc"', True),
+    ('"x", "abc" , "y"', '"abc"', True),
+    ('"x", "y"', '"abc"', False),
+    ("*", '"abc"', True),
+    (" * ", '"abc"', True),
+    ('"abc-256-v1"', '"abc"', False),
+])
+def test_etag_matches(header, etag, expected):
+    assert etag_matches(header, etag) is expected
+
+
+def test_not_modified_when_etag_matches():
+    assert is_not_modified({"if-none-match": '"abc"'}, '"abc"', MODIFIED)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    headers = {"if-none-match": '"old"', "if-modified-since": http_date(MODIFIED + timedelta(days=1))}
+
+    assert not is_not_modified(headers, '"abc"', MODIFIED)
+
+
+def test_not_modified_since_a_later_or_equal_date():
+    # Last-Modified is sent without the fraction of a second
+    assert is_not_modified({"if-modified-since": http_date(MODIFIED)}, '"abc"', MODIFIED)
+    assert is_not_modified({"if-modified-since": http_date(MODIFIED + timedelta(hours=1))}, '"abc"', MODIFIED)
+
+
+def test_modified_after_the_date():
+    headers = {"if-modified-since": http_date(MODIFIED - timedelta(seconds=1))}
+
+    assert not is_not_modified(headers, '"abc"', MODIFIED)
+
+
+def test_naive_last_modified_is_utc():
+    assert is_not_modified({"if-modified-since": http_date(MODIFIED)}, '"abc"', MODIFIED.replace(tzinfo=None))
+
+
+@pytest.mark.parametrize("headers, last_modified", [
+    ({}, MODIFIED),
+    ({"if-modified-since": "yesterday"}, MODIFIED),
+    ({"if-modified-since": ""}, MODIFIED),
+    ({"if-modified-since": "Tue, 05 Mar 2024 14:30:15 GMT"}, None),
+])
+def test_modified_without_usable_validators(headers, last_modified):
+    assert not is_not_modified(headers, '"abc"', last_modified)
@@ -0,0 +1,104 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.utils.image_filter import FilterDecision, FilterVerdict, classify_image, classify_images
+
+
+def png(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def noise(width: int, height: int, channels: int = 3, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (height, width, channels), dtype=np.uint8)
+
+
+def gradient(width: int, height: int) -> np.ndarray:
+    """Diagonal ramp over the full intensity range, with some noise on top"""
+    ramp = (np.add.outer(np.arange(height), np.arange(width)) * 255 // (width + height - 2)).astype(np.int16)
+    image = np.clip(ramp[..., None] + noise(width, height).astype(np.int16) // 8, 0, 255)
+    return image.astype(np.uint8)
+
+
+def solid(width: int, height: int, value: int = 128) -> np.ndarray:
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+@pytest.fixture(autouse=True)
+def no_byte_floor(monkeypatch):
+    """Most rules are tested on their own, without the minimum size in bytes in the way"""
+    monkeypatch.setattr(settings, "FILTER_MIN_BYTES", 0)
+
+
+def test_keeps_a_detailed_image():
+    assert classify_image(png(gradient(200, 200))) == FilterDecision(FilterVerdict.keep, None)
+
+
+def test_too_few_bytes_is_skipped(monkeypatch):
+    monkeypatch.setattr(settings, "FILTER_MIN_BYTES", 256)
+    data = png(solid(64, 64))
+    assert len(data) < 256
+
+    assert classify_image(data) == FilterDecision(FilterVerdict.skip, "too_few_bytes")
+
+
+@pytest.mark.parametrize("image, verdict, reason", [
+    (noise(10, 10), FilterVerdict.skip, "too_small"),
+    (noise(1000, 40), FilterVerdict.skip, "extreme_aspect_ratio"),
+    (solid(200, 200), FilterVerdict.skip, "solid_color"),
+    (noise(40, 40), FilterVerdict.review, "small"),
+])
+def test_rules(image, verdict, reason):
+    assert classify_image(png(image)) == FilterDecision(verdict, reason)
+
+
+def test_fully_transparent_is_skipped():
+    image = noise(200, 200, channels=4)
+    image[..., 3] = 0
+
+    assert classify_image(png(image)) == FilterDecision(FilterVerdict.skip, "fully_transparent")
+
+
+def test_low_entropy_is_reviewed():
+    # 90% black, 10% white: high variance but under one bit of entropy
+    image = solid(200, 200, value=0)
+    image[:20] = 255
+
+    assert classify_image(png(image)) == FilterDecision(FilterVerdict.review, "low_entropy")
+
+
+def test_undecodable_is_reviewed():
+    assert classify_image(b"not an image" * 100) == FilterDecision(FilterVerdict.review, "undecodable")
+
+
+def test_first_matching_rule_wins():
+    # small, solid and too thin: too_small comes first
+    assert classify_image(png(solid(400, 10))).reason == "too_small"
+    # thin and solid: the aspect ratio rule comes before solid_color
+    assert classify_image(png(solid(1000, 40))).reason == "extreme_aspect_ratio"
+
+
+def test_batch_matches_one_at_a_time():
+    images = [
+        png(gradient(200, 200)), png(noise(10, 10)), b"junk" * 100,
+        png(solid(200, 200)), png(noise(40, 40, seed=1)), png(gradient(300, 120)),
+    ]
+
+    assert classify_images(images) == [classify_image(image) for image in images]
+
+
+def test_empty_batch():
+    assert classify_images([]) == []
+
+
+def test_disabled_keeps_everything(monkeypatch):
+    monkeypatch.setattr(settings, "FILTER_ENABLED", False)
+
+    decisions = classify_images([png(solid(200, 200)), b"junk"])
+
+    assert decisions == [FilterDecision(FilterVerdict.keep, None)] * 2
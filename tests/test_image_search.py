@@ -0,0 +1,183 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from app.client import image_search
+from app.client.image_search import CachedImageSearch, ImageSearchBackend
+
+
+class FakeBackend(ImageSearchBackend):
+    """Records calls; each search waits on `release` when it is set up, and fails while `fail` is set"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = None
+        self.fail = False
+
+    async def search_images(self, query: str, max_results: int) -> List:
+        self.calls.append((query, max_results))
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [f"{query}:{i}" for i in range(max_results)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(image_search.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_repeated_search_is_served_from_cache():
+    backend = FakeBackend()
+    cache = CachedImageSearch(backend)
+
+    async def main():
+        first = await cache.search("Eiffel Tower", 3)
+        second = await cache.search("  eiffel   TOWER ", 3)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert first == second
+    assert backend.calls == [("Eiffel Tower", 3)]
+    assert cache.stats()["hits"] == 1
+
+
+def test_upstream_gets_the_query_as_typed():
+    backend = FakeBackend()
+    cache = CachedImageSearch(backend)
+
+    asyncio.run(cache.search("  NASA  Apollo ", 2))
+
+    assert backend.calls == [("  NASA  Apollo ", 2)]
+
+
+def test_top_n_is_part_of_the_key():
+    backend = FakeBackend()
+    cache = CachedImageSearch(backend)
+
+    async def main():
+        await cache.search("cat", 2)
+        await cache.search("cat", 5)
+
+    asyncio.run(main())
+
+    assert backend.calls == [("cat", 2), ("cat", 5)]
+
+
+def test_entries_expire_after_the_ttl(clock):
+    backend = FakeBackend()
+    cache = CachedImageSearch(backend, ttl_seconds=60)
+
+    async def main():
+        await cache.search("cat", 1)
+        clock[0] += 59
+        await cache.search("cat", 1)
+        clock[0] += 2
+        await cache.search("cat", 1)
+
+    asyncio.run(main())
+
+    assert len(backend.calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    backend = FakeBackend()
+    cache = CachedImageSearch(backend, max_entries=2)
+
+    async def main():
+        await cache.search("a", 1)
+        await cache.search("b", 1)
+        await cache.search("a", 1)  # b is now the least recently used
+        await cache.search("c", 1)
+        backend.calls.clear()
+        await cache.search("a", 1)
+        await cache.search("b", 1)
+
+    asyncio.run(main())
+
+    assert backend.calls == [("b", 1)]
+    assert cache.stats()["entries"] == 2
+
+
+def test_concurrent_searches_share_one_call():
+    backend = FakeBackend()
+    cache = CachedImageSearch(backend)
+
+    async def main():
+        backend.release = asyncio.Event()
+        searches = [asyncio.create_task(cache.search(query, 2)) for query in ("Cat", "cat", "CAT ")]
+        await asyncio.sleep(0)
+        backend.release.set()
+        return await asyncio.gather(*searches)
+
+    results = asyncio.run(main())
+
+    assert backend.calls == [("Cat", 2)]
+    assert results[0] == results[1] == results[2]
+    assert cache.stats()["coalesced"] == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    backend = FakeBackend()
+    cache = CachedImageSearch(backend)
+
+    async def main():
+        backend.release = asyncio.Event()
+        leaving = asyncio.create_task(cache.search("cat", 1))
+        staying = asyncio.create_task(cache.search("cat", 1))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        await asyncio.sleep(0)
+        backend.release.set()
+        result = await staying
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return result
+
+    assert asyncio.run(main()) == ["cat:0"]
+    assert len(backend.calls) == 1
+
+
+def test_result_is_cached_even_if_every_caller_left():
+    backend = FakeBackend()
+    cache = CachedImageSearch(backend)
+
+    async def main():
+        backend.release = asyncio.Event()
+        leaving = asyncio.create_task(cache.search("cat", 1))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        backend.release.set()
+        while cache.stats()["inflight"]:
+            await asyncio.sleep(0)
+        return await cache.search("cat", 1)
+
+    assert asyncio.run(main()) == ["cat:0"]
+    assert len(backend.calls) == 1
+
+
+def test_failures_are_shared_but_not_cached():
+    backend = FakeBackend()
+    cache = CachedImageSearch(backend)
+
+    async def main():
+        backend.release = asyncio.Event()
+        backend.fail = True
+        searches = [asyncio.create_task(cache.search("cat", 1)) for _ in range(2)]
+        await asyncio.sleep(0)
+        backend.release.set()
+        results = await asyncio.gather(*searches, return_exceptions=True)
+        backend.fail = False
+        return results, await cache.search("cat", 1)
+
+    results, retried = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == ["cat:0"]
+    assert len(backend.calls) == 2
+    assert cache.stats()["errors"] == 1
@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+
+from app.utils import near_duplicates
+from app.utils.image_features import HASH_BITS
+from app.utils.near_duplicates import band_layout, cluster_hashes, connected_labels, pick_canonicals
+
+
+def brute_force_labels(hashes: np.ndarray, threshold: int) -> np.ndarray:
+    """Single-linkage clusters by comparing every pair, labelled with their smallest index"""
+    count = len(hashes)
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(count):
+        for j in range(i + 1, count):
+            if bin(int(hashes[i]) ^ int(hashes[j])).count("1") <= threshold:
+                a, b = find(i), find(j)
+                parent[max(a, b)] = min(a, b)
+    return np.array([find(i) for i in range(count)], dtype=np.int64)
+
+
+def flip(value: int, bits) -> int:
+    for bit in bits:
+        value ^= 1 << int(bit)
+    return value
+
+
+def random_hashes(seed: int, bases: int, copies: int, max_flips: int) -> np.ndarray:
+    """Near-copies of a few random hashes, plus the bases themselves, shuffled"""
+    rng = np.random.default_rng(seed)
+    values = []
+    for _ in range(bases):
+        base = int(rng.integers(0, 1 << 63)) << 1 | int(rng.integers(0, 2))
+        values.append(base)
+        for _ in range(copies):
+            flips = rng.choice(HASH_BITS, size=int(rng.integers(0, max_flips + 1)), replace=False)
+            values.append(flip(base, flips))
+    values = np.array(values, dtype=np.uint64)
+    rng.shuffle(values)
+    return values
+
+
+@pytest.mark.parametrize("threshold", [0, 1, 5, 12])
+def test_band_layout_covers_every_bit_once(threshold):
+    layout = band_layout(threshold)
+
+    assert len(layout) == threshold + 1
+    assert layout[0][0] == 0
+    assert sum(width for _, width in layout) == HASH_BITS
+    for (shift, width), (next_shift, _) in zip(layout, layout[1:]):
+        assert shift + width == next_shift
+    widths = [width for _, width in layout]
+    assert max(widths) - min(widths) <= 1
+
+
+def test_connected_labels_uses_smallest_node():
+    labels = connected_labels(6, np.array([4, 1, 5]), np.array([1, 3, 2]))
+
+    assert labels.tolist() == [0, 1, 2, 1, 1, 2]
+
+
+def test_connected_labels_without_edges():
+    assert connected_labels(3, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)).tolist() == [0, 1, 2]
+
+
+@pytest.mark.parametrize("threshold", [0, 3, 6, 12])
+def test_matches_pairwise_comparison(threshold):
+    hashes = random_hashes(seed=threshold, bases=12, copies=6, max_flips=threshold + 2)
+
+    labels = cluster_hashes(hashes, threshold, workers=1)
+
+    assert labels.tolist() == brute_force_labels(hashes, threshold).tolist()
+
+
+def test_exact_duplicates_at_threshold_zero():
+    hashes = np.array([7, 9, 7, 8, 9], dtype=np.uint64)
+
+    assert cluster_hashes(hashes, 0, workers=1).tolist() == [0, 1, 0, 3, 1]
+
+
+def test_chains_are_linked_transitively():
+    base = 0x0123_4567_89AB_CDEF
+    # each step is 3 bits from the previous one, so the ends are 9 bits apart
+    hashes = np.array([
+        base,
+        flip(base, [0, 1, 2]),
+        flip(base, [0, 1, 2, 10, 11, 12]),
+        flip(base, [0, 1, 2, 10, 11, 12, 20, 21, 22]),
+        flip(base, [40, 41, 42, 43, 44, 45, 46]),
+    ], dtype=np.uint64)
+
+    assert cluster_hashes(hashes, 3, workers=1).tolist() == [0, 0, 0, 0, 4]
+
+
+def test_high_bit_hashes():
+    top = 1 << 63
+    hashes = np.array([top, top | 1, 1], dtype=np.uint64)
+
+    assert cluster_hashes(hashes, 1, workers=1).tolist() == [0, 0, 0]
+    assert cluster_hashes(hashes, 0, workers=1).tolist() == [0, 1, 2]
+
+
+def test_small_inputs():
+    assert cluster_hashes(np.array([], dtype=np.uint64), 4).tolist() == []
+    assert cluster_hashes(np.array([5], dtype=np.uint64), 4).tolist() == [0]
+
+
+@pytest.mark.parametrize("threshold", [-1, 13])
+def test_rejects_out_of_range_threshold(threshold):
+    with pytest.raises(ValueError):
+        cluster_hashes(np.array([1, 2], dtype=np.uint64), threshold)
+
+
+def test_small_budgets_split_buckets_into_blocks_and_tasks(monkeypatch):
+    hashes = random_hashes(seed=42, bases=4, copies=40, max_flips=4)
+    expected = brute_force_labels(hashes, 4)
+    monkeypatch.setattr(near_duplicates, "_BLOCK_BUDGET", 64)
+    monkeypatch.setattr(near_duplicates, "_TASK_BUDGET", 100)
+
+    assert cluster_hashes(hashes, 4, workers=1).tolist() == expected.tolist()
+
+
+def test_process_pool_gives_the_same_labels(tmp_path):
+    hashes = random_hashes(seed=7, bases=10, copies=8, max_flips=5)
+
+    labels = cluster_hashes(hashes, 4, workers=2, work_dir=str(tmp_path))
+
+    assert labels.tolist() == brute_force_labels(hashes, 4).tolist()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_pick_canonicals_prefers_described_then_heaviest():
+    hashes = np.array([0b0000, 0b0001, 0b0011, 0b1000], dtype=np.uint64)
+    labels = np.array([0, 0, 0, 3])
+    described = np.array([False, False, True, False])
+    weights = np.array([1, 5, 1, 1])
+
+    assert pick_canonicals(hashes, labels, 2, described, weights).tolist() == [2, 2, 2, 3]
+    assert pick_canonicals(hashes, labels, 2, np.zeros(4, dtype=bool), weights).tolist() == [1, 1, 1, 3]
+
+
+def test_pick_canonicals_leaves_distant_chain_members_alone():
+    # single-linkage joined 0 and 2 through 1, but they are 4 bits apart
+    hashes = np.array([0b0000, 0b0011, 0b1111], dtype=np.uint64)
+    labels = np.array([0, 0, 0])
+    weights = np.array([3, 1, 1])
+
+    canonical = pick_canonicals(hashes, labels, 2, np.zeros(3, dtype=bool), weights)
+
+    assert canonical.tolist() == [0, 0, 2]
@@ -0,0 +1,151 @@
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.exceptions.custom_exception import CustomException
+from app.utils.office_extraction import iter_office_images, office_format, open_archive, plan_members
+
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{}</Relationships>'
+)
+
+
+def relationship(target: str, external: bool = False) -> str:
+    mode = ' TargetMode="External"' if external else ""
+    return f'<Relationship Id="r" Type="image" Target="{target}"{mode}/>'
+
+
+def image(seed: int, size: int = 2048) -> bytes:
+    """Incompressible bytes standing in for an encoded image"""
+    return np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8).tobytes()
+
+
+def mark_encrypted(data: bytes, names: tuple) -> bytes:
+    """Set the encryption flag on members' central directory entries (zipfile cannot write encrypted members)"""
+    data = bytearray(data)
+    start = data.find(b"PK\x01\x02")
+    while start != -1:
+        name_length = int.from_bytes(data[start + 28:start + 30], "little")
+        if data[start + 46:start + 46 + name_length].decode() in names:
+            data[start + 8] |= 0x1
+        start = data.find(b"PK\x01\x02", start + 46)
+    return bytes(data)
+
+
+def archive(members: dict, main_part: str = "ppt/presentation.xml", encrypted: tuple = ()) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(main_part, "<presentation/>")
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return mark_encrypted(buffer.getvalue(), encrypted)
+
+
+def planned(data: bytes) -> list:
+    with open_archive(data) as zf:
+        return [info.filename for info in plan_members(zf, office_format(zf))]
+
+
+def test_images_follow_slide_order_then_natural_name_order():
+    data = archive({
+        "ppt/media/image1.png": image(1),
+        "ppt/media/image2.png": image(2),
+        "ppt/media/image9.png": image(9),
+        "ppt/media/image10.png": image(10),
+        # slide 2 and slide 1 both use image1: it belongs to slide 1
+        "ppt/slides/_rels/slide2.xml.rels": RELS.format(relationship("../media/image1.png")),
+        "ppt/slides/_rels/slide1.xml.rels": RELS.format(
+            relationship("../media/image2.png") + relationship("../media/image1.png")
+        ),
+    })
+
+    images = list(iter_office_images(data))
+
+    assert [(img["filename"], img["page_number"]) for img in images] == [
+        ("slide1_image1.png", 1),
+        ("slide1_image2.png", 1),
+        ("image9.png", None),
+        ("image10.png", None),
+    ]
+    assert images[0]["image_bytes"] == image(1)
+    assert images[0]["extension"] == "png"
+
+
+def test_external_and_malformed_relationships_are_ignored():
+    data = archive({
+        "ppt/media/image1.png": image(1),
+        "ppt/slides/_rels/slide1.xml.rels": RELS.format(relationship("../media/image1.png", external=True)),
+        "ppt/slides/_rels/slide2.xml.rels": "<not xml",
+    })
+
+    assert [img["filename"] for img in iter_office_images(data)] == ["image1.png"]
+
+
+def test_compression_bombs_are_skipped():
+    # a megabyte of zeros deflates about a thousandfold
+    data = archive({"ppt/media/bomb.png": bytes(1024 * 1024), "ppt/media/image1.png": image(1)})
+
+    assert planned(data) == ["ppt/media/image1.png"]
+
+
+def test_encrypted_members_are_skipped():
+    data = archive(
+        {"ppt/media/secret.png": image(1), "ppt/media/image1.png": image(2)},
+        encrypted=("ppt/media/secret.png",),
+    )
+
+    assert planned(data) == ["ppt/media/image1.png"]
+
+
+def test_oversized_and_undersized_members_are_skipped(monkeypatch):
+    monkeypatch.setattr(settings, "OFFICE_MAX_MEMBER_BYTES", 4096)
+    monkeypatch.setattr(settings, "FILTER_MIN_BYTES", 256)
+    data = archive({
+        "ppt/media/large.png": image(1, size=8192),
+        "ppt/media/tiny.png": image(2, size=100),
+        "ppt/media/fits.png": image(3, size=2048),
+    })
+
+    assert planned(data) == ["ppt/media/fits.png"]
+
+
+def test_only_raster_media_is_planned():
+    data = archive({
+        "ppt/media/image1.png": image(1),
+        "ppt/media/image2.emf": image(2),
+        "ppt/media/movie.mp4": image(3),
+        "ppt/embeddings/image3.png": image(4),
+        "docProps/thumbnail.jpeg": image(5),
+    })
+
+    assert planned(data) == ["ppt/media/image1.png"]
+
+
+@pytest.mark.parametrize("main_part, media, kind", [
+    ("word/document.xml", "word/media/image1.jpeg", "docx"),
+    ("xl/workbook.xml", "xl/media/image1.gif", "xlsx"),
+])
+def test_documents_and_workbooks(main_part, media, kind, tmp_path):
+    path = tmp_path / f"document.{kind}"
+    path.write_bytes(archive({media: image(1)}, main_part=main_part))
+
+    with open_archive(str(path)) as zf:
+        assert office_format(zf) == kind
+    images = list(iter_office_images(str(path)))
+    assert [(img["filename"], img["page_number"]) for img in images] == [(media.rsplit("/", 1)[1], None)]
+
+
+def test_unknown_container_is_rejected():
+    with pytest.raises(CustomException) as error:
+        list(iter_office_images(archive({}, main_part="content.xml")))
+    assert error.value.status_code == 415
+
+
+def test_corrupt_archive_is_rejected():
+    with pytest.raises(CustomException) as error:
+        open_archive(b"PK\x03\x04 not really a zip")
+    assert error.value.status_code == 415
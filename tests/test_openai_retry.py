@@ -0,0 +1,230 @@
+import asyncio
+import time
+from email.utils import formatdate
+from typing import Callable, List
+
+import httpx
+import pytest
+from openai import APIConnectionError, BadRequestError, RateLimitError
+
+from app.client import openai_client
+from app.client.openai_client import AsyncOpenAIClient
+
+COMPLETION = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": "ok"},
+    }],
+}
+
+
+@pytest.fixture
+def make_client():
+    """Build AsyncOpenAIClients whose HTTP requests are answered by a handler; closed after the test"""
+    clients = []
+
+    def make(handler: Callable[[httpx.Request], httpx.Response], **kwargs) -> AsyncOpenAIClient:
+        client = AsyncOpenAIClient(
+            api_key="test", base_url="http://openai.test/v1", transport=httpx.MockTransport(handler), **kwargs
+        )
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        asyncio.run(client.close())
+        assert client.http_client.is_closed
+
+
+def scripted(*responses) -> Callable[[httpx.Request], httpx.Response]:
+    """Handler answering with `responses` in order: a status code, (status, headers) or an exception"""
+    remaining = list(responses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        response = remaining.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        status, headers = response if isinstance(response, tuple) else (response, {})
+        body = COMPLETION if status == 200 else {"error": {"message": "failed", "type": "error"}}
+        return httpx.Response(status, json=body, headers=headers)
+
+    return handler
+
+
+def complete(client: AsyncOpenAIClient):
+    return client._call(lambda: client.client.chat.completions.create(
+        model="gpt-4o", messages=[{"role": "user", "content": "hi"}],
+    ))
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> List[float]:
+    """Delays the client sleeps for between attempts, without waiting"""
+    delays = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr(openai_client.asyncio, "sleep", sleep)
+    return delays
+
+
+@pytest.mark.parametrize("status", [408, 409, 429, 500, 502, 503])
+def test_retries_retryable_statuses(status, sleeps, make_client):
+    client = make_client(scripted(status, status, 200))
+
+    response = asyncio.run(complete(client))
+
+    assert response.choices[0].message.content == "ok"
+    assert len(sleeps) == 2
+
+
+@pytest.mark.parametrize("error", [httpx.ConnectError("refused"), httpx.ReadTimeout("slow")])
+def test_retries_connection_errors(error, sleeps, make_client):
+    client = make_client(scripted(error, 200))
+
+    response = asyncio.run(complete(client))
+
+    assert response.choices[0].message.content == "ok"
+    assert len(sleeps) == 1
+
+
+def test_does_not_retry_client_errors(sleeps, make_client):
+    client = make_client(scripted(400, 200))
+
+    with pytest.raises(BadRequestError):
+        asyncio.run(complete(client))
+    assert sleeps == []
+
+
+def test_gives_up_after_max_retries(sleeps, make_client):
+    client = make_client(scripted(*[429] * 4), max_retries=3)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(complete(client))
+    assert len(sleeps) == 3
+
+
+def test_gives_up_on_connection_errors_after_max_retries(sleeps, make_client):
+    client = make_client(scripted(*[httpx.ConnectError("refused")] * 3), max_retries=2)
+
+    with pytest.raises(APIConnectionError):
+        asyncio.run(complete(client))
+    assert len(sleeps) == 2
+
+
+def test_backoff_is_full_jitter_capped_exponential(monkeypatch, sleeps, make_client):
+    bounds = []
+
+    def uniform(low: float, high: float) -> float:
+        bounds.append((low, high))
+        return high
+
+    monkeypatch.setattr(openai_client.random, "uniform", uniform)
+    client = make_client(scripted(*[500] * 6, 200), max_retries=6, backoff_base=0.5, backoff_max=4.0)
+
+    asyncio.run(complete(client))
+
+    assert bounds == [(0, 0.5), (0, 1.0), (0, 2.0), (0, 4.0), (0, 4.0), (0, 4.0)]
+    assert sleeps == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+
+
+def test_backoff_delays_are_random_within_the_cap(sleeps, make_client):
+    client = make_client(scripted(*[503] * 20, 200), max_retries=20, backoff_base=0.5, backoff_max=2.0)
+
+    asyncio.run(complete(client))
+
+    assert all(0 <= delay <= 2.0 for delay in sleeps)
+    assert len(set(sleeps)) > 1
+
+
+def test_honors_retry_after_ms(monkeypatch, sleeps, make_client):
+    monkeypatch.setattr(openai_client.random, "uniform", lambda low, high: 0.0)
+    client = make_client(scripted((429, {"retry-after-ms": "1500", "retry-after": "9"}), 200))
+
+    asyncio.run(complete(client))
+
+    assert sleeps == [1.5]
+
+
+def test_honors_retry_after_seconds(monkeypatch, sleeps, make_client):
+    monkeypatch.setattr(openai_client.random, "uniform", lambda low, high: 0.0)
+    client = make_client(scripted((429, {"retry-after": "7"}), 200))
+
+    asyncio.run(complete(client))
+
+    assert sleeps == [7.0]
+
+
+def test_honors_retry_after_http_date(monkeypatch, sleeps, make_client):
+    monkeypatch.setattr(openai_client.random, "uniform", lambda low, high: 0.0)
+    retry_at = formatdate(time.time() + 30, usegmt=True)
+    client = make_client(scripted((503, {"retry-after": retry_at}), 200))
+
+    asyncio.run(complete(client))
+
+    assert 28 <= sleeps[0] <= 30
+
+
+def test_retry_after_can_exceed_backoff_max(sleeps, make_client):
+    client = make_client(scripted((429, {"retry-after": "60"}), 200), backoff_base=0.5, backoff_max=1.0)
+
+    asyncio.run(complete(client))
+
+    assert 60 <= sleeps[0] <= 60.5
+
+
+def test_invalid_retry_after_falls_back_to_backoff(monkeypatch, sleeps, make_client):
+    monkeypatch.setattr(openai_client.random, "uniform", lambda low, high: high)
+    client = make_client(scripted((429, {"retry-after": "soon"}), 200), backoff_base=0.5)
+
+    asyncio.run(complete(client))
+
+    assert sleeps == [0.5]
+
+
+def test_semaphore_is_released_while_sleeping(monkeypatch, make_client):
+    client = make_client(scripted(429, 200), max_concurrency=1)
+    held = []
+
+    async def sleep(delay: float) -> None:
+        held.append(client._semaphore.locked())
+
+    monkeypatch.setattr(openai_client.asyncio, "sleep", sleep)
+
+    asyncio.run(complete(client))
+
+    assert held == [False]
+
+
+def test_other_calls_proceed_while_one_backs_off(make_client):
+    first = True
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal first
+        if first:
+            first = False
+            return httpx.Response(429, json={"error": {"message": "slow down"}}, headers={"retry-after": "0.5"})
+        return httpx.Response(200, json=COMPLETION)
+
+    client = make_client(handler, max_concurrency=1)
+
+    async def main():
+        finished = []
+
+        async def call(name: str):
+            await complete(client)
+            finished.append(name)
+
+        backing_off = asyncio.create_task(call("backing_off"))
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(call("other"), timeout=0.3)
+        await backing_off
+        return finished
+
+    assert asyncio.run(main()) == ["other", "backing_off"]
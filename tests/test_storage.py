@@ -0,0 +1,110 @@
+import asyncio
+import builtins
+
+import httpx
+import pytest
+
+from app.client import storage
+from app.client.storage import SupabaseStorageBackend
+from app.exceptions.custom_exception import CustomException
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+@pytest.fixture
+def supabase():
+    """Supabase backend over a mock transport that records requests and answers with `state["status"]`"""
+    requests = []
+    state = {"status": 200}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        request.read()
+        requests.append(request)
+        if state["status"] != 200:
+            return httpx.Response(state["status"], json={"error": "Duplicate", "message": "The resource already exists"})
+        return httpx.Response(200, json={"Key": request.url.path.split("/object/", 1)[1], "Id": "1"})
+
+    backend = SupabaseStorageBackend(
+        "http://supabase.test", "secret", transport=httpx.MockTransport(handler)
+    )
+    backend.requests = requests
+    backend.state = state
+    yield backend
+    asyncio.run(backend.close())
+
+
+def part_headers(request: httpx.Request) -> bytes:
+    """Headers of the multipart file part"""
+    return request.content.split(b"\r\n\r\n", 1)[0]
+
+
+def test_content_type_is_guessed_from_extension(supabase):
+    key = asyncio.run(supabase.upload_file("files", "jobs/abc.pdf", b"%PDF-1.7"))
+
+    request, = supabase.requests
+    assert key == "files/jobs/abc.pdf"
+    assert request.method == "POST"
+    assert request.url.path == "/storage/v1/object/files/jobs/abc.pdf"
+    assert request.headers["authorization"] == "Bearer secret"
+    assert b"Content-Type: application/pdf" in part_headers(request)
+
+
+def test_explicit_content_type_wins(supabase):
+    asyncio.run(supabase.upload_file("files", "file-id/image-id", PNG, content_type="image/png"))
+
+    request, = supabase.requests
+    assert b"Content-Type: image/png" in part_headers(request)
+    assert PNG in request.content
+
+
+def test_unknown_extension_is_octet_stream(supabase):
+    asyncio.run(supabase.upload_file("files", "file-id/image-id", PNG))
+
+    assert b"Content-Type: application/octet-stream" in part_headers(supabase.requests[0])
+
+
+def test_upsert_sets_header(supabase):
+    asyncio.run(supabase.upload_file("files", "a.png", PNG))
+    asyncio.run(supabase.upload_file("files", "a.png", PNG, upsert=True))
+
+    assert [request.headers["x-upsert"] for request in supabase.requests] == ["false", "true"]
+
+
+def test_path_content_is_streamed_and_closed(supabase, tmp_path, monkeypatch):
+    source = tmp_path / "deck.pptx"
+    source.write_bytes(b"PK\x03\x04deck")
+    opened = []
+
+    def tracking_open(*args, **kwargs):
+        f = builtins.open(*args, **kwargs)
+        opened.append(f)
+        return f
+
+    monkeypatch.setattr(storage, "open", tracking_open, raising=False)
+
+    asyncio.run(supabase.upload_file("files", "jobs/deck.pptx", str(source)))
+
+    request, = supabase.requests
+    assert b"PK\x03\x04deck" in request.content
+    assert b"presentationml" in part_headers(request)
+    assert len(opened) == 1 and opened[0].closed
+
+
+def test_path_content_is_closed_when_upload_fails(supabase, tmp_path, monkeypatch):
+    source = tmp_path / "doc.pdf"
+    source.write_bytes(b"%PDF-1.7")
+    opened = []
+
+    def tracking_open(*args, **kwargs):
+        f = builtins.open(*args, **kwargs)
+        opened.append(f)
+        return f
+
+    monkeypatch.setattr(storage, "open", tracking_open, raising=False)
+    supabase.state["status"] = 409
+
+    with pytest.raises(CustomException) as error:
+        asyncio.run(supabase.upload_file("files", "jobs/doc.pdf", str(source)))
+
+    assert error.value.exception_type == "StorageUploadError"
+    assert len(opened) == 1 and opened[0].closed